@@ -9,10 +9,9 @@ Compute allele frequencies for sex & population combinations given an SV VCF
 
 import sys
 import argparse
+import numpy as np
 import pysam
 from svtk import utils as svu
-from collections import Counter
-import pybedtools as pbt
 
 
 def create_pop_dict(popfile):
@@ -28,20 +27,140 @@ def create_pop_dict(popfile):
     return pop_dict
 
 
-def in_par(record, parbt):
+def load_par_index(parfile):
+    """
+    Load pseudoautosomal regions into per-chromosome arrays of sorted starts
+    and running maximum ends
+    """
+
+    intervals = {}
+    with open(parfile) as f:
+        for line in f:
+            if line.startswith(('#', 'track', 'browser')) or not line.strip():
+                continue
+            chrom, start, end = line.split('\t')[:3]
+            intervals.setdefault(chrom, []).append(adjust_zero_length(int(start), int(end)))
+
+    par_index = {}
+    for chrom, coords in intervals.items():
+        coords = np.array(sorted(coords), dtype=np.int64)
+        par_index[chrom] = (coords[:, 0], np.maximum.accumulate(coords[:, 1]))
+
+    return par_index
+
+
+def adjust_zero_length(start, end):
+    """
+    Pad zero-length intervals by 1bp on either side, as bedtools does
+    """
+
+    if start == end:
+        return start - 1, end + 1
+    return start, end
+
+
+def in_par(record, par_index):
     """
     Check if variant overlaps pseudoautosomal region
     """
 
-    # Sort start & end to handle edge cases and ensure end > start for pbt functionality
-    sstart, send = [str(x) for x in sorted([record.start, record.stop])]
-    svbt_str = '\t'.join([record.chrom, sstart, send]) + '\n'
-    svbt = pbt.BedTool(svbt_str, from_string=True)
-    if len(svbt.intersect(parbt)) > 0:
-        return True
-    else:
+    if record.chrom not in par_index:
         return False
 
+    # Sort start & end to handle edge cases where end < start
+    sstart, send = adjust_zero_length(*sorted([record.start, record.stop]))
+
+    # Only PARs starting before the variant end can overlap it; of those,
+    # the furthest-reaching end decides
+    starts, max_ends = par_index[record.chrom]
+    n_before = np.searchsorted(starts, send, side='left')
+    return bool(n_before > 0 and max_ends[n_before - 1] > sstart)
+
+
+def make_sample_masks(samples, males_set, females_set, pop_dict, pops, no_combos=False):
+    """
+    Build a sample membership mask for every sex & population grouping
+
+    Returns the grouping prefixes (None for all samples) and a
+    (n_groups, n_samples) array of 0/1 in VCF sample order
+    """
+
+    groups = [(None, samples)]
+    if len(males_set) > 0:
+        groups.append(('MALE', [s for s in samples if s in males_set]))
+    if len(females_set) > 0:
+        groups.append(('FEMALE', [s for s in samples if s in females_set]))
+    for pop in pops:
+        pop_samps = [s for s in samples if pop_dict.get(s, None) == pop]
+        groups.append((pop, pop_samps))
+        if len(males_set) > 0 and not no_combos:
+            groups.append((pop + '_MALE', [s for s in pop_samps if s in males_set]))
+        if len(females_set) > 0 and not no_combos:
+            groups.append((pop + '_FEMALE', [s for s in pop_samps if s in females_set]))
+
+    sample_idx = {s: i for i, s in enumerate(samples)}
+    masks = np.zeros((len(groups), len(samples)), dtype=np.int64)
+    for row, (prefix, members) in enumerate(groups):
+        masks[row, [sample_idx[s] for s in members]] = 1
+
+    return [prefix for prefix, members in groups], masks
+
+
+def one_hot(codes, n_codes):
+    """
+    Convert an array of non-negative codes to indicator columns, leaving
+    rows with negative codes empty
+    """
+
+    indicators = np.zeros((len(codes), n_codes), dtype=np.int64)
+    valid = codes >= 0
+    indicators[np.flatnonzero(valid), codes[valid]] = 1
+    return indicators
+
+
+def count_genotypes(record, masks):
+    """
+    Count alleles & genotypes of every sample grouping at a biallelic site
+
+    Each distinct GT is decoded once into a row of an int8 allele matrix
+    (-1 for no-calls, -2 for padding beyond the GT's ploidy). Returns an
+    (n_groups, 5) array of AN, AC, n_homref, n_het, and n_homalt.
+    """
+
+    gt_codes = {}
+    sample_gts = np.array([gt_codes.setdefault(s['GT'], len(gt_codes))
+                           for s in record.samples.values()], dtype=np.int64)
+
+    ploidy = max([len(GT) for GT in gt_codes], default=0)
+    alleles = np.full((len(gt_codes), ploidy), -2, dtype=np.int8)
+    for GT, code in gt_codes.items():
+        alleles[code, :len(GT)] = [-1 if allele is None else allele for allele in GT]
+
+    n_alleles = (alleles != -2).sum(axis=1)
+    n_called = (alleles >= 0).sum(axis=1)
+    n_ref = (alleles == 0).sum(axis=1)
+    n_alt = (alleles > 0).sum(axis=1)
+    gt_stats = np.stack([n_called,
+                         n_alt,
+                         (n_alleles == 2) & (n_ref == 2),
+                         (n_ref == 1) & (n_alt == 1),
+                         n_alt == 2], axis=1).astype(np.int64)
+
+    return masks @ one_hot(sample_gts, len(gt_codes)) @ gt_stats
+
+
+def count_copy_numbers(record, masks):
+    """
+    Count samples at each copy state, starting from CN=0, for every sample
+    grouping at a multiallelic site
+    """
+
+    CNs = np.array([-1 if s['CN'] is None else s['CN']
+                    for s in record.samples.values()], dtype=np.int64)
+    max_CN = CNs.max(initial=-1)
+
+    return masks @ one_hot(CNs, max_CN + 1)
+
 
 def update_sex_freqs(record, pop=None):
     """
@@ -82,15 +201,15 @@ def update_sex_freqs(record, pop=None):
     return record
 
 
-def gather_allele_freqs(record, samples, males_set, females_set, parbt, pop_dict, pops,
+def gather_allele_freqs(record, prefixes, masks, males_set, females_set, par_index, pops,
                         sex_chroms, no_combos=False):
     """
     Wrapper to compute allele frequencies for all sex & population pairings
     """
 
     # Add PAR annotation to record (if optioned)
-    if record.chrom in sex_chroms and len(parbt) > 0:
-        if in_par(record, parbt):
+    if record.chrom in sex_chroms and len(par_index) > 0:
+        if in_par(record, par_index):
             rec_in_par = True
             record.info['PAR'] = True
         else:
@@ -98,15 +217,21 @@ def gather_allele_freqs(record, samples, males_set, females_set, parbt, pop_dict
     else:
         rec_in_par = False
 
+    # Count alleles, genotypes or copy states for every grouping at once
+    if svu.is_biallelic(record):
+        counts = dict(zip(prefixes, count_genotypes(record, masks)))
+    else:
+        counts = dict(zip(prefixes, count_copy_numbers(record, masks)))
+
     # Get allele frequencies for all populations
-    calc_allele_freq(record, samples)
+    calc_allele_freq(record, counts[None])
     if len(males_set) > 0:
         if record.chrom in sex_chroms and not rec_in_par:
-            calc_allele_freq(record, males_set, prefix='MALE', hemi=True)
+            calc_allele_freq(record, counts['MALE'], prefix='MALE', hemi=True)
         else:
-            calc_allele_freq(record, males_set, prefix='MALE')
+            calc_allele_freq(record, counts['MALE'], prefix='MALE')
     if len(females_set) > 0:
-        calc_allele_freq(record, females_set, prefix='FEMALE')
+        calc_allele_freq(record, counts['FEMALE'], prefix='FEMALE')
 
     # Adjust global allele frequencies on sex chromosomes, if famfile provided
     if record.chrom in sex_chroms and not rec_in_par \
@@ -116,18 +241,16 @@ def gather_allele_freqs(record, samples, males_set, females_set, parbt, pop_dict
     # Get allele frequencies per population
     if len(pops) > 0:
         for pop in pops:
-            pop_samps = [
-                s for s in samples if pop_dict.get(s, None) == pop]
-            calc_allele_freq(record, pop_samps, prefix=pop)
+            calc_allele_freq(record, counts[pop], prefix=pop)
             if len(males_set) > 0 and not no_combos:
                 if record.chrom in sex_chroms and not rec_in_par:
-                    calc_allele_freq(record, list([s for s in pop_samps if s in males_set]),
+                    calc_allele_freq(record, counts[pop + '_MALE'],
                                      prefix=pop + '_MALE', hemi=True)
                 else:
-                    calc_allele_freq(record, list([s for s in pop_samps if s in males_set]),
+                    calc_allele_freq(record, counts[pop + '_MALE'],
                                      prefix=pop + '_MALE')
             if len(females_set) > 0 and not no_combos:
-                calc_allele_freq(record, list([s for s in pop_samps if s in females_set]),
+                calc_allele_freq(record, counts[pop + '_FEMALE'],
                                  prefix=pop + '_FEMALE')
 
             # Adjust per-pop allele frequencies on sex chromosomes, if famfile provided
@@ -144,39 +267,19 @@ def gather_allele_freqs(record, samples, males_set, females_set, parbt, pop_dict
     return record
 
 
-def calc_allele_freq(record, samples, prefix=None, hemi=False):
+def calc_allele_freq(record, counts, prefix=None, hemi=False):
     """
-    Computes allele frequencies for a single record based on a list of samples
+    Computes allele frequencies for a single record based on the counts of a
+    sample grouping (see count_genotypes and count_copy_numbers)
     """
 
     # Treat biallelic and multiallelic records differently
     # For biallelic sites, count number of non-ref, non-no-call GTs
     if svu.is_biallelic(record):
 
-        # Get all sample GTs
-        GTs = [record.samples[s]['GT'] for s in samples]
-
         # Count alleles & genotypes
-        AC = 0
-        AN = 0
-        n_alt_count_0 = 0
-        n_alt_count_1 = 0
-        n_alt_count_2 = 0
-        n_gts_with_gt_0_alts = 0  # Used specifically for hemizygous sites
-        for GT in GTs:
-            AN += len([allele for allele in GT if allele !=
-                       '.' and allele is not None])
-            AC += len([allele for allele in GT if allele !=
-                       '.' and allele != 0 and allele is not None])
-            if GT == (0, 0):
-                n_alt_count_0 += 1
-            if len([allele for allele in GT if allele == 0 and allele != '.' and allele is not None]) == 1 \
-                    and len([allele for allele in GT if allele != 0 and allele != '.' and allele is not None]) == 1:
-                n_alt_count_1 += 1
-                n_gts_with_gt_0_alts += 1
-            if len([allele for allele in GT if allele != 0 and allele != '.' and allele is not None]) == 2:
-                n_alt_count_2 += 1
-                n_gts_with_gt_0_alts += 1
+        AN, AC, n_alt_count_0, n_alt_count_1, n_alt_count_2 = [int(x) for x in counts]
+        n_gts_with_gt_0_alts = n_alt_count_1 + n_alt_count_2  # Used specifically for hemizygous sites
 
         # Adjust hemizygous allele number and allele count, if optioned
         if hemi:
@@ -236,22 +339,19 @@ def calc_allele_freq(record, samples, prefix=None, hemi=False):
     # Compute CN_NUMBER, CN_NONREF_COUNT, CN_NONREF_FREQ, and CN_COUNT/CN_FREQ for each copy state
     else:
 
-        # Get all sample CNs and remove Nones
-        CNs_wNones = [record.samples[s]['CN'] for s in samples]
-        CNs = [c for c in CNs_wNones if c is not None and c not in '. NA'.split()]
+        # Trim copy states above the grouping's max observed CN
+        nonzero = np.flatnonzero(counts)
 
-        if len(CNs) == 0:
+        if len(nonzero) == 0:
             nonnull_CNs, nonref_CN_count, nonref_CN_freq = [0] * 3
             CN_dist = (0, )
             CN_freqs = (0, )
         else:
             # Count number of samples per CN and total CNs observed
-            CN_counts = dict(Counter(CNs))
-            nonnull_CNs = len(CNs)
+            CN_dist = [int(x) for x in counts[:nonzero[-1] + 1]]
+            nonnull_CNs = sum(CN_dist)
 
-            # Get max observed CN and enumerate counts/frequencies per CN as list starting from CN=0
-            max_CN = max([int(k) for k, v in CN_counts.items()])
-            CN_dist = [int(CN_counts.get(k, 0)) for k in range(max_CN + 1)]
+            # Enumerate counts/frequencies per CN as list starting from CN=0
             CN_freqs = [round(v / nonnull_CNs, 6) for v in CN_dist]
 
             # Get total non-reference CN counts and freq
@@ -259,8 +359,7 @@ def calc_allele_freq(record, samples, prefix=None, hemi=False):
                 ref_CN = 1
             else:
                 ref_CN = 2
-            nonref_CN_count = sum([int(CN_counts.get(k, 0))
-                                   for k in range(max_CN + 1) if k != ref_CN])
+            nonref_CN_count = sum([v for k, v in enumerate(CN_dist) if k != ref_CN])
             nonref_CN_freq = round(nonref_CN_count / nonnull_CNs, 6)
 
         # Add values to INFO field
@@ -308,7 +407,7 @@ def main():
     samples_list = list(vcf.header.samples)
 
     # Get lists of males and females
-    parbt = pbt.BedTool('', from_string=True)
+    par_index = {}
     if args.famfile is not None:
         famfile = [line.rstrip('\n') for line in open(args.famfile)]
         males_set = set([line.split('\t')[1]
@@ -319,7 +418,7 @@ def main():
         females_set = set(s for s in samples_list if s in females_set)
         sexes = 'MALE FEMALE'.split()
         if args.par is not None:
-            parbt = pbt.BedTool(args.par)
+            par_index = load_par_index(args.par)
 
     else:
         males_set = set()
@@ -340,7 +439,7 @@ def main():
     # Get list of sex chromosomes, if optioned
     if args.allosomes_list is not None:
         sex_chroms = [l.split('\t')[0]
-                      for l in open(allosomes_list).readlines()]
+                      for l in open(args.allosomes_list).readlines()]
     else:
         sex_chroms = 'X Y chrX chrY'.split()
 
@@ -403,7 +502,7 @@ def main():
                     '##INFO=<ID=%s_FREQ_HEMIREF,Number=1,Type=Float,Description="%s hemizygous reference genotype frequency (biallelic sites only).">' % (sex, sex))
                 INFO_ADD.append(
                     '##INFO=<ID=%s_FREQ_HEMIALT,Number=1,Type=Float,Description="%s hemizygous alternate genotype frequency (biallelic sites only).">' % (sex, sex))
-                if len(parbt) > 0:
+                if len(par_index) > 0:
                     INFO_ADD.append(
                         '##INFO=<ID=PAR,Number=0,Type=Flag,Description="Variant overlaps pseudoautosomal region.">')
     if len(pops) > 0:
@@ -491,9 +590,13 @@ def main():
     else:
         fout = pysam.VariantFile(args.fout, 'w', header=vcf.header)
 
+    # Index the samples of each sex & population grouping once
+    prefixes, masks = make_sample_masks(samples_list, males_set, females_set, pop_dict,
+                                        pops, args.no_combos)
+
     # Get allele frequencies for each record & write to new VCF
     for r in vcf.fetch():
-        newrec = gather_allele_freqs(r, samples_list, males_set, females_set, parbt, pop_dict,
+        newrec = gather_allele_freqs(r, prefixes, masks, males_set, females_set, par_index,
                                      pops, sex_chroms, args.no_combos)
         fout.write(newrec)
 
@@ -275,59 +275,116 @@ def make_minGQ_dict(minGQtable, SVLEN_table, AF_table, SVTYPE_table,
     return minGQ_dict
 
 
-# Query master minGQ lookup table
-def _get_minGQ(record, minGQ_dict, SVLEN_table, AF_table, SVTYPE_table,
-               FILTER_table, EV_table, globalMin=0):
-    # Get minGQ_dict indexes
-    if 'SVLEN' in record.info.keys():
-        SVLEN_idx = _lookup_SVLEN_key(record.info['SVLEN'], SVLEN_table)
-    if 'AF' in record.info.keys():
-        AF_idx = _lookup_AF_key(record.info['AF'][0], AF_table)
-    if 'SVTYPE' in record.info.keys():
-        SVTYPE_idx = _lookup_SVTYPE_key(record.info['SVTYPE'], SVTYPE_table)
-    FILTER_query = ','.join(f for f in record.filter)
-    FILTER_idx = _lookup_FILTER_key(FILTER_query, FILTER_table)
-
-    # Get minGQ dict down to EV
-    if SVLEN_idx is not None \
-            and AF_idx is not None \
-            and SVTYPE_idx is not None \
-            and FILTER_idx is not None:
-        minGQ = minGQ_dict[SVLEN_idx][AF_idx][SVTYPE_idx][FILTER_idx]
-    # Otherwise, set all EV categories to globalMin
-    else:
-        minGQ = defaultdict(dict)
-        for key in list(set(EV_table.values())):
-            minGQ[key] = int(globalMin)
-
-    return (minGQ)
-
-
-def apply_minGQ_filter(record, minGQ_dict, SVLEN_table, AF_table, SVTYPE_table,
-                       FILTER_table, EV_table, globalMin=0, maxNCR=0.005,
-                       highNCR_filter="COHORT"):
-    # Get minGQ dict down to EV for this variant
-    minGQ_by_ev = _get_minGQ(record, minGQ_dict, SVLEN_table, AF_table, SVTYPE_table,
-                             FILTER_table, EV_table, globalMin)
-
-    n_samples = len(record.samples)
-
-    bl = 0
-    for s in record.samples:
-        # Don't process homozygous genotypes
-        if record.samples[s]['GT'] == (1, 1):
-            continue
-
-        # Get minGQ cutoff given that sample's evidence
-        EV = record.samples[s]['EV']
-        if isinstance(EV, tuple):
-            EV = ','.join(list(EV))
-        EV_key = _lookup_EV_key(EV, EV_table)
-        minGQ = minGQ_by_ev.get(EV_key, globalMin)
-        if record.samples[s]['GQ'] is not None:
-            if record.samples[s]['GQ'] < minGQ:
-                record.samples[s]['GT'] = (None, None)
-                bl += 1
+# Compile an SVLEN or AF interval dict into sorted breakpoints, with the key of
+# the first interval covering each bin between consecutive breakpoints
+def _make_interval_bins(interval_table):
+    breaks = sorted(set([b for key in interval_table for b in (key.start, key.stop)]))
+    keys = []
+    for b in breaks[:-1]:
+        key = _lookup_SVLEN_key(b, interval_table)
+        keys.append(-1 if key is None else int(key))
+    return np.array(breaks, dtype=np.int64), np.array(keys, dtype=np.int64)
+
+
+# Helper function to index into binned interval table
+def _lookup_bin_key(val, bins):
+    breaks, keys = bins
+    i = np.searchsorted(breaks, val, side='right') - 1
+    if i < 0 or i >= len(keys) or keys[i] < 0:
+        return None
+    return int(keys[i])
+
+
+class MinGQLookup:
+    """
+    Dense minGQ lookup compiled from the master minGQ table
+
+    minGQ cutoffs are stored in an array indexed by SVLEN, AF, SVTYPE, FILTER
+    and EV keys, with globalMin wherever the table has no entry.
+    """
+
+    def __init__(self, minGQ_dict, SVLEN_table, AF_table, SVTYPE_table,
+                 FILTER_table, EV_table, globalMin=0, scalar=10000):
+        self.SVLEN_bins = _make_interval_bins(SVLEN_table)
+        self.AF_bins = _make_interval_bins(AF_table)
+        self.SVTYPE_keys = {k: int(v) for k, v in SVTYPE_table.items()}
+        self.FILTER_keys = {k: int(v) for k, v in FILTER_table.items()}
+        self.FILTER_maxkey = max(self.FILTER_keys.values())
+        self.EV_table = EV_table
+        self.EV_keys = {}
+        self.globalMin = globalMin
+        self.scalar = scalar
+
+        shape = [len(SVLEN_table), len(AF_table),
+                 max(self.SVTYPE_keys.values(), default=-1) + 1,
+                 self.FILTER_maxkey + 1,
+                 max(map(int, EV_table.values())) + 1]
+        self.minGQ = np.full(shape, globalMin, dtype=np.int64)
+        for SVLEN_idx, by_AF in minGQ_dict.items():
+            for AF_idx, by_SVTYPE in by_AF.items():
+                for SVTYPE_idx, by_FILTER in by_SVTYPE.items():
+                    for FILTER_idx, by_EV in by_FILTER.items():
+                        for EV_idx, minGQ in by_EV.items():
+                            self.minGQ[int(SVLEN_idx), int(AF_idx), int(SVTYPE_idx),
+                                       int(FILTER_idx), int(EV_idx)] = minGQ
+
+    def get_minGQ_by_ev(self, record):
+        """
+        Get the minGQ cutoff of each EV key for a record
+        """
+        SVLEN_idx, AF_idx, SVTYPE_idx = None, None, None
+        SVLEN = record.info.get('SVLEN', None)
+        if isinstance(SVLEN, int):
+            SVLEN_idx = _lookup_bin_key(SVLEN, self.SVLEN_bins)
+        if 'AF' in record.info.keys():
+            AF_val = min(int(np.round(self.scalar * float(record.info['AF'][0]))),
+                         self.scalar - 1)
+            AF_idx = _lookup_bin_key(AF_val, self.AF_bins)
+        if 'SVTYPE' in record.info.keys():
+            SVTYPE_idx = self.SVTYPE_keys.get(record.info['SVTYPE'], None)
+        FILTER_idx = min([self.FILTER_keys.get(f, self.FILTER_maxkey) for f in record.filter],
+                         default=self.FILTER_maxkey)
+
+        # Records outside the table get globalMin for all EV categories
+        if SVLEN_idx is None or AF_idx is None or SVTYPE_idx is None:
+            return np.full(self.minGQ.shape[-1], self.globalMin, dtype=np.int64)
+        return self.minGQ[SVLEN_idx, AF_idx, SVTYPE_idx, FILTER_idx]
+
+    def get_EV_keys(self, EVs):
+        """
+        Get the EV key of each sample's evidence, caching each distinct EV
+        """
+        keys = np.empty(len(EVs), dtype=np.int64)
+        for i, EV in enumerate(EVs):
+            key = self.EV_keys.get(EV, None)
+            if key is None:
+                key = int(_lookup_EV_key(','.join(list(EV)) if isinstance(EV, tuple) else EV,
+                                         self.EV_table))
+                self.EV_keys[EV] = key
+            keys[i] = key
+        return keys
+
+
+def apply_minGQ_filter(record, minGQ_lookup, maxNCR=0.005, highNCR_filter="COHORT"):
+    # Get minGQ cutoffs down to EV for this variant
+    minGQ_by_ev = minGQ_lookup.get_minGQ_by_ev(record)
+
+    samples = list(record.samples.values())
+    n_samples = len(samples)
+
+    # Extract GT, GQ and EV of every sample, skipping homozygous genotypes
+    GTs = [s['GT'] for s in samples]
+    idx = np.array([i for i, GT in enumerate(GTs) if GT != (1, 1)], dtype=np.int64)
+    EV_keys = minGQ_lookup.get_EV_keys([samples[i]['EV'] for i in idx])
+    GQs = np.array([samples[i]['GQ'] for i in idx], dtype=object)
+
+    # Null GTs below the minGQ cutoff for each sample's evidence
+    has_GQ = np.not_equal(GQs, None)
+    low_GQ = np.zeros(len(idx), dtype=bool)
+    low_GQ[has_GQ] = GQs[has_GQ].astype(np.int64) < minGQ_by_ev[EV_keys[has_GQ]]
+    for i in idx[low_GQ]:
+        samples[i]['GT'] = (None, None)
+    bl = int(np.count_nonzero(low_GQ))
 
     if n_samples > 0:
         frac_bl = bl / float(n_samples)
@@ -375,13 +432,16 @@ def main():
                         default=False, action='store_true')
     parser.add_argument('--prefix', help='Cohort label to append to NCR FILTER.',
                         default='COHORT', dest='prefix')
+    parser.add_argument('--threads', help='Threads for BGZF compression and ' +
+                        'decompression of the input and output VCFs.',
+                        type=int, default=1)
 
     args = parser.parse_args()
 
     if args.vcf in '- stdin'.split():
-        vcf = pysam.VariantFile(sys.stdin)
+        vcf = pysam.VariantFile(sys.stdin, threads=args.threads)
     else:
-        vcf = pysam.VariantFile(args.vcf)
+        vcf = pysam.VariantFile(args.vcf, threads=args.threads)
 
     # Add HIGH_NOCALL_RATE filter and info field to vcf header
     NEW_FILTER = '##FILTER=<ID=HIGH_{0}_NOCALL_RATE,Description="More than '.format(args.prefix) + \
@@ -396,9 +456,9 @@ def main():
     filter_text = 'HIGH_{0}_NOCALL_RATE'.format(args.prefix)
 
     if args.fout in '- stdout'.split():
-        fout = pysam.VariantFile(sys.stdout, 'w', header=vcf.header)
+        fout = pysam.VariantFile(sys.stdout, 'w', header=vcf.header, threads=args.threads)
     else:
-        fout = pysam.VariantFile(args.fout, 'w', header=vcf.header)
+        fout = pysam.VariantFile(args.fout, 'w', header=vcf.header, threads=args.threads)
 
     # Make dummy lookup tables for SVLEN, AF, SVTYPE, FILTER, and EV
     SVLEN_table = _make_SVLEN_interval_dict(args.minGQtable)
@@ -410,6 +470,8 @@ def main():
     # Make minGQ lookup table
     minGQ_dict = make_minGQ_dict(args.minGQtable, SVLEN_table, AF_table,
                                  SVTYPE_table, FILTER_table, EV_table)
+    minGQ_lookup = MinGQLookup(minGQ_dict, SVLEN_table, AF_table, SVTYPE_table,
+                               FILTER_table, EV_table, globalMin=args.globalMin)
 
     # Iterate over records in vcf and apply filter
     for record in vcf.fetch():
@@ -417,9 +479,7 @@ def main():
         if args.multiallelics or \
             (not args.multiallelics and
              not _is_multiallelic(record)):
-            apply_minGQ_filter(record, minGQ_dict, SVLEN_table, AF_table,
-                               SVTYPE_table, FILTER_table, EV_table,
-                               globalMin=args.globalMin, maxNCR=args.maxNCR,
+            apply_minGQ_filter(record, minGQ_lookup, maxNCR=args.maxNCR,
                                highNCR_filter=filter_text)
 
         if args.cleanAFinfo:
@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+
+import sys
+import argparse
+import time
+import warnings
+import numpy
+import pandas
+from typing import List, Text, Optional, Dict, Tuple, Mapping
+
+from sv_utils import get_truth_overlap
+from sv_utils.get_truth_overlap import Keys, SvTypeCutoffInfo, SvTypeCutoffSelector
+
+
+class Default:
+    num_variants = 200000
+    num_trios = 10
+    num_vapor_samples = 10
+    sample_fraction = 0.3
+    random_seed = 0
+    stat_resolution = 0.05  # round statistics to multiples of this, so that the curves have tied thresholds
+    svtypes = ("DEL", "DUP", "INS", "INV", "BND", "CTX")
+    stat_pairs = (
+        (f"max_{Keys.is_called}_{Keys.overlap_support}", f"max_{Keys.all_overlappers}_{Keys.overlap_support}"),
+        (f"max_{Keys.is_called}_{Keys.reciprocal_overlap}", f"max_{Keys.all_overlappers}_{Keys.reciprocal_overlap}"),
+        (None, f"max_{Keys.all_overlappers}_{Keys.inverse_distance}")
+    )
+
+
+SyntheticOverlapInfo = Tuple[
+    Tuple[Dict[str, pandas.DataFrame], ...], Dict[str, pandas.DataFrame], Dict[str, SvTypeCutoffSelector]
+]
+
+
+def make_synthetic_overlap_info(
+        num_variants: int = Default.num_variants,
+        num_trios: int = Default.num_trios,
+        num_vapor_samples: int = Default.num_vapor_samples,
+        sample_fraction: float = Default.sample_fraction,
+        random_seed: int = Default.random_seed
+) -> SyntheticOverlapInfo:
+    f"""
+    Make random overlap stats in the form used by get_truth_overlap.get_optimal_overlap_cutoffs
+    Args:
+        num_variants: int (default={Default.num_variants})
+            Number of variants in the synthetic test set
+        num_trios: int (default={Default.num_trios})
+            Number of trios with overlap stats
+        num_vapor_samples: int (default={Default.num_vapor_samples})
+            Number of samples with VaPoR data
+        sample_fraction: float (default={Default.sample_fraction})
+            Proportion of variants present in each sample
+        random_seed: int (default={Default.random_seed})
+            Seed for random number generator
+    Returns:
+        trios_overlap_info: Tuple[Dict[str, pandas.DataFrame], ...]
+            Overlap stats for each member of each trio
+        vapor_info: Dict[str, pandas.DataFrame]
+            Map from sample ID to overlap stats with VaPoR probability that each variant is non-ref
+        sv_selectors: Dict[str, SvTypeCutoffSelector]
+            Map from SV category to selector
+    """
+    random_state = numpy.random.RandomState(random_seed)
+    variants = pandas.DataFrame(
+        {
+            Keys.svtype: pandas.Categorical(random_state.choice(Default.svtypes, num_variants)),
+            Keys.svlen: numpy.round(10 ** random_state.uniform(1, 5, num_variants)),
+            Keys.allele_frequency: random_state.beta(0.3, 3.0, num_variants)
+        },
+        index=pandas.Index([f"variant_{index}" for index in range(num_variants)], name=Keys.id)
+    )
+
+    def _get_sample_overlap_stats() -> pandas.DataFrame:
+        _overlaps = variants.loc[random_state.random_sample(num_variants) < sample_fraction].copy()
+        for _stats in Default.stat_pairs:
+            for _stat in _stats:
+                if _stat is not None:
+                    _values = Default.stat_resolution * numpy.round(
+                        random_state.random_sample(len(_overlaps)) / Default.stat_resolution
+                    )
+                    _values[random_state.random_sample(len(_overlaps)) < 0.2] = 0.0
+                    _values[random_state.random_sample(len(_overlaps)) < 0.05] = numpy.nan
+                    _overlaps[_stat] = _values
+        return _overlaps
+
+    trios_overlap_info = tuple(
+        {Keys.father: _get_sample_overlap_stats(), Keys.mother: _get_sample_overlap_stats(),
+         Keys.child: _get_sample_overlap_stats()}
+        for _ in range(num_trios)
+    )
+    vapor_info = {}
+    for sample_index in range(num_vapor_samples):
+        overlaps = _get_sample_overlap_stats()
+        overlaps.insert(0, Keys.vapor_p_non_ref, random_state.choice([0.0, 0.5, 0.995, 1.0], len(overlaps)))
+        vapor_info[f"vapor_sample_{sample_index}"] = overlaps
+    sv_selectors = get_truth_overlap.get_sv_selectors(all_sv_types=set(Default.svtypes))
+    return trios_overlap_info, vapor_info, sv_selectors
+
+
+def get_cutoff_infos_per_selector(
+        overlap_info: SyntheticOverlapInfo
+) -> Dict[Tuple[str, str, Optional[str]], SvTypeCutoffInfo]:
+    """ Get cutoff info for each category and statistic by calling _get_stat_optimal_overlap_cutoffs for each """
+    trios_overlap_info, vapor_info, sv_selectors = overlap_info
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)  # indexing with sets
+        # noinspection PyProtectedMember
+        return {
+            (selector_name, stat_bad, stat_good): get_truth_overlap._get_stat_optimal_overlap_cutoffs(
+                trios_overlap_info, vapor_info, selector, stat_good, stat_bad
+            )
+            for selector_name, selector in sv_selectors.items()
+            for stat_good, stat_bad in Default.stat_pairs
+        }
+
+
+def get_cutoff_infos_shared_sort(
+        overlap_info: SyntheticOverlapInfo
+) -> Dict[Tuple[str, str, Optional[str]], SvTypeCutoffInfo]:
+    """ Get cutoff info for each category and statistic with get_truth_overlap.OverlapCutoffCurves """
+    trios_overlap_info, vapor_info, sv_selectors = overlap_info
+    overlap_cutoff_curves = get_truth_overlap.OverlapCutoffCurves(trios_overlap_info, vapor_info, sv_selectors)
+    return {
+        (selector_name, stat_bad, stat_good): cutoff_info
+        for stat_good, stat_bad in Default.stat_pairs
+        for selector_name, cutoff_info in overlap_cutoff_curves.get_cutoff_infos(
+            sv_selectors, stat_good, stat_bad
+        ).items()
+    }
+
+
+def cutoff_infos_equal(
+        cutoff_infos_1: Mapping[Tuple[str, str, Optional[str]], SvTypeCutoffInfo],
+        cutoff_infos_2: Mapping[Tuple[str, str, Optional[str]], SvTypeCutoffInfo]
+) -> bool:
+    """ Return True if both have the same categories and statistics, with identical cutoffs, precision and f-scores """
+    def _values(_cutoff_info: SvTypeCutoffInfo) -> Tuple:
+        return tuple(getattr(_cutoff_info, slot) for slot in SvTypeCutoffInfo.__slots__ if slot != "selector")
+
+    return cutoff_infos_1.keys() == cutoff_infos_2.keys() and all(
+        _values(cutoff_info) == _values(cutoff_infos_2[key]) for key, cutoff_info in cutoff_infos_1.items()
+    )
+
+
+def benchmark_overlap_cutoffs(
+        num_variants: int = Default.num_variants,
+        num_trios: int = Default.num_trios,
+        num_vapor_samples: int = Default.num_vapor_samples,
+        random_seed: int = Default.random_seed
+):
+    f"""
+    Time finding optimal overlap cutoffs for every SV category and statistic in a synthetic truth set, by calling
+    _get_stat_optimal_overlap_cutoffs for each, and with OverlapCutoffCurves. Check that the results are identical.
+    Args:
+        num_variants: int (default={Default.num_variants})
+            Number of variants in the synthetic test set
+        num_trios: int (default={Default.num_trios})
+            Number of trios with overlap stats
+        num_vapor_samples: int (default={Default.num_vapor_samples})
+            Number of samples with VaPoR data
+        random_seed: int (default={Default.random_seed})
+            Seed for random number generator
+    """
+    overlap_info = make_synthetic_overlap_info(
+        num_variants=num_variants, num_trios=num_trios, num_vapor_samples=num_vapor_samples, random_seed=random_seed
+    )
+    print(f"{num_variants} variants, {num_trios} trios, {num_vapor_samples} VaPoR samples, "
+          f"{len(overlap_info[2])} SV categories, {len(Default.stat_pairs)} statistics")
+    start_time = time.time()
+    cutoff_infos_per_selector = get_cutoff_infos_per_selector(overlap_info)
+    per_selector_time = time.time() - start_time
+    start_time = time.time()
+    cutoff_infos_shared_sort = get_cutoff_infos_shared_sort(overlap_info)
+    shared_sort_time = time.time() - start_time
+    print(f"per-selector: {per_selector_time:.2f} s")
+    print(f"shared sort: {shared_sort_time:.2f} s")
+    print(f"speedup: {per_selector_time / shared_sort_time:.1f}x")
+    print(f"identical cutoffs: {cutoff_infos_equal(cutoff_infos_per_selector, cutoff_infos_shared_sort)}")
+
+
+def __parse_arguments(argv: List[Text]) -> argparse.Namespace:
+    # noinspection PyTypeChecker
+    parser = argparse.ArgumentParser(
+        description="Benchmark finding optimal truth overlap cutoffs on a synthetic truth set",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        prog=argv[0]
+    )
+    parser.add_argument("--num-variants", type=int, default=Default.num_variants,
+                        help="Number of variants in the synthetic test set")
+    parser.add_argument("--num-trios", type=int, default=Default.num_trios,
+                        help="Number of trios with overlap stats")
+    parser.add_argument("--num-vapor-samples", type=int, default=Default.num_vapor_samples,
+                        help="Number of samples with VaPoR data")
+    parser.add_argument("--random-seed", type=int, default=Default.random_seed,
+                        help="Seed for random number generator")
+    return parser.parse_args(argv[1:])
+
+
+def main(argv: Optional[List[Text]] = None):
+    arguments = __parse_arguments(sys.argv if argv is None else argv)
+    benchmark_overlap_cutoffs(
+        num_variants=arguments.num_variants,
+        num_trios=arguments.num_trios,
+        num_vapor_samples=arguments.num_vapor_samples,
+        random_seed=arguments.random_seed
+    )
+
+
+if __name__ == "__main__":
+    main()
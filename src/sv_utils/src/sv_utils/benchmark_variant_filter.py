@@ -1,8 +1,12 @@
 #!/usr/bin/env python
+import os
 import sys
 import datetime
 import argparse
 import json
+import pickle
+import hashlib
+import tempfile
 import warnings
 import textwrap
 import numpy
@@ -12,7 +16,7 @@ import pandas
 from matplotlib import pyplot
 from matplotlib.backends.backend_pdf import PdfPages
 
-from sv_utils import common, plotting, genomics_io, pedigree_tools, get_truth_overlap
+from sv_utils import common, plotting, genomics_io, pedigree_tools, get_truth_overlap, parallel_tools
 from sv_utils.get_truth_overlap \
     import SampleConfidentVariants, ConfidentVariants, PrecisionRecallCurve, SvTypeCutoffSelector
 
@@ -59,6 +63,13 @@ class Keys:
     name = genomics_io.BedKeys.name
     allele_frequency = "allele_frequency"
     het_proportion = "het_proportion"
+    # keys for per-variant genotype counts
+    num_ref_genotypes = "num_ref_genotypes"
+    num_het_genotypes = "num_het_genotypes"
+    num_homvar_genotypes = "num_homvar_genotypes"
+    num_non_ref_genotypes = "num_non_ref_genotypes"
+    num_called_genotypes = "num_called_genotypes"
+    num_variant_alleles = "num_variant_alleles"
     # keys for which figures to make
     precision_recall = "precision-recall"
     inheritance = "inheritance"
@@ -95,6 +106,8 @@ class Default:
     histogram_width = 0.9
     make_figures = _all_make_figures
     sv_selector_size_ranges = get_truth_overlap.Default.sv_selector_size_ranges
+    num_jobs = 1  # number of processes loading data sets. If < 0, use all available processes
+    cache_dir = None  # directory for caching loaded data sets. If None, don't cache
 
 
 def log(text: str):
@@ -188,13 +201,16 @@ class TruthData:
             we are confident are good (definitely present) or bad (definitely not present) for that particular sample
         pedigree_file_info: PedigreeFileInfo
             Class with info on relatedness of samples
+        pedigree_files: Tuple[str, ...]
+            Files that pedigree_file_info was loaded from
         overall_confident_variants: SampleConfidentVariants:
             SampleConfidentVariants object that holds variant IDs for variants that overall we are sure are good or bad.
     """
-    __slots__ = ("confident_variants", "pedigree_file_info", "_overall_confident_variants")
+    __slots__ = ("confident_variants", "pedigree_file_info", "pedigree_files", "_overall_confident_variants")
 
     def __init__(self, overlap_results_file: str, pedigree_files: Optional[Collection[str]] = None):
         self.confident_variants = TruthData.load_confident_variants(overlap_results_file)
+        self.pedigree_files = () if pedigree_files is None else tuple(pedigree_files)
         self.pedigree_file_info = None if (pedigree_files is None or not pedigree_files) \
             else pedigree_tools.PedigreeFileInfo.load(pedigree_files)
         self._overall_confident_variants = None
@@ -408,7 +424,7 @@ class ScoresDataSet:
     static from_json() function.
     """
     __slots__ = ("vcfs", "scores_sources", "label", "scores", "allele_counts", "inheritance_stats", "metrics",
-                 "category", "_num_called_genotypes")
+                 "category", "_genotype_counts")
 
     def __init__(
             self,
@@ -420,7 +436,7 @@ class ScoresDataSet:
             inheritance_stats: Optional[pandas.DataFrame] = None,
             metrics: Optional[pandas.DataFrame] = None,
             category: str = Keys.all_variant_types,
-            num_called_genotypes: Optional[pandas.Series] = None
+            genotype_counts: Optional[pandas.DataFrame] = None
     ):
         """
 
@@ -434,6 +450,8 @@ class ScoresDataSet:
             inheritance_stats:
             metrics:
             category:
+            genotype_counts:
+                Per-variant counts of genotypes by allele count, computed from allele_counts if not supplied
         """
         self.vcfs = (vcfs,) if isinstance(vcfs, str) else tuple(vcfs)
         self.scores_sources = scores_sources
@@ -443,13 +461,31 @@ class ScoresDataSet:
         self.inheritance_stats = inheritance_stats
         self.metrics = metrics
         self.category = category
-        self._num_called_genotypes = num_called_genotypes
+        self._genotype_counts = genotype_counts
 
     @staticmethod
     def from_json(
             json_file: str,
             truth_data: Optional[TruthData] = None,
+            num_jobs: int = Default.num_jobs,
+            cache_dir: Optional[str] = Default.cache_dir
     ) -> List["ScoresDataSet"]:
+        f"""
+        Get ScoresDataSets described by json file. If truth_data is supplied, load them, along with their genotype
+        counts and inheritance stats.
+        Args:
+            json_file: str
+                Path to json file with object mapping from data set label to object describing the data set
+            truth_data: Optional[TruthData] (default=None)
+                If supplied, load the data sets. Otherwise return them unloaded.
+            num_jobs: int (default={Default.num_jobs})
+                Number of processes loading data sets in parallel. If < 0, use all available processes.
+            cache_dir: Optional[str] (default={Default.cache_dir})
+                If supplied, save loaded data sets to this directory, and reuse them if their inputs are unchanged.
+        Returns:
+            scores_data_sets: List[ScoresDataSet]
+                One data set for each ScoresSource of each data set in the json file
+        """
         with open(json_file, 'rb') as f_in:
             all_data_sets_info = json.load(f_in)
         unloaded_data_sets = [
@@ -463,12 +499,90 @@ class ScoresDataSet:
         ]
         if truth_data is None:
             return unloaded_data_sets
-        else:
-            return [
-                loaded_data_set
+        load_kwargs = dict(pedigree_file_info=truth_data.pedigree_file_info,
+                           pedigree_files=truth_data.pedigree_files, cache_dir=cache_dir)
+        num_jobs = min(common.num_jobs_to_use(num_jobs), len(unloaded_data_sets))
+        if num_jobs <= 1:
+            loaded_data_sets = (
+                ScoresDataSet._load_data_cached(unloaded_data_set, **load_kwargs)
                 for unloaded_data_set in unloaded_data_sets
-                for loaded_data_set in unloaded_data_set.load_data()
-            ]
+            )
+        else:
+            loaded_data_sets = parallel_tools.parmap(
+                ScoresDataSet._load_data_cached, unloaded_data_sets, n_jobs=num_jobs, update_time=None,
+                kwargs=load_kwargs
+            )
+        return [
+            loaded_data_set
+            for data_set_loaded_data_sets in loaded_data_sets
+            for loaded_data_set in data_set_loaded_data_sets
+        ]
+
+    @staticmethod
+    def _get_file_identity(file_name: str) -> Dict[str, Union[str, int]]:
+        """ Get values that change if the file is replaced """
+        file_name = os.path.realpath(file_name)
+        stat = os.stat(file_name)
+        return {"file": file_name, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+    def _get_cache_key(self, pedigree_files: Collection[str]) -> str:
+        """
+        Get key identifying the inputs to loading this (unloaded) data set: its label, scores sources, and the identity
+        of every file that is read to load it and compute its stats.
+        """
+        key_info = {
+            "label": self.label,
+            "vcfs": [ScoresDataSet._get_file_identity(vcf) for vcf in self.vcfs],
+            "scores_sources": {
+                source_label: {
+                    "score_files": None if scores_source.score_files is None else
+                    [ScoresDataSet._get_file_identity(score_file) for score_file in scores_source.score_files],
+                    "score_property": scores_source.score_property,
+                    "passing_score": scores_source.passing_score
+                }
+                for source_label, scores_source in self.scores_sources.items()
+            },
+            "pedigree_files": [ScoresDataSet._get_file_identity(pedigree_file) for pedigree_file in pedigree_files],
+            "use_copy_number": Default.use_copy_number,
+            "use_cn": Default.use_cn
+        }
+        return hashlib.sha1(json.dumps(key_info, sort_keys=True).encode()).hexdigest()
+
+    def _load_data_cached(
+            self,
+            pedigree_file_info: Optional[pedigree_tools.PedigreeFileInfo],
+            pedigree_files: Collection[str],
+            cache_dir: Optional[str] = Default.cache_dir
+    ) -> List["ScoresDataSet"]:
+        """
+        Load data sets and compute their genotype counts and inheritance stats. If cache_dir is supplied, reuse data
+        sets saved there by a previous load with identical inputs, or save them for future use.
+        """
+        if cache_dir is None:
+            cache_file = None
+        else:
+            cache_file = os.path.join(cache_dir, f"{self._get_cache_key(pedigree_files)}.pickle")
+            if os.path.isfile(cache_file):
+                log(f"loading {self.label} from cache {cache_file}")
+                with open(cache_file, 'rb') as f_in:
+                    return pickle.load(f_in)
+        log(f"loading {self.label} ...")
+        loaded_data_sets = [
+            loaded_data_set.get_genotype_stats(pedigree_file_info) for loaded_data_set in self.load_data()
+        ]
+        if cache_file is not None:
+            # write to a temporary file and move it into place, so that no partially written file is ever loaded
+            os.makedirs(cache_dir, exist_ok=True)
+            temp_fd, temp_file = tempfile.mkstemp(prefix=".", suffix=".pickle", dir=cache_dir)
+            try:
+                with os.fdopen(temp_fd, 'wb') as f_out:
+                    pickle.dump(loaded_data_sets, f_out, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temp_file, cache_file)
+            except BaseException:
+                os.remove(temp_file)
+                raise
+        log(f"COMPLETE: loading {self.label}")
+        return loaded_data_sets
 
     @staticmethod
     def _load_vcf_data(
@@ -573,8 +687,7 @@ class ScoresDataSet:
             inheritance_stats=None if self.inheritance_stats is None else self.inheritance_stats[variant_is_wanted],
             metrics=self.metrics.loc[variant_is_wanted],
             category=self.category if new_category is None else new_category,
-            num_called_genotypes=None if self._num_called_genotypes is None
-            else self._num_called_genotypes.lloc[variant_is_wanted]
+            genotype_counts=None if self._genotype_counts is None else self._genotype_counts.loc[variant_is_wanted]
         )
 
     def select_category(
@@ -621,31 +734,38 @@ class ScoresDataSet:
         # noinspection PyTypeChecker,PyUnresolvedReferences
         return (self.allele_counts > 0).sum(axis=0, skipna=True)
 
+    @property
+    def genotype_counts(self) -> pandas.DataFrame:
+        if self._genotype_counts is None:
+            self._genotype_counts = ScoresDataSet._get_genotype_counts(
+                ScoresDataSet._dataframe_to_numpy(self.allele_counts, numpy_dtype=numpy.int8),
+                index=self.allele_counts.index
+            )
+        return self._genotype_counts
+
     @property
     def num_ref_genotypes(self) -> pandas.Series:
-        return (self.allele_counts == 0).sum(axis=1, skipna=True)
+        return self.genotype_counts[Keys.num_ref_genotypes]
 
     @property
     def num_het_genotypes(self) -> pandas.Series:
-        return (self.allele_counts == 1).sum(axis=1, skipna=True)
+        return self.genotype_counts[Keys.num_het_genotypes]
 
     @property
     def num_homvar_genotypes(self) -> pandas.Series:
-        return (self.allele_counts == 2).sum(axis=1, skipna=True)
+        return self.genotype_counts[Keys.num_homvar_genotypes]
 
     @property
     def num_non_ref_genotypes(self) -> pandas.Series:
-        return (self.allele_counts > 0).sum(axis=1, skipna=True)
+        return self.genotype_counts[Keys.num_non_ref_genotypes]
 
     @property
     def num_called_genotypes(self) -> pandas.Series:
-        if self._num_called_genotypes is None:
-            self._num_called_genotypes = self.allele_counts.shape[1] - (self.allele_counts.isna()).sum(axis=1)
-        return self._num_called_genotypes
+        return self.genotype_counts[Keys.num_called_genotypes]
 
     @property
     def num_variant_alleles(self) -> pandas.Series:
-        return self.allele_counts.sum(axis=1, skipna=True)
+        return self.genotype_counts[Keys.num_variant_alleles]
 
     @property
     def allele_frequency(self) -> pandas.Series:
@@ -675,12 +795,46 @@ class ScoresDataSet:
             return ScoresDataSet(
                 vcfs=self.vcfs, scores_sources=self.scores_sources, label=self.label, scores=self.scores,
                 allele_counts=allele_counts, inheritance_stats=None, metrics=self.metrics, category=self.category,
-                num_called_genotypes=None
+                genotype_counts=None
             )
 
+    @staticmethod
+    def _dataframe_to_numpy(samples_df: pandas.DataFrame, numpy_dtype: Union[numpy.dtype, type]) -> numpy.ndarray:
+        """
+        Get (num_variants x num_samples) numpy array with values from samples_df, setting null values to the min
+        allowed value for numpy_dtype
+        """
+        null_value = get_dtype_info(numpy_dtype).min
+        return samples_df.to_numpy(dtype=numpy_dtype, na_value=null_value)
+
+    @staticmethod
+    def _get_trio_indices(
+            pedigree_file_info: pedigree_tools.PedigreeFileInfo,
+            sample_ids: Sequence[str]
+    ) -> (numpy.ndarray, List[str]):
+        """
+        Get (num_trios x 3) array with the indices in sample_ids of the proband, father, and mother of each trio with
+        all members present in sample_ids, and the list of trio proband IDs
+        """
+        sample_indices = {sample_id: index for index, sample_id in enumerate(sample_ids)}
+        trio_lines = [
+            pedigree_line for pedigree_line in pedigree_file_info.pedigree_lines
+            if not pedigree_line.any_unknown and all(sample_id in sample_indices
+                                                     for sample_id in pedigree_line.trio_ids)
+        ]
+        trio_indices = numpy.array(
+            [
+                [sample_indices[pedigree_line.proband_id], sample_indices[pedigree_line.father_id],
+                 sample_indices[pedigree_line.mother_id]]
+                for pedigree_line in trio_lines
+            ],
+            dtype=numpy.intp
+        ).reshape(len(trio_lines), 3)
+        return trio_indices, [pedigree_line.proband_id for pedigree_line in trio_lines]
+
     @staticmethod
     def _dataframe_to_trio_3d_numpy(
-            truth_data: "TruthData",
+            pedigree_file_info: pedigree_tools.PedigreeFileInfo,
             samples_df: pandas.DataFrame,
             numpy_dtype: Union[numpy.dtype, type]
     ) -> (numpy.ndarray, List[str]):
@@ -689,59 +843,51 @@ class ScoresDataSet:
         3rd dimension (individual trios) and pandas provides no way to do this. Switching to numpy gives a big
         speed-up, and if needed we can move the final results into a pandas DataFrame basically for free
         Args:
-            truth_data: TruthData
-
-            samples_df:
-            numpy_dtype:
-
+            pedigree_file_info: PedigreeFileInfo
+                Pedigree with trios
+            samples_df: pandas.DataFrame
+                Table with rows corresponding to variants and columns corresponding to samples
+            numpy_dtype: Union[numpy.dtype, type]
+                Type of returned array. Null values are set to the min allowed value for this type.
         Returns:
+            numpy_trios_tensor: numpy.ndarray
+                (num_variants x num_trios x 3) array of values for (proband, father, mother) of each trio
+            trio_probands: List[str]
+                Proband ID for each trio
+        """
+        trio_indices, trio_probands = ScoresDataSet._get_trio_indices(pedigree_file_info, samples_df.columns)
+        return ScoresDataSet._dataframe_to_numpy(samples_df, numpy_dtype=numpy_dtype)[:, trio_indices], trio_probands
 
+    @staticmethod
+    def _get_genotype_counts(allele_counts: numpy.ndarray, index: pandas.Index) -> pandas.DataFrame:
         """
-        sample_ids = set(samples_df.columns)
-        num_variants = samples_df.shape[0]
-        trio_probands = [
-            pedigree_line.proband_id for pedigree_line in truth_data.pedigree_file_info.pedigree_lines
-            if not pedigree_line.any_unknown and all(sample_id in sample_ids for sample_id in pedigree_line.trio_ids)
-        ]
-        num_trios = len(trio_probands)
-        numpy_trios_tensor = numpy.empty((num_variants, num_trios, 3), dtype=numpy_dtype)
-        trio_ind = 0
-        null_value = get_dtype_info(numpy_dtype).min  # set null value to the min allowed value for this dtype
-        for pedigree_line in truth_data.pedigree_file_info.pedigree_lines:
-            if pedigree_line.any_unknown or not all(sample_id in sample_ids for sample_id in pedigree_line.trio_ids):
-                continue
-            numpy_trios_tensor[:, trio_ind, 0] = numpy.where(
-                samples_df[pedigree_line.proband_id].isna(), null_value, samples_df[pedigree_line.proband_id]
-            )
-            numpy_trios_tensor[:, trio_ind, 1] = numpy.where(
-                samples_df[pedigree_line.father_id].isna(), null_value, samples_df[pedigree_line.father_id]
-            )
-            numpy_trios_tensor[:, trio_ind, 2] = numpy.where(
-                samples_df[pedigree_line.mother_id].isna(), null_value, samples_df[pedigree_line.mother_id]
-            )
-            trio_ind += 1
-        return numpy_trios_tensor, trio_probands
+        Count genotypes of each variant by allele count, from (num_variants x num_samples) allele counts array with
+        no-calls set to negative values
+        """
+        is_non_ref = allele_counts > 0
+        return pandas.DataFrame(
+            {
+                Keys.num_ref_genotypes: (allele_counts == 0).sum(axis=1),
+                Keys.num_het_genotypes: (allele_counts == 1).sum(axis=1),
+                Keys.num_homvar_genotypes: (allele_counts == 2).sum(axis=1),
+                Keys.num_non_ref_genotypes: is_non_ref.sum(axis=1),
+                Keys.num_called_genotypes: (allele_counts >= 0).sum(axis=1),
+                Keys.num_variant_alleles: allele_counts.sum(axis=1, where=is_non_ref, dtype=numpy.int64)
+            },
+            index=index
+        )
 
-    def _get_trio_categories(
-            self,
-            truth_data: "TruthData"
-    ) -> Dict[str, pandas.DataFrame]:
+    @staticmethod
+    def _get_trio_categories(trio_acs: numpy.ndarray) -> Dict[str, numpy.ndarray]:
         f"""
-        return boolean pandas.DataFrame (with variant_ids for index and trio_proband_ids as columns) that indicates
-        whether each trio is
+        return boolean (num_variants x num_trios) numpy arrays that indicate whether each trio is
             {Keys.num_trios}: "testable", aka every member is called
             {Keys.de_novo}: testable and inheritance pattern is de-novo
             {Keys.mendelian}: testable and inheritance pattern is mendelian
             {Keys.other}: testable and inheritance pattern is non-mendelian and not de-novo
+        trio_acs is the num_variants x num_trios x 3 tensor of allele counts from _dataframe_to_trio_3d_numpy, with
+        negative values for no-calls
         """
-        # briefly use 3D numpy array instead of pandas DataFrame, because we want to use vectorized reduction along the
-        # 3rd dimension (individual trios) and pandas provides no way to do this. Switching to numpy gives a big
-        # speed-up, and we can move the final results into a pandas DataFrame basically for free
-        # form num_variants x num_trios x 3 tensor of allele counts, reserving -1 for no-calls
-        trio_acs, trio_probands = ScoresDataSet._dataframe_to_trio_3d_numpy(
-            truth_data=truth_data, samples_df=self.allele_counts, numpy_dtype=numpy.int8
-        )
-
         # testable if all members of a trio are defined, and at least one is called
         testable = numpy.logical_and(
             numpy.logical_and.reduce(trio_acs >= 0, axis=2),
@@ -762,24 +908,51 @@ class ScoresDataSet:
         )
         other_non_mendelian = numpy.logical_and(testable, numpy.logical_not(numpy.logical_or(de_novo, mendelian)))
         return {
-            Keys.num_trios: pandas.DataFrame(testable, columns=trio_probands, index=self.allele_counts.index),
-            Keys.de_novo: pandas.DataFrame(de_novo, columns=trio_probands, index=self.allele_counts.index),
-            Keys.mendelian: pandas.DataFrame(mendelian, columns=trio_probands, index=self.allele_counts.index),
-            Keys.other: pandas.DataFrame(other_non_mendelian, columns=trio_probands, index=self.allele_counts.index)
+            Keys.num_trios: testable,
+            Keys.de_novo: de_novo,
+            Keys.mendelian: mendelian,
+            Keys.other: other_non_mendelian
         }
 
+    @staticmethod
+    def _sum_trio_categories(trio_acs: numpy.ndarray, index: pandas.Index) -> pandas.DataFrame:
+        """ sum trio categories across trios and put into DataFrame """
+        return pandas.DataFrame(
+            {trio_category: trio_is_category.sum(axis=1)
+             for trio_category, trio_is_category in ScoresDataSet._get_trio_categories(trio_acs).items()},
+            index=index
+        )
+
+    def get_genotype_stats(
+            self,
+            pedigree_file_info: Optional[pedigree_tools.PedigreeFileInfo]
+    ) -> "ScoresDataSet":
+        """
+        Compute genotype counts and (if pedigree_file_info is supplied) inheritance stats, converting allele counts to
+        a numpy array only once
+        """
+        allele_counts = ScoresDataSet._dataframe_to_numpy(self.allele_counts, numpy_dtype=numpy.int8)
+        self._genotype_counts = ScoresDataSet._get_genotype_counts(allele_counts, index=self.allele_counts.index)
+        if pedigree_file_info is not None:
+            trio_indices, __ = ScoresDataSet._get_trio_indices(pedigree_file_info, self.allele_counts.columns)
+            self.inheritance_stats = ScoresDataSet._sum_trio_categories(
+                allele_counts[:, trio_indices], index=self.allele_counts.index
+            )
+        return self
+
     def get_inheritance_stats(
         self,
         truth_data: "TruthData"
     ) -> "ScoresDataSet":
         if truth_data.pedigree_file_info is None:
             return self  # can't calculate anything
-
-        # sum across trios and put into DataFrame
-        self.inheritance_stats = pandas.DataFrame(
-            {trio_category: trio_is_category.sum(axis=1)
-             for trio_category, trio_is_category in self._get_trio_categories(truth_data).items()}
-        )
+        if self.inheritance_stats is None:
+            # not already computed (e.g. when loaded, or before variants were filtered)
+            trio_acs, __ = ScoresDataSet._dataframe_to_trio_3d_numpy(
+                pedigree_file_info=truth_data.pedigree_file_info, samples_df=self.allele_counts,
+                numpy_dtype=numpy.int8
+            )
+            self.inheritance_stats = ScoresDataSet._sum_trio_categories(trio_acs, index=self.allele_counts.index)
         return self
 
     def get_mendelian_violation_curve(
@@ -806,8 +979,36 @@ class ScoresDataSet:
             mendelian_violation_curve: MendelianViolationCurve
                 Object with enough information to plot the wanted mendelian violation rates vs quality score threshold
         """
+        return self.get_category_mendelian_violation_curves(
+            truth_data=truth_data, sv_selectors={self.category: None},
+            plotted_mendelian_violation_keys=plotted_mendelian_violation_keys
+        ).get(self.category, None)
+
+    def get_category_mendelian_violation_curves(
+            self,
+            truth_data: "TruthData",
+            sv_selectors: Mapping[str, Optional[SvTypeCutoffSelector]],
+            plotted_mendelian_violation_keys: Optional[Iterable[str]] = Default.plotted_mendelian_violation_trio_types
+    ) -> Dict[str, "MendelianViolationCurve"]:
+        f"""
+        Compute MendelianViolationCurve (as in get_mendelian_violation_curve) for the variants selected by each of
+        sv_selectors, forming the trio tensors of allele counts and scores only once for all categories.
+        Args:
+            truth_data: TruthData
+                Class containing truth data. Relevant info is the PedigreeFileInfo.
+            sv_selectors: Mapping[str, Optional[SvTypeCutoffSelector]]
+                Map from category to selector for the variants in that category. If the selector is None, use all
+                variants.
+            plotted_mendelian_violation_keys:  Optional[Iterable[str]]
+                (default={Default.plotted_mendelian_violation_trio_types})
+                If supplied, restrict plotting (and computing) curves to only the relevant keys.
+        Returns:
+            mendelian_violation_curves: Dict[str, MendelianViolationCurve]
+                Map from category to MendelianViolationCurve, omitting categories with no scores available. Empty if
+                there is no pedigree in truth_data.
+        """
         if truth_data.pedigree_file_info is None:
-            return None
+            return {}
         column_infos = [get_dtype_info(dt) for dt in set(self.scores.dtypes)]
         min_value = min(column_info.min for column_info in column_infos)
         # for speed purposes, we're not using masked array, just setting nulled values to a low value and using that as
@@ -817,8 +1018,14 @@ class ScoresDataSet:
         )
         # noinspection PyArgumentList
         min_scores = ScoresDataSet._dataframe_to_trio_3d_numpy(
-            truth_data=truth_data, samples_df=self.scores, numpy_dtype=min_type
+            pedigree_file_info=truth_data.pedigree_file_info, samples_df=self.scores, numpy_dtype=min_type
         )[0].min(axis=2)
+        trio_categories = ScoresDataSet._get_trio_categories(
+            ScoresDataSet._dataframe_to_trio_3d_numpy(
+                pedigree_file_info=truth_data.pedigree_file_info, samples_df=self.allele_counts,
+                numpy_dtype=numpy.int8
+            )[0]
+        )
 
         def _numpy_values_to_value_counts(_values: numpy.ndarray) -> pandas.Series:
             """ Get unique set of all non-null score values, and count of number of times each occurs """
@@ -832,15 +1039,29 @@ class ScoresDataSet:
                 # use general purpose routine
                 return pandas.Series(_values).value_counts().sort_index()
 
-        return MendelianViolationCurve.from_trio_category_scores(
-            {
-                category: _numpy_values_to_value_counts(
-                    min_scores.ravel().compress(trios_are_category.values.ravel())
-                )
-                for category, trios_are_category in self._get_trio_categories(truth_data).items()
-            },
-            plotted_mendelian_violation_keys=plotted_mendelian_violation_keys
-        )
+        mendelian_violation_curves = {}
+        for category, selector in sv_selectors.items():
+            if selector is None:
+                category_min_scores, category_trio_categories = min_scores, trio_categories
+            else:
+                is_selected = numpy.asarray(selector(self.metrics), dtype=bool)
+                category_min_scores = min_scores[is_selected]
+                category_trio_categories = {
+                    trio_category: trios_are_category[is_selected]
+                    for trio_category, trios_are_category in trio_categories.items()
+                }
+            violation_curve = MendelianViolationCurve.from_trio_category_scores(
+                {
+                    trio_category: _numpy_values_to_value_counts(
+                        category_min_scores.ravel().compress(trios_are_category.ravel())
+                    )
+                    for trio_category, trios_are_category in category_trio_categories.items()
+                },
+                plotted_mendelian_violation_keys=plotted_mendelian_violation_keys
+            )
+            if violation_curve is not None:
+                mendelian_violation_curves[category] = violation_curve
+        return mendelian_violation_curves
 
     @staticmethod
     def get_good_bad_thresholds(
@@ -1369,18 +1590,13 @@ def get_mendelian_violation_curves(
 
     mendelian_violation_curves_dict = {category: {} for category, __ in iter_categories(sv_selectors)}
     for data_set in scores_data_sets:
-        log(f"get_inheritance_stats({data_set.label}) ...")
-        filtered_data_set = data_set.get_inheritance_stats(truth_data=truth_data)
-        for category, selector in iter_categories(sv_selectors):
-            log(f"\tselect_variants: {category} ...")
-            selected_filtered_data_set = filtered_data_set.select_category(category=category,
-                                                                           sv_type_cutoff_selector=selector)
-            log("\tget violation curve ...")
-            violation_curve = selected_filtered_data_set.get_mendelian_violation_curve(
-                truth_data=truth_data, plotted_mendelian_violation_keys=plotted_mendelian_violation_keys
-            )
-            if violation_curve is not None:
-                mendelian_violation_curves_dict[category][data_set.label] = violation_curve
+        log(f"get violation curves({data_set.label}) ...")
+        # form trio tensors once per data set, and select each category's variants from them
+        for category, violation_curve in data_set.get_category_mendelian_violation_curves(
+                truth_data=truth_data, sv_selectors=dict(iter_categories(sv_selectors)),
+                plotted_mendelian_violation_keys=plotted_mendelian_violation_keys
+        ).items():
+            mendelian_violation_curves_dict[category][data_set.label] = violation_curve
 
     log("COMPLETE: get_mendelian_violation_curves()")
     return {
@@ -2396,11 +2612,13 @@ def load_quality_data(
         pedigree_files: Optional[Collection[str]],
         optimal_overlap_cutoffs_file: str,
         scores_data_json: Optional[str] = None,
-        size_ranges: Mapping[str, Tuple[float, float]] = Default.sv_selector_size_ranges
+        size_ranges: Mapping[str, Tuple[float, float]] = Default.sv_selector_size_ranges,
+        num_jobs: int = Default.num_jobs,
+        cache_dir: Optional[str] = Default.cache_dir
 ) -> (TruthData, Dict[str, SvTypeCutoffSelector], List[ScoresDataSet]):
     truth_data = TruthData(overlap_results_file=overlap_results_file, pedigree_files=pedigree_files)
     scores_data_sets = ScoresDataSet.from_json(
-        scores_data_json, truth_data=truth_data
+        scores_data_json, truth_data=truth_data, num_jobs=num_jobs, cache_dir=cache_dir
     )
     all_sv_types = set.union(*(data_set.all_sv_types for data_set in scores_data_sets))
     sv_selectors = get_truth_overlap.get_sv_selectors(all_sv_types=all_sv_types, size_ranges=size_ranges) \
@@ -2456,6 +2674,12 @@ def __parse_arguments(argv: List[Text]) -> argparse.Namespace:
     parser.add_argument("--size-ranges", type=str, default=_size_ranges_to_arg(Default.sv_selector_size_ranges),
                         help="comma-separated list of size ranges to break down summary of SVs. Each size range is of "
                              "form description:low_size:high_size")
+    parser.add_argument("--num-jobs", "-j", type=int, default=Default.num_jobs,
+                        help="number of processes loading data sets in parallel. If < 0, use all available processes")
+    parser.add_argument("--cache-dir", type=str, default=Default.cache_dir,
+                        help="directory for caching loaded data sets and their genotype stats. Cached data sets are "
+                             "reused when their VCFs, scores files, and pedigree files are unchanged, so figures can "
+                             "be re-made with different size ranges or figure options without re-reading any VCFs")
 
     parsed_arguments = parser.parse_args(argv[1:] if len(argv) > 1 else ["--help"])
 
@@ -2484,7 +2708,9 @@ def main(argv: Optional[List[Text]] = None) -> (pyplot.Figure, pyplot.Figure):
         pedigree_files=arguments.ped_file,
         optimal_overlap_cutoffs_file=arguments.optimal_overlap_cutoffs_file,
         scores_data_json=arguments.scores_data_json,
-        size_ranges=_parse_size_ranges(arguments.size_ranges)
+        size_ranges=_parse_size_ranges(arguments.size_ranges),
+        num_jobs=arguments.num_jobs,
+        cache_dir=arguments.cache_dir
     )
 
     with PdfPages(arguments.figure_save_file) as pdf_writer:
@@ -3,8 +3,14 @@ import io
 import os
 import sys
 import ast
+import json
 import types
+import pickle
+import shutil
+import hashlib
+import tempfile
 import warnings
+import zipfile
 from enum import Enum
 from types import MappingProxyType
 from typing import Text, Union, Tuple, Mapping, Optional, Any, Dict, Callable, Sequence, List, Collection, ValuesView, \
@@ -15,7 +21,7 @@ import pandas.core.dtypes.base
 import pandas.core.dtypes.cast
 import pysam
 
-from sv_utils import common
+from sv_utils import common, parallel_tools
 
 NA = pandas.NA  # missing field_type, allows for nullable integer
 NAType = type(NA)
@@ -29,6 +35,9 @@ VcfPropSpecifier = Optional[Union[Dict[str, str], Sequence[str]]]
 VariantPropertyExtractor = Callable[[pysam.VariantRecord], Optional[EncodedVcfField]]
 GenotypePropertyExtractor = Callable[[pysam.libcbcf.VariantRecordSample], Optional[EncodedVcfField]]
 Genotype = Optional[Tuple[Optional[int], ...]]
+VariantFilter = Callable[[pysam.VariantRecord], bool]
+# (contig, begin, end, first_begin): 0-based half-open region to fetch, and the first begin of records assigned to it
+VcfRegion = Tuple[str, Optional[int], Optional[int], Optional[int]]
 
 
 # monkey-patch warnings to just display the warning
@@ -198,6 +207,11 @@ class Default:
     location_columns = frozenset({Keys.begin, Keys.end, Keys.bnd_end_2, Keys.other_begin, Keys.other_end})
     use_copy_number = False
     use_cn = False  # Note: By the end of CleanVcf, CN/CNQ is identical to RD_CN/RD_GQ when it's present
+    vcf_chunk_size = 10000  # number of records decoded into each block of typed FORMAT arrays
+    vcf_num_jobs = 1  # number of processes decoding regions of an indexed VCF
+    vcf_cache_dir = None  # directory for VcfColumnCache. If None, don't cache VCF columns
+    vcf_cache_size = 20 * 2 ** 30  # maximum size of VcfColumnCache in bytes
+    columnar_suffix = ".cols"  # tables saved to / loaded from files with this extension use the columnar format
 
 
 def _number_more_than_1(vcf_number: Union[str, int]) -> bool:
@@ -209,11 +223,13 @@ def _number_more_than_1(vcf_number: Union[str, int]) -> bool:
     return vcf_number > 1
 
 
-def _get_genotype_extractor(vcf_prop_name: str, header: pysam.VariantHeader) -> GenotypePropertyExtractor:
+def _get_genotype_extractor(
+        vcf_prop_name: str, header: pysam.VariantHeader, encode_dicts: Optional[Dict[str, Dict]] = None
+) -> GenotypePropertyExtractor:
     header_field = header.formats.get(vcf_prop_name)
     field_type, number = header_field.type, header_field.number
     if field_type == VcfFieldTypes.string or _number_more_than_1(number):
-        encode_dict = CategoryPropertyCollator.get_encode_dict(vcf_prop_name)
+        encode_dict = CategoryPropertyCollator.get_encode_dict(vcf_prop_name, encode_dicts=encode_dicts)
 
         def extractor(genotype_record: pysam.libcbcf.VariantRecordSample) -> Optional[EncodedVcfField]:
             return CategoryPropertyCollator.encode(
@@ -227,14 +243,15 @@ def _get_genotype_extractor(vcf_prop_name: str, header: pysam.VariantHeader) ->
 
 
 def _get_variant_extractor(
-        vcf_prop_name: str, header: pysam.VariantHeader, missing_value: Any = Default.missing_value
+        vcf_prop_name: str, header: pysam.VariantHeader, missing_value: Any = Default.missing_value,
+        encode_dicts: Optional[Dict[str, Dict]] = None
 ) -> VariantPropertyExtractor:
     if vcf_prop_name in header.info:
         # get from info
         header_field = header.info.get(vcf_prop_name)
         field_type, number = header_field.type, header_field.number
         if field_type == VcfFieldTypes.string or _number_more_than_1(number):
-            encode_dict = CategoryPropertyCollator.get_encode_dict(vcf_prop_name)
+            encode_dict = CategoryPropertyCollator.get_encode_dict(vcf_prop_name, encode_dicts=encode_dicts)
 
             def extractor(variant_record: pysam.VariantRecord) -> Optional[EncodedVcfField]:
                 return CategoryPropertyCollator.encode(
@@ -246,7 +263,7 @@ def _get_variant_extractor(
                 return variant_record.info.get(vcf_prop_name, None)
     elif vcf_prop_name == VcfKeys.filter:
         # always a tuple of strings
-        encode_dict = CategoryPropertyCollator.get_encode_dict(Keys.filter)
+        encode_dict = CategoryPropertyCollator.get_encode_dict(Keys.filter, encode_dicts=encode_dicts)
 
         def extractor(variant_record: pysam.VariantRecord) -> Optional[EncodedVcfField]:
             filters = tuple(variant_record.filter)
@@ -265,7 +282,7 @@ def _get_variant_extractor(
             raise ValueError(f"Unknown vcf property '{vcf_prop_name}'")
 
         if field_type == VcfFieldTypes.string:
-            encode_dict = CategoryPropertyCollator.get_encode_dict(vcf_prop_name)
+            encode_dict = CategoryPropertyCollator.get_encode_dict(vcf_prop_name, encode_dicts=encode_dicts)
 
             def extractor(variant_record: pysam.VariantRecord) -> Optional[EncodedVcfField]:
                 return CategoryPropertyCollator.encode(
@@ -372,7 +389,10 @@ class CategoryPropertyCollator(VcfPropertyCollator):
         self.ordered = ordered
 
     @staticmethod
-    def get_encode_dict(encode_name: str) -> Dict:
+    def get_encode_dict(encode_name: str, encode_dicts: Optional[Dict[str, Dict]] = None) -> Dict:
+        if encode_dicts is not None:
+            # use a private encoding (e.g. in a worker process), to be merged into the global encoding later
+            return encode_dicts.setdefault(encode_name, {})
         global_name = "_encode_" + encode_name
         if global_name in globals():
             encode_dict = globals()[global_name]
@@ -494,19 +514,27 @@ class IntPropertyCollator(VcfPropertyCollator):
             int_type: type,
             location_columns: Collection[str] = Default.location_columns
     ) -> dtype:
-        try:
-            _has_missing = any(pandas.isna(value) for value in values) if isinstance(values, Tuple) \
-                else pandas.isna(values).any()
-        except AttributeError as attribute_error:
-            common.add_exception_context(attribute_error, f"values={values}")
-            raise
-
-        if _has_missing:
-            min_val = min((value for value in values if not pandas.isna(value)), default=0)
-            max_val = max((value for value in values if not pandas.isna(value)), default=0)
+        if isinstance(values, numpy.ndarray) and values.dtype.kind == 'f':
+            # typed column (e.g. from columnar VCF loading), with NaN for missing values
+            is_missing = numpy.isnan(values)
+            _has_missing = is_missing.any()
+            present_values = values[~is_missing] if _has_missing else values
+            min_val = int(present_values.min()) if present_values.size > 0 else 0
+            max_val = int(present_values.max()) if present_values.size > 0 else 0
         else:
-            min_val = min(values, default=0)
-            max_val = max(values, default=0)
+            try:
+                _has_missing = any(pandas.isna(value) for value in values) if isinstance(values, Tuple) \
+                    else pandas.isna(values).any()
+            except AttributeError as attribute_error:
+                common.add_exception_context(attribute_error, f"values={values}")
+                raise
+
+            if _has_missing:
+                min_val = min((value for value in values if not pandas.isna(value)), default=0)
+                max_val = max((value for value in values if not pandas.isna(value)), default=0)
+            else:
+                min_val = min(values, default=0)
+                max_val = max(values, default=0)
 
         if _is_location_column(prop_name, location_columns=location_columns):
             # ensure that begin and end can handle addition / subtraction with typical-sized other values to avoid
@@ -550,6 +578,9 @@ class FloatPropertyCollator(VcfPropertyCollator):
 
     @staticmethod
     def _float_values_can_be_cast_to_int(float_values: Iterable[float]) -> bool:
+        if isinstance(float_values, numpy.ndarray) and float_values.dtype.kind == 'f':
+            present_values = float_values[~numpy.isnan(float_values)]
+            return bool(numpy.all(present_values % 1 == 0))
         return all(value is None or numpy.isnan(value) or value % 1 == 0 for value in float_values)
 
     @staticmethod
@@ -779,6 +810,172 @@ def _tuple_to_str(val: Any) -> Any:
     return str(val).replace(' ', '') if isinstance(val, tuple) else val
 
 
+def is_columnar_file(data_file: Text) -> bool:
+    """ Return True if data_file's extension selects the columnar format for pandas_to_tsv / tsv_to_pandas """
+    return data_file.endswith(Default.columnar_suffix)
+
+
+class ColumnarTable:
+    """
+    Binary columnar interchange format for DataFrames, an alternative to gzipped TSV that needs no parsing or type
+    inference on load. A table is an uncompressed zip archive holding one .npy member per stored array, so that
+    individual columns can be read without reading the rest of the file, plus:
+        -manifest.json: number of rows, and how each column and index level is stored
+        -labels.pickle: column labels, index names, and DataFrame.attrs (e.g. the sample IDs of vcf_to_pandas output)
+    Columns are stored according to their type:
+        -numpy: the values (object columns, e.g. tuples, are pickled by numpy.save)
+        -categorical: integer codes and categories
+        -masked: values and missing-value mask of nullable (e.g. Int32 or boolean) columns
+        -pickle: any other extension array
+    """
+    manifest_member = "manifest.json"
+    labels_member = "labels.pickle"
+    format_version = 1
+
+    @staticmethod
+    def _write_array(zip_out: zipfile.ZipFile, member: str, values: numpy.ndarray):
+        with zip_out.open(member, 'w', force_zip64=True) as f_out:
+            numpy.lib.format.write_array(f_out, values, allow_pickle=True)
+
+    @staticmethod
+    def _read_array(zip_in: zipfile.ZipFile, member: str) -> numpy.ndarray:
+        with zip_in.open(member, 'r') as f_in:
+            return numpy.lib.format.read_array(f_in, allow_pickle=True)
+
+    @staticmethod
+    def _write_values(
+            zip_out: zipfile.ZipFile, prefix: str, values: Union[numpy.ndarray, pandas.api.extensions.ExtensionArray]
+    ) -> Dict[str, Any]:
+        """ Write one column or index level, and return the manifest entry needed to read it back """
+        if isinstance(values, pandas.Categorical):
+            ColumnarTable._write_array(zip_out, f"{prefix}.codes.npy", values.codes)
+            ColumnarTable._write_array(zip_out, f"{prefix}.categories.npy", values.categories.to_numpy())
+            return {"kind": "categorical", "ordered": bool(values.ordered)}
+        elif isinstance(values, pandas.core.arrays.masked.BaseMaskedArray):
+            numpy_dtype = values.dtype.numpy_dtype
+            ColumnarTable._write_array(
+                zip_out, f"{prefix}.values.npy", values.to_numpy(dtype=numpy_dtype, na_value=numpy_dtype.type(0))
+            )
+            ColumnarTable._write_array(zip_out, f"{prefix}.mask.npy", numpy.asarray(values.isna()))
+            return {"kind": "masked", "dtype": str(values.dtype)}
+        elif isinstance(values, numpy.ndarray):
+            ColumnarTable._write_array(zip_out, f"{prefix}.values.npy", values)
+            return {"kind": "numpy"}
+        else:
+            with zip_out.open(f"{prefix}.pickle", 'w', force_zip64=True) as f_out:
+                pickle.dump(values, f_out, protocol=pickle.HIGHEST_PROTOCOL)
+            return {"kind": "pickle"}
+
+    @staticmethod
+    def _read_values(
+            zip_in: zipfile.ZipFile, prefix: str, entry: Dict[str, Any]
+    ) -> Union[numpy.ndarray, pandas.api.extensions.ExtensionArray]:
+        kind = entry["kind"]
+        if kind == "categorical":
+            categories = pandas.Index(
+                ColumnarTable._read_array(zip_in, f"{prefix}.categories.npy"), tupleize_cols=False
+            )
+            return pandas.Categorical.from_codes(
+                ColumnarTable._read_array(zip_in, f"{prefix}.codes.npy"),
+                dtype=pandas.CategoricalDtype(categories, ordered=entry["ordered"])
+            )
+        elif kind == "masked":
+            return pandas.api.types.pandas_dtype(entry["dtype"]).construct_array_type()(
+                ColumnarTable._read_array(zip_in, f"{prefix}.values.npy"),
+                ColumnarTable._read_array(zip_in, f"{prefix}.mask.npy")
+            )
+        elif kind == "numpy":
+            return ColumnarTable._read_array(zip_in, f"{prefix}.values.npy")
+        elif kind == "pickle":
+            with zip_in.open(f"{prefix}.pickle", 'r') as f_in:
+                return pickle.load(f_in)
+        else:
+            raise ValueError(f"Unknown columnar storage kind: {kind}")
+
+    @staticmethod
+    def save(data_file: Text, df: pandas.DataFrame, write_index: bool = True):
+        """
+        Save df to data_file. If write_index is False, store a RangeIndex in place of df.index.
+        The file is written to a temporary path in the same directory and then moved into place.
+        """
+        manifest = {"format_version": ColumnarTable.format_version, "num_rows": len(df)}
+        index = df.index if write_index else pandas.RangeIndex(len(df))
+        data_dir = os.path.dirname(os.path.abspath(data_file))
+        file_descriptor, temp_file = tempfile.mkstemp(prefix=f".{os.path.basename(data_file)}.", dir=data_dir)
+        os.close(file_descriptor)
+        try:
+            with zipfile.ZipFile(temp_file, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as zip_out:
+                manifest["columns"] = [
+                    ColumnarTable._write_values(zip_out, f"column_{position}", df.iloc[:, position].values)
+                    for position in range(df.shape[1])
+                ]
+                if isinstance(index, pandas.RangeIndex):
+                    manifest["index"] = {"start": index.start, "stop": index.stop, "step": index.step}
+                else:
+                    manifest["index"] = [
+                        ColumnarTable._write_values(zip_out, f"index_{level}", index.get_level_values(level).values)
+                        for level in range(index.nlevels)
+                    ]
+                zip_out.writestr(
+                    ColumnarTable.labels_member,
+                    pickle.dumps((df.columns, list(index.names), dict(df.attrs)), protocol=pickle.HIGHEST_PROTOCOL)
+                )
+                zip_out.writestr(ColumnarTable.manifest_member, json.dumps(manifest))
+            os.replace(temp_file, data_file)
+        except BaseException:
+            if os.path.isfile(temp_file):
+                os.remove(temp_file)
+            raise
+
+    @staticmethod
+    def load(data_file: Text, columns: Optional[Sequence[Any]] = None) -> pandas.DataFrame:
+        """
+        Load DataFrame from data_file. If columns is not None, only read the requested columns, in the requested order.
+        """
+        with zipfile.ZipFile(data_file, 'r') as zip_in:
+            manifest = json.loads(zip_in.read(ColumnarTable.manifest_member).decode(Default.encoding))
+            if manifest["format_version"] != ColumnarTable.format_version:
+                raise ValueError(
+                    f"{data_file} has columnar format version {manifest['format_version']}, expected "
+                    f"{ColumnarTable.format_version}"
+                )
+            column_labels, index_names, attrs = pickle.loads(zip_in.read(ColumnarTable.labels_member))
+            if columns is None:
+                positions = numpy.arange(len(column_labels))
+            else:
+                positions = column_labels.get_indexer_for(list(columns))
+                if (positions < 0).any():
+                    missing_columns = [column for column, position in zip(columns, positions) if position < 0]
+                    raise ValueError(f"{data_file} does not have requested columns: {missing_columns}")
+
+            index_entry = manifest["index"]
+            if isinstance(index_entry, Mapping):
+                index = pandas.RangeIndex(index_entry["start"], index_entry["stop"], index_entry["step"])
+            elif len(index_entry) == 1:
+                index = pandas.Index(
+                    ColumnarTable._read_values(zip_in, "index_0", index_entry[0]), tupleize_cols=False
+                )
+            else:
+                index = pandas.MultiIndex.from_arrays(
+                    [ColumnarTable._read_values(zip_in, f"index_{level}", entry)
+                     for level, entry in enumerate(index_entry)]
+                )
+            index.names = index_names
+
+            df = pandas.DataFrame(
+                {
+                    column_number: ColumnarTable._read_values(
+                        zip_in, f"column_{position}", manifest["columns"][position]
+                    )
+                    for column_number, position in enumerate(positions)
+                },
+                index=index, copy=False
+            )
+        df.columns = column_labels[positions]
+        df.attrs.update(attrs)
+        return df
+
+
 def pandas_to_tsv(
         data_file: Text,
         df: pandas.DataFrame,
@@ -795,6 +992,8 @@ def pandas_to_tsv(
     Save pandas DataFrame into tab-delimited-gzipped file. Notable extra features:
         -Rename columns from internal schema to safe-file schema
         -Shift genomic coordinates from internal origin to save-file origin if different
+        -If data_file ends with {Default.columnar_suffix}, save in ColumnarTable format instead. Column types, tuple
+         values, multi-index columns, and DataFrame.attrs are preserved, and header/encoding options are ignored.
     Args:
         data_file: Text
             Full path to save file
@@ -819,6 +1018,14 @@ def pandas_to_tsv(
         encoding: str (Default = {Default.encoding}
             Encoding to use when writing strings.
     """
+    if is_columnar_file(data_file):
+        ColumnarTable.save(
+            data_file, _remap_columns(
+                shift_origin(df, current_origin=genome_origin, desired_origin=tsv_origin, copy_on_change=True),
+                columns=columns, first_columns=first_columns, copy_on_change=True
+            ), write_index=write_index
+        )
+        return
     if isinstance(df.columns, pandas.MultiIndex):
         raise ValueError("Unable to output multi-index columns as TSV. Manually flatten the column labels first.")
     df = _remap_columns(
@@ -880,8 +1087,8 @@ def pandas_to_bed(
         write_header=write_header, header_start=header_start, write_index=False,
         genome_origin=genome_origin, tsv_origin=bed_origin, encoding=encoding
     )
-    # build index if requested
-    if build_tabix_index:
+    # build index if requested (columnar tables are not tabix-indexable)
+    if build_tabix_index and not is_columnar_file(data_file):
         pysam.tabix_index(data_file, preset="bed", force=True)
 
 
@@ -912,6 +1119,8 @@ def tsv_to_pandas(
            - Use {int_type} for genomic coordinate columns
            - Use smallest possible int for all other int columns
            - Use categoricals for object columns provided the number of categories is < 1/2 the number of rows
+    If data_file ends with {Default.columnar_suffix}, it is loaded as a ColumnarTable: columns keep their saved types
+    (so no compression or literal_eval is done), and if columns is a Sequence only those columns are read.
     Args:
         data_file: Text
             Full path to file
@@ -958,6 +1167,43 @@ def tsv_to_pandas(
 
     if not os.path.isfile(data_file):
         raise ValueError(f"{data_file} does not exist")
+    if is_columnar_file(data_file):
+        df = shift_origin(
+            _remap_columns(
+                ColumnarTable.load(data_file, columns=None if isinstance(columns, Mapping) else columns),
+                columns=columns
+            ), current_origin=tsv_origin, desired_origin=genome_origin
+        )
+    else:
+        df = _read_tsv(data_file, columns=columns, int_type=int_type, missing_value=missing_value,
+                       float_type=float_type, genome_origin=genome_origin, tsv_origin=tsv_origin,
+                       header_start=header_start, require_header=require_header, encoding=encoding,
+                       literal_eval_columns=literal_eval_columns, *args, **kwargs)
+    if Keys.id in df.columns:
+        df.set_index(Keys.id, inplace=True)
+
+    if sort_intervals:
+        sort_intervals_table(df, inplace=True)
+    if log_progress:
+        print(" done", flush=True, file=sys.stderr, end="")
+    return df
+
+
+def _read_tsv(
+        data_file: Text,
+        columns: Union[Sequence[Text], Mapping[Text, Text], None],
+        int_type: type,
+        missing_value: str,
+        float_type: type,
+        genome_origin: int,
+        tsv_origin: int,
+        header_start: str,
+        require_header: bool,
+        encoding: str,
+        literal_eval_columns: Set[str],
+        *args, **kwargs
+) -> pandas.DataFrame:
+    """ Helper for tsv_to_pandas: parse, remap, shift, and compress a tab-delimited-gzipped file """
     # it is *VASTLY* faster to handle header manually, then load remaining file into buffer and call pandas.read_csv
     # on the buffer than it is to load line-by-line with python code.
     header_start = header_start.encode(encoding)
@@ -995,16 +1241,8 @@ def tsv_to_pandas(
     df = shift_origin(
         _remap_columns(df, columns=columns), current_origin=tsv_origin, desired_origin=genome_origin
     )
-    df = compress_types(df, int_type=int_type, float_type=float_type, missing_value=missing_value,
-                        literal_eval_columns=literal_eval_columns)
-    if Keys.id in df.columns:
-        df.set_index(Keys.id, inplace=True)
-
-    if sort_intervals:
-        sort_intervals_table(df, inplace=True)
-    if log_progress:
-        print(" done", flush=True, file=sys.stderr, end="")
-    return df
+    return compress_types(df, int_type=int_type, float_type=float_type, missing_value=missing_value,
+                          literal_eval_columns=literal_eval_columns)
 
 
 def bed_to_pandas(
@@ -1323,6 +1561,446 @@ def drop_trivial_columns_multi_index(variants: pandas.DataFrame) -> pandas.DataF
     return variants
 
 
+def _genotype_storage_dtype(vcf_prop_name: str, header: pysam.VariantHeader) -> numpy.dtype:
+    """
+    Get dtype for storing extracted values of a FORMAT property: codes for categorical properties, otherwise floats
+    with NaN for missing values. (htslib stores FORMAT integers as int32 and floats as float32, so these are exact.)
+    """
+    field_type, number_gt_1 = VcfPropertyCollator.get_field_type_and_number_gt_1(vcf_prop_name, header=header)
+    if field_type == VcfFieldTypes.string or number_gt_1:
+        return numpy.dtype(numpy.int32)
+    elif field_type == VcfFieldTypes.integer:
+        return numpy.dtype(numpy.float64)
+    else:
+        return numpy.dtype(numpy.float32)
+
+
+def _get_vcf_regions(
+        f_in: pysam.VariantFile,
+        num_jobs: int
+) -> List[Optional[VcfRegion]]:
+    """
+    Split an indexed VCF into regions that can be loaded independently. Each contig with records is split into num_jobs
+    windows of equal length. A record belongs to the window containing its start, so concatenating regions in order
+    reproduces the order of the file. If the VCF is not indexed, or only one job is used, return a single region (None)
+    that spans the whole file.
+    """
+    index = getattr(f_in, "index", None)
+    if num_jobs <= 1 or index is None:
+        return [None]
+    regions = []
+    for contig in index:  # contigs with records, in file order
+        length = f_in.header.contigs[contig].length if contig in f_in.header.contigs else None
+        if not length or length < num_jobs:
+            regions.append((contig, None, None, None))
+            continue
+        window = -(-length // num_jobs)
+        regions.extend(
+            (contig, begin, begin + window if begin + window < length else None, begin)
+            for begin in range(0, length, window)
+        )
+    return regions
+
+
+def _parse_region(region: str) -> Tuple[str, Optional[int], Optional[int]]:
+    """
+    Parse samtools-style region ("contig", "contig:begin", or "contig:begin-end", 1-based and inclusive) into 0-based
+    half-open (contig, begin, end)
+    """
+    contig, _, interval = region.rpartition(':')
+    if not contig or not interval.replace(',', '').replace('-', '').isdigit():
+        return region, None, None
+    begin, _, end = interval.replace(',', '').partition('-')
+    return contig, int(begin) - 1, int(end) if end else None
+
+
+def _get_requested_vcf_regions(
+        f_in: pysam.VariantFile,
+        regions: Collection[str]
+) -> List[VcfRegion]:
+    """
+    Convert requested regions into regions to fetch from the VCF index, in file order. Overlapping regions are merged,
+    and records overlapping more than one region are only assigned to the first, so each record is loaded once.
+    """
+    if getattr(f_in, "index", None) is None:
+        raise ValueError("Loading regions of a VCF requires an index (.tbi or .csi)")
+    contig_order = {contig: order for order, contig in enumerate(f_in.header.contigs)}
+    parsed_regions = [_parse_region(region) for region in regions]
+    bad_contigs = {contig for contig, _, _ in parsed_regions if contig not in contig_order}
+    if bad_contigs:
+        raise ValueError(f"Requested regions are on contigs not present in VCF header: {bad_contigs}")
+    merged_regions = []
+    for contig, begin, end in sorted(parsed_regions, key=lambda region: (contig_order[region[0]], region[1] or 0)):
+        previous = merged_regions[-1] if merged_regions else None
+        if previous is not None and previous[0] == contig and (previous[2] is None or (begin or 0) <= previous[2]):
+            previous[2] = None if previous[2] is None or end is None else max(previous[2], end)
+        else:
+            merged_regions.append([contig, begin, end])
+    return [
+        (contig, begin, end, previous[2] if previous is not None and previous[0] == contig else None)
+        for previous, (contig, begin, end) in zip([None] + merged_regions[:-1], merged_regions)
+    ]
+
+
+def _load_vcf_region(
+        region: Optional[VcfRegion],
+        vcf: str,
+        samples: Optional[Tuple[str, ...]],
+        variant_properties: Collection[str],
+        genotype_properties: Collection[str],
+        missing_value: str,
+        chunk_size: int,
+        num_threads: int,
+        variant_ids: Optional[Set[str]] = None,
+        variant_filter: Optional[VariantFilter] = None
+) -> Tuple[List[List[EncodedVcfField]], List[numpy.ndarray], Dict[str, List[Any]]]:
+    """
+    Extract variant and FORMAT properties from one region of a VCF.
+    Records are selected by variant_ids and variant_filter before any properties are extracted from them.
+    FORMAT properties are decoded into typed (num_records x num_samples) arrays, one chunk of records at a time, so
+    memory use is proportional to the data rather than to the number of python objects needed to represent it.
+    Categorical values are encoded with a private encoding, so that regions can be loaded in separate processes.
+    Returns:
+        variant_values: List[List[EncodedVcfField]]
+            Values for each variant property
+        genotype_values: List[numpy.ndarray]
+            (num_records x num_samples) array of values for each FORMAT property
+        encoded_values: Dict[str, List[Any]]
+            For each encoded property, the raw values in order of their code
+    """
+    encode_dicts = {}
+    with pysam.VariantFile(vcf, 'r', threads=num_threads) as f_in:
+        if samples is not None:
+            f_in.subset_samples(samples)
+        num_samples = len(f_in.header.samples)
+        variant_extractors = tuple(
+            _get_variant_extractor(vcf_prop_name, header=f_in.header, missing_value=missing_value,
+                                   encode_dicts=encode_dicts)
+            for vcf_prop_name in variant_properties
+        )
+        genotype_extractors = tuple(
+            _get_genotype_extractor(vcf_prop_name, header=f_in.header, encode_dicts=encode_dicts)
+            for vcf_prop_name in genotype_properties
+        ) if num_samples > 0 else ()
+        genotype_dtypes = tuple(
+            _genotype_storage_dtype(vcf_prop_name, header=f_in.header) for vcf_prop_name in genotype_properties
+        )
+
+        variant_values = [[] for _ in variant_extractors]
+        genotype_chunks = [[] for _ in genotype_extractors]
+
+        def _new_chunk() -> List[numpy.ndarray]:
+            return [numpy.empty((chunk_size, num_samples), dtype=dt) for dt in genotype_dtypes]
+
+        chunk = _new_chunk() if genotype_extractors else []
+        row = 0
+        if region is None:
+            first_begin = None
+            variant_records = f_in.fetch()
+        else:
+            contig, begin, end, first_begin = region
+            variant_records = f_in.fetch(contig, begin, end)
+        for variant_record in variant_records:
+            if first_begin is not None and variant_record.start < first_begin:
+                continue  # belongs to the previous region
+            if variant_ids is not None and variant_record.id not in variant_ids:
+                continue
+            if variant_filter is not None and not variant_filter(variant_record):
+                continue
+            for values, variant_extractor in zip(variant_values, variant_extractors):
+                values.append(variant_extractor(variant_record))
+            if genotype_extractors:
+                genotype_records = tuple(variant_record.samples.itervalues())
+                for chunk_values, genotype_extractor in zip(chunk, genotype_extractors):
+                    chunk_values[row] = [genotype_extractor(genotype_record) for genotype_record in genotype_records]
+                row += 1
+                if row == chunk_size:
+                    for chunks, chunk_values in zip(genotype_chunks, chunk):
+                        chunks.append(chunk_values)
+                    chunk = _new_chunk()
+                    row = 0
+        for chunks, chunk_values in zip(genotype_chunks, chunk):
+            chunks.append(chunk_values[:row])
+
+    genotype_values = [numpy.concatenate(chunks, axis=0) for chunks in genotype_chunks]
+    encoded_values = {encode_name: list(encode_dict.keys()) for encode_name, encode_dict in encode_dicts.items()}
+    return variant_values, genotype_values, encoded_values
+
+
+def _get_global_codes(
+        encoded_values: Dict[str, List[Any]],
+        encode_dicts: Optional[Dict[str, Dict]] = None
+) -> Dict[str, numpy.ndarray]:
+    """
+    Get mapping from private codes to global codes, adding any new values to the global encoding (or to encode_dicts,
+    if supplied)
+    """
+    return {
+        encode_name: numpy.array(
+            [CategoryPropertyCollator.encode(value, CategoryPropertyCollator.get_encode_dict(encode_name, encode_dicts))
+             for value in values],
+            dtype=numpy.int32
+        )
+        for encode_name, values in encoded_values.items()
+    }
+
+
+def _recode_columns(
+        variant_values: List[Sequence[EncodedVcfField]],
+        genotype_values: List[numpy.ndarray],
+        variant_properties: Sequence[str],
+        genotype_properties: Sequence[str],
+        codes: Dict[str, numpy.ndarray]
+) -> Tuple[List[Sequence[EncodedVcfField]], List[numpy.ndarray]]:
+    """ Translate codes of categorical properties using the supplied mapping from old to new codes """
+    variant_values = [
+        codes[vcf_prop_name][numpy.asarray(values, dtype=numpy.int32)].tolist() if vcf_prop_name in codes else values
+        for values, vcf_prop_name in zip(variant_values, variant_properties)
+    ]
+    genotype_values = [
+        codes[vcf_prop_name][values] if vcf_prop_name in codes else values
+        for values, vcf_prop_name in zip(genotype_values, genotype_properties)
+    ]
+    return variant_values, genotype_values
+
+
+def _load_vcf_columns(
+        vcf: str,
+        regions: List[Optional[VcfRegion]],
+        samples: Optional[Tuple[str, ...]],
+        variant_properties: Sequence[str],
+        genotype_properties: Sequence[str],
+        missing_value: str,
+        chunk_size: int,
+        num_jobs: int,
+        num_threads: int,
+        variant_ids: Optional[Set[str]] = None,
+        variant_filter: Optional[VariantFilter] = None
+) -> Tuple[List[Sequence[EncodedVcfField]], List[numpy.ndarray], Dict[str, List[Any]]]:
+    """
+    Load regions of the VCF (in parallel if num_jobs > 1), and concatenate the columns. Categorical values are encoded
+    in order of first appearance in the file, independently of the global encoding.
+    Returns:
+        variant_values: List[Sequence[EncodedVcfField]]
+            Values for each variant property
+        genotype_values: List[numpy.ndarray]
+            (num_samples x num_records) array of values for each FORMAT property
+        encoded_values: Dict[str, List[Any]]
+            For each encoded property, the raw values in order of their code
+    """
+    num_region_jobs = min(num_jobs, len(regions))
+    load_kwargs = dict(vcf=vcf, samples=samples, variant_properties=list(variant_properties),
+                       genotype_properties=list(genotype_properties), missing_value=missing_value,
+                       chunk_size=chunk_size, num_threads=max(1, num_threads // num_region_jobs),
+                       variant_ids=variant_ids, variant_filter=variant_filter)
+    if num_region_jobs <= 1:
+        region_columns = (_load_vcf_region(region, **load_kwargs) for region in regions)
+    else:
+        region_columns = parallel_tools.parmap(
+            _load_vcf_region, regions, n_jobs=num_region_jobs, update_time=None, kwargs=load_kwargs
+        )
+    encode_dicts = {}
+    variant_values = [[] for _ in variant_properties]
+    genotype_values = [[] for _ in genotype_properties]
+    for region_variant_values, region_genotype_values, encoded_values in region_columns:
+        region_variant_values, region_genotype_values = _recode_columns(
+            region_variant_values, region_genotype_values, variant_properties, genotype_properties,
+            codes=_get_global_codes(encoded_values, encode_dicts=encode_dicts)
+        )
+        for values, region_values in zip(variant_values, region_variant_values):
+            values.extend(region_values)
+        for values, region_values in zip(genotype_values, region_genotype_values):
+            values.append(region_values)
+    return (
+        [tuple(values) for values in variant_values],
+        [numpy.concatenate(values).T for values in genotype_values],
+        {encode_name: list(encode_dict.keys()) for encode_name, encode_dict in encode_dicts.items()}
+    )
+
+
+class VcfColumnCache:
+    """
+    On-disk cache of the columns that vcf_to_pandas extracts from VCFs.
+    Each entry holds the columns of one VCF (identified by path, modification time, size, and index) for a set of
+    samples and properties. FORMAT properties are stored as (num_samples x num_records) .npy files, so that later loads
+    memory-map them and only read the requested samples. An entry is reused by any load whose samples and properties it
+    contains, and least-recently used entries are removed when the cache grows beyond max_size bytes.
+    """
+    __slots__ = ("cache_dir", "max_size")
+    manifest_file = "manifest.json"
+    encoded_values_file = "encoded_values.pickle"
+    cache_dir: str
+    max_size: int
+
+    def __init__(self, cache_dir: str, max_size: int = Default.vcf_cache_size):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    @staticmethod
+    def get_vcf_identity(vcf: str) -> Dict[str, Any]:
+        """ Get values that change if the VCF or its index is replaced """
+        vcf = os.path.realpath(vcf)
+        stat = os.stat(vcf)
+        index_stats = [os.stat(vcf + suffix) for suffix in (".tbi", ".csi") if os.path.isfile(vcf + suffix)]
+        return {
+            "vcf": vcf, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size,
+            "index_mtime_ns": [index_stat.st_mtime_ns for index_stat in index_stats]
+        }
+
+    @staticmethod
+    def _get_key(manifest: Dict[str, Any]) -> str:
+        return hashlib.sha1(json.dumps(manifest, sort_keys=True).encode(Default.encoding)).hexdigest()
+
+    def _iter_manifests(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        if not os.path.isdir(self.cache_dir):
+            return
+        for key in os.listdir(self.cache_dir):
+            manifest_file = os.path.join(self.cache_dir, key, VcfColumnCache.manifest_file)
+            try:
+                with open(manifest_file, 'r') as f_in:
+                    yield key, json.load(f_in)
+            except (OSError, ValueError):
+                continue  # not a cache entry, or an entry that is still being written
+
+    def _find_entry(
+            self,
+            vcf_identity: Dict[str, Any],
+            missing_value: str,
+            samples: Sequence[str],
+            properties: Collection[str]
+    ) -> Optional[Tuple[str, Dict[str, Any]]]:
+        for key, manifest in self._iter_manifests():
+            if manifest["identity"] == vcf_identity and manifest["missing_value"] == missing_value \
+                    and set(properties).issubset(manifest["variant_properties"] + manifest["genotype_properties"]) \
+                    and set(samples).issubset(manifest["samples"]):
+                return key, manifest
+        return None
+
+    def load(
+            self,
+            vcf: str,
+            samples: Sequence[str],
+            variant_properties: Sequence[str],
+            genotype_properties: Sequence[str],
+            missing_value: str
+    ) -> Optional[Tuple[List[Sequence[EncodedVcfField]], List[numpy.ndarray], Dict[str, List[Any]]]]:
+        """
+        Load columns for the requested samples and properties (in the form returned by _load_vcf_columns) if they are
+        present in the cache, otherwise return None.
+        """
+        found = self._find_entry(
+            VcfColumnCache.get_vcf_identity(vcf), missing_value=missing_value, samples=samples,
+            properties=tuple(variant_properties) + tuple(genotype_properties)
+        )
+        if found is None:
+            return None
+        key, manifest = found
+        entry_dir = os.path.join(self.cache_dir, key)
+        os.utime(os.path.join(entry_dir, VcfColumnCache.manifest_file))  # mark as recently used
+        with open(os.path.join(entry_dir, VcfColumnCache.encoded_values_file), 'rb') as f_in:
+            encoded_values = {
+                encode_name: values for encode_name, values in pickle.load(f_in).items()
+                if encode_name in variant_properties or encode_name in genotype_properties
+            }
+        variant_values = []
+        for vcf_prop_name in variant_properties:
+            index = manifest["variant_properties"].index(vcf_prop_name)
+            with open(os.path.join(entry_dir, f"variant_{index}.pickle"), 'rb') as f_in:
+                variant_values.append(pickle.load(f_in))
+
+        sample_rows = numpy.array([manifest["samples"].index(sample_id) for sample_id in samples], dtype=numpy.int64)
+        subset_samples = not numpy.array_equal(sample_rows, numpy.arange(len(manifest["samples"])))
+        genotype_values = []
+        for vcf_prop_name in genotype_properties:
+            index = manifest["genotype_properties"].index(vcf_prop_name)
+            values = numpy.load(os.path.join(entry_dir, f"genotype_{index}.npy"), mmap_mode='r')
+            if subset_samples:
+                values = values[sample_rows]
+                if vcf_prop_name in encoded_values:
+                    # re-encode in order of first appearance among the requested samples, as if loaded from the VCF
+                    values, encoded_values[vcf_prop_name] = VcfColumnCache._reencode(
+                        values, encoded_values[vcf_prop_name]
+                    )
+            genotype_values.append(values)
+        return variant_values, genotype_values, encoded_values
+
+    @staticmethod
+    def _reencode(codes: numpy.ndarray, encoded_values: List[Any]) -> Tuple[numpy.ndarray, List[Any]]:
+        """ Re-encode (num_samples x num_records) codes in order of first appearance when reading by record """
+        unique_codes, first_index = numpy.unique(codes.T, return_index=True)
+        unique_codes = unique_codes[numpy.argsort(first_index)]
+        new_codes = numpy.zeros(len(encoded_values), dtype=numpy.int32)
+        new_codes[unique_codes] = numpy.arange(len(unique_codes), dtype=numpy.int32)
+        return new_codes[codes], [encoded_values[code] for code in unique_codes]
+
+    def save(
+            self,
+            vcf: str,
+            samples: Sequence[str],
+            variant_properties: Sequence[str],
+            genotype_properties: Sequence[str],
+            missing_value: str,
+            variant_values: List[Sequence[EncodedVcfField]],
+            genotype_values: List[numpy.ndarray],
+            encoded_values: Dict[str, List[Any]]
+    ):
+        """ Store columns (in the form returned by _load_vcf_columns) in the cache, then evict entries if needed """
+        manifest = {
+            "identity": VcfColumnCache.get_vcf_identity(vcf), "missing_value": missing_value,
+            "samples": list(samples), "variant_properties": list(variant_properties),
+            "genotype_properties": list(genotype_properties)
+        }
+        key = VcfColumnCache._get_key(manifest)
+        entry_dir = os.path.join(self.cache_dir, key)
+        if os.path.isdir(entry_dir):
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        temp_dir = tempfile.mkdtemp(prefix=f".{key}.", dir=self.cache_dir)
+        try:
+            with open(os.path.join(temp_dir, VcfColumnCache.encoded_values_file), 'wb') as f_out:
+                pickle.dump(encoded_values, f_out, protocol=pickle.HIGHEST_PROTOCOL)
+            for index, values in enumerate(variant_values):
+                with open(os.path.join(temp_dir, f"variant_{index}.pickle"), 'wb') as f_out:
+                    pickle.dump(values, f_out, protocol=pickle.HIGHEST_PROTOCOL)
+            for index, values in enumerate(genotype_values):
+                # write through a memory map to store sample-major without another in-memory copy
+                mapped_values = numpy.lib.format.open_memmap(
+                    os.path.join(temp_dir, f"genotype_{index}.npy"), mode='w+', dtype=values.dtype,
+                    shape=values.shape
+                )
+                mapped_values[...] = values
+                mapped_values.flush()
+                del mapped_values
+            manifest["num_bytes"] = sum(
+                os.path.getsize(os.path.join(temp_dir, file_name)) for file_name in os.listdir(temp_dir)
+            )
+            # write manifest last: entries are only visible once they are complete
+            with open(os.path.join(temp_dir, VcfColumnCache.manifest_file), 'w') as f_out:
+                json.dump(manifest, f_out)
+            os.rename(temp_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            if not os.path.isdir(entry_dir):
+                raise
+            return  # another process stored this entry first
+        self.evict(keep=key)
+
+    def evict(self, keep: Optional[str] = None):
+        """ Remove least-recently used entries (other than keep) until the cache is no larger than max_size """
+        entries = []
+        for key, manifest in self._iter_manifests():
+            last_used = os.path.getmtime(os.path.join(self.cache_dir, key, VcfColumnCache.manifest_file))
+            entries.append((last_used, key, manifest["num_bytes"]))
+        cache_size = sum(num_bytes for _, _, num_bytes in entries)
+        for _, key, num_bytes in sorted(entries):
+            if cache_size <= self.max_size:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+            cache_size -= num_bytes
+
+
 def vcf_to_pandas(
         vcf: str,
         samples: Optional[Collection[str]] = None,
@@ -1339,7 +2017,14 @@ def vcf_to_pandas(
         missing_properties_action: ErrorAction = Default.missing_properties_action,
         category_prop_getter_ordered: bool = Default.category_prop_getter_ordered,
         log_progress: bool = Default.log_progress,
-        num_threads: int = common.num_logical_cpus
+        num_threads: int = common.num_logical_cpus,
+        num_jobs: int = Default.vcf_num_jobs,
+        chunk_size: int = Default.vcf_chunk_size,
+        cache_dir: Optional[str] = Default.vcf_cache_dir,
+        cache_size: int = Default.vcf_cache_size,
+        regions: Optional[Collection[str]] = None,
+        variant_ids: Optional[Collection[str]] = None,
+        variant_filter: Optional[VariantFilter] = None
 ) -> pandas.DataFrame:
     f"""
     Load data from VCF into a pandas DataFrame.
@@ -1400,6 +2085,25 @@ def vcf_to_pandas(
             If True, display a few lines to indicate how loading the VCF is proceeding.
         num_threads: int (default={common.num_logical_cpus})
             Use this many threads for decompression while reading the VCF.
+        num_jobs: int (default={Default.vcf_num_jobs})
+            If > 1 and the VCF is indexed, decode regions of the VCF in this many parallel processes.
+        chunk_size: int (default={Default.vcf_chunk_size})
+            Number of records decoded into each block of typed FORMAT arrays.
+        cache_dir: Optional[str] (default={Default.vcf_cache_dir})
+            If not None, keep a VcfColumnCache in this directory: load columns from it when a previous call stored the
+            requested samples and properties of this VCF, otherwise load from the VCF and store the columns.
+        cache_size: int (default={Default.vcf_cache_size})
+            Maximum size in bytes of the cache in cache_dir. Least-recently used entries are removed beyond this size.
+        regions: Optional[Collection[str]] (default=None)
+            If not None, only load variants overlapping these regions ("contig", "contig:begin-end", 1-based and
+            inclusive), fetched with the VCF index.
+        variant_ids: Optional[Collection[str]] (default=None)
+            If not None, only load variants with these IDs.
+        variant_filter: Optional[Callable[[pysam.VariantRecord], bool]] (default=None)
+            If not None, only load variants for which variant_filter(record) is True. It is evaluated before any
+            properties are extracted from the record (e.g. to select by SVTYPE, FILTER, or size). Must be picklable if
+            num_jobs > 1.
+          Loads that select variants by regions, variant_ids, or variant_filter are not cached.
     Returns:
         variants: pandas.DataFrame
             Table with variant data.
@@ -1412,6 +2116,7 @@ def vcf_to_pandas(
     with pysam.VariantFile(vcf, 'r', threads=num_threads) as f_in:
         if samples is None:
             samples = tuple(f_in.header.samples)
+            subset_samples = None
         else:
             samples = set(samples)
             bad_samples = samples.difference(f_in.header.samples)
@@ -1419,6 +2124,7 @@ def vcf_to_pandas(
                 missing_samples_action.handle_error(f"Requested samples are not present in VCF: {bad_samples}")
             samples = tuple(sample for sample in f_in.header.samples if sample in samples)
             f_in.subset_samples(samples)
+            subset_samples = samples
         if wanted_properties is None:
             properties = _get_all_properties(f_in.header)
         else:
@@ -1442,32 +2148,6 @@ def vcf_to_pandas(
             if vcf_prop_name not in genotype_properties
         }
 
-        variant_extractors = tuple(
-            _get_variant_extractor(vcf_prop_name, header=f_in.header, missing_value=missing_value)
-            for vcf_prop_name in variant_properties.keys()
-        )
-        if samples:
-            genotype_extractors = tuple(
-                _get_genotype_extractor(vcf_prop_name, header=f_in.header)
-                for vcf_prop_name in genotype_properties.keys()
-            )
-
-            def _row_extractor(variant_record: pysam.VariantRecord) -> Iterator[EncodedVcfField]:
-                for variant_extractor in variant_extractors:
-                    yield variant_extractor(variant_record)
-                for genotype_record in variant_record.samples.itervalues():
-                    for genotype_extractor in genotype_extractors:
-                        yield genotype_extractor(genotype_record)
-        else:
-            def _row_extractor(variant_record: pysam.VariantRecord) -> Iterator[EncodedVcfField]:
-                for variant_extractor in variant_extractors:
-                    yield variant_extractor(variant_record)
-
-        encoded_rows_iter = (
-            tuple(_row_extractor(variant_record))
-            for variant_record in f_in.fetch()
-        )
-
         property_collators = tuple(
             VcfPropertyCollator.get_collator(
                 vcf_prop_name=vcf_prop_name, column_name=(None, table_prop_name), header=f_in.header,
@@ -1484,12 +2164,45 @@ def vcf_to_pandas(
             for sample_id in samples
             for vcf_prop_name, table_prop_name in genotype_properties.items()
         )
+        load_regions = _get_vcf_regions(f_in, num_jobs=num_jobs) if regions is None \
+            else _get_requested_vcf_regions(f_in, regions=regions)
+
+    load_variant_properties = tuple(variant_properties.keys())
+    load_genotype_properties = tuple(genotype_properties.keys()) if samples else ()
+    select_variants = regions is not None or variant_ids is not None or variant_filter is not None
+    cache = None if cache_dir is None or select_variants else VcfColumnCache(cache_dir, max_size=cache_size)
+    columns = None if cache is None else cache.load(
+        vcf, samples=samples, variant_properties=load_variant_properties,
+        genotype_properties=load_genotype_properties, missing_value=missing_value
+    )
+    if columns is None:
+        columns = _load_vcf_columns(
+            vcf, regions=load_regions, samples=subset_samples, variant_properties=load_variant_properties,
+            genotype_properties=load_genotype_properties, missing_value=missing_value, chunk_size=chunk_size,
+            num_jobs=num_jobs, num_threads=num_threads,
+            variant_ids=None if variant_ids is None else set(variant_ids), variant_filter=variant_filter
+        )
+        if cache is not None:
+            cache.save(vcf, samples=samples, variant_properties=load_variant_properties,
+                       genotype_properties=load_genotype_properties, missing_value=missing_value,
+                       variant_values=columns[0], genotype_values=columns[1], encoded_values=columns[2])
+    variant_values, genotype_values, encoded_values = columns
+    variant_values, genotype_values = _recode_columns(
+        variant_values, genotype_values, load_variant_properties, load_genotype_properties,
+        codes=_get_global_codes(encoded_values)
+    )
 
-        variants = pandas.DataFrame(
-            {property_collator.column_name: property_collator.get_pandas_series(property_values)
-             for property_collator, property_values in zip(property_collators, zip(*encoded_rows_iter))}
-        ).rename_axis(columns=(Keys.sample_id, Keys.property))\
-            .sort_index(axis=1, level=Keys.sample_id)
+    def _iter_property_values() -> Iterator[Sequence[EncodedVcfField]]:
+        yield from variant_values
+        for sample_index in range(len(samples)):
+            for values in genotype_values:
+                yield values[sample_index]
+
+    variants = pandas.DataFrame(
+        {property_collator.column_name: property_collator.get_pandas_series(property_values)
+         for property_collator, property_values in zip(property_collators, _iter_property_values())}
+    ).rename_axis(columns=(Keys.sample_id, Keys.property))\
+        .sort_index(axis=1, level=Keys.sample_id)
 
     if variants[(None, Keys.id)].nunique() == len(variants[(None, Keys.id)]):
         # all IDs are unique, use ID as the index
@@ -211,6 +211,28 @@ def _overlap_support(
     return {Keys.overlap_support: support_proportion}
 
 
+@interval_overlaps.register_overlap_kernel(_overlap_support)
+def _overlap_support_kernel(
+        check_intervals: pandas.DataFrame,
+        eval_intervals: pandas.DataFrame,
+        overlap_pairs: interval_overlaps.OverlapPairs
+) -> Dict[str, numpy.ndarray]:
+    """
+    Batch version of _overlap_support(): find proportion of each eval interval that is overlapped by some check interval
+    """
+    eval_begin, eval_end = interval_overlaps.get_interval_bounds(eval_intervals)
+    support = overlap_pairs.covered_length(*interval_overlaps.get_interval_bounds(check_intervals), eval_begin, eval_end)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        support_proportion = numpy.where(overlap_pairs.counts > 0, support / (eval_end - eval_begin), 0.0)
+    if (support_proportion < 0).any():
+        bad_ind = numpy.flatnonzero(support_proportion < 0)[0]
+        raise ValueError(
+            f"support_proportion={support_proportion[bad_ind]} for \n{eval_intervals.iloc[bad_ind]}\n   and\n"
+            f"{check_intervals.iloc[overlap_pairs.overlappers(bad_ind)]}"
+        )
+    return {Keys.overlap_support: support_proportion}
+
+
 def _load_subset_variant_ids(subset_variant_ids_file: Optional[str] = None) -> Optional[List[str]]:
     if subset_variant_ids_file is None:
         return None
@@ -218,36 +218,50 @@ class PrecisionRecallCurve:
             # noinspection PyTypeChecker
             return PrecisionRecallCurve.empty_curve
 
-        sort_ind = numpy.argsort(thresholds)[::-1] if is_high_cutoff else numpy.argsort(thresholds)
-        thresholds = thresholds.take(sort_ind)
-        recall = numpy.concatenate(
-            (numpy.full(n_good, 1.0 / n_good), numpy.zeros(n_bad))
-        ).take(sort_ind).cumsum()
-        precision = numpy.concatenate(
-            (numpy.ones(n_good), numpy.zeros(n_bad))
-        ).take(sort_ind).cumsum() \
-            / numpy.arange(1, len(sort_ind) + 1)
+        sort_ind = numpy.argsort(thresholds)
+        return PrecisionRecallCurve.from_sorted_thresholds(
+            sorted_thresholds=thresholds.take(sort_ind), is_good=sort_ind < n_good, f_beta=f_beta,
+            is_high_cutoff=is_high_cutoff
+        )
 
+    @staticmethod
+    def from_sorted_thresholds(
+            sorted_thresholds: numpy.ndarray,
+            is_good: numpy.ndarray,
+            f_beta: float = Default.f_beta,
+            is_high_cutoff: bool = True
+    ) -> "PrecisionRecallCurve":
+        """
+        Construct curve from thresholds sorted in ascending order, and boolean array marking which are from good
+        variants. Precision and recall at each distinct threshold come from cumulative counts. For high cutoffs, the
+        curve doesn't depend on the order of tied thresholds. For low cutoffs, it takes the first of tied thresholds,
+        so callers must pass ties in the order from_good_bad_thresholds would sort them.
+        """
+        n_good = numpy.count_nonzero(is_good)
+        n_bad = len(is_good) - n_good
+        if n_good == 0 or n_bad == 0:
+            # noinspection PyTypeChecker
+            return PrecisionRecallCurve.empty_curve
+        is_new_threshold = sorted_thresholds[1:] != sorted_thresholds[:-1]
         if is_high_cutoff:
+            # select from the highest threshold down
+            sorted_thresholds, is_good = sorted_thresholds[::-1], is_good[::-1]
             # de-duplicate thresholds, taking the *LAST* match to a threshold, since it's all-or-nothing if multiple
             # variants match
-            __, de_dup_index = numpy.unique(thresholds[::-1], return_index=True)
-
-            def _de_dup(_arr):
-                return _arr[::-1].take(de_dup_index)[::-1]
+            is_match = numpy.append(is_new_threshold[::-1], True)
         else:
             # de-duplicate thresholds, taking the *FIRST* match to a threshold, since it's all-or-nothing if multiple
             # variants match
-            __, de_dup_index = numpy.unique(thresholds, return_index=True)
-
-            def _de_dup(_arr):
-                return _arr.take(de_dup_index)
-
-        thresholds, recall, precision = _de_dup(thresholds), _de_dup(recall), _de_dup(precision)
+            is_match = numpy.insert(is_new_threshold, 0, True)
+        num_selected = numpy.flatnonzero(is_match) + 1
+        num_good_selected = numpy.cumsum(is_good)[is_match]
+        # recall is the running sum of 1 / n_good for each selected good variant
+        recall = numpy.concatenate(([0.0], numpy.full(n_good, 1.0 / n_good).cumsum())).take(num_good_selected)
+        precision = num_good_selected / num_selected
         # return as a DataFrame for organization purposes
-        return PrecisionRecallCurve.from_arrays(thresholds=thresholds, precision=precision, recall=recall,
-                                                num_good=n_good, num_bad=n_bad, is_sorted=True, f_beta=f_beta,
-                                                is_high_cutoff=is_high_cutoff)
+        return PrecisionRecallCurve.from_arrays(thresholds=sorted_thresholds[is_match], precision=precision,
+                                                recall=recall, num_good=n_good, num_bad=n_bad, is_sorted=True,
+                                                f_beta=f_beta, is_high_cutoff=is_high_cutoff)
 
     def loc(self, indexer: pandas.api.indexers.BaseIndexer) -> "PrecisionRecallCurve":
         # note: don't know that the indexer leaves dataframe sorted, but presumably the point of doing the indexer is
@@ -553,6 +567,86 @@ def quantify_overlap_by_svtype(
     }
 
 
+def _quantify_overlap_pairs(
+        check_intervals: pandas.DataFrame,
+        eval_intervals: pandas.DataFrame,
+        overlap_pairs: interval_overlaps.OverlapPairs,
+        empty_value: float
+) -> Dict[str, numpy.ndarray]:
+    """
+    Batch version of quantify_overlap(): compute overlap statistics for every eval interval from all of its overlapping
+    check intervals. Eval intervals with no overlappers get empty_value.
+    """
+    check_begin, check_end = interval_overlaps.get_interval_bounds(check_intervals)
+    eval_begin, eval_end = interval_overlaps.get_interval_bounds(eval_intervals)
+    eval_inds = overlap_pairs.eval_inds
+    o_begin = check_begin.take(overlap_pairs.check_inds)
+    o_end = check_end.take(overlap_pairs.check_inds)
+    i_begin = eval_begin.take(eval_inds)
+    i_end = eval_end.take(eval_inds)
+
+    support = overlap_pairs.covered_length(check_begin, check_end, eval_begin, eval_end)
+    reciprocal_overlap = (
+        (numpy.minimum(o_end, i_end) - numpy.maximum(o_begin, i_begin)) /
+        (numpy.maximum(o_end - o_begin, i_end - i_begin))
+    )
+    distance = numpy.abs([o_begin - i_begin, o_begin - i_end, o_end - i_begin, o_end - i_end]).min(axis=0)
+
+    has_overlap = overlap_pairs.counts > 0
+    return {
+        Keys.reciprocal_overlap: overlap_pairs.reduce(numpy.maximum, reciprocal_overlap, empty_value),
+        Keys.overlap_support: numpy.where(has_overlap, support / (eval_end - eval_begin), empty_value),
+        Keys.inverse_distance: numpy.where(
+            has_overlap, 1.0 / (1.0 + overlap_pairs.reduce(numpy.minimum, distance, 0)), empty_value
+        )
+    }
+
+
+@interval_overlaps.register_overlap_kernel(quantify_overlap)
+def _quantify_overlap_kernel(
+        check_intervals: pandas.DataFrame,
+        eval_intervals: pandas.DataFrame,
+        overlap_pairs: interval_overlaps.OverlapPairs
+) -> Dict[str, numpy.ndarray]:
+    """ Batch version of quantify_overlap() """
+    return _quantify_overlap_pairs(check_intervals, eval_intervals, overlap_pairs, empty_value=0.0)
+
+
+@interval_overlaps.register_overlap_kernel(quantify_overlap_by_svtype)
+def _quantify_overlap_by_svtype_kernel(
+        check_intervals: pandas.DataFrame,
+        eval_intervals: pandas.DataFrame,
+        overlap_pairs: interval_overlaps.OverlapPairs
+) -> Dict[str, numpy.ndarray]:
+    """
+    Batch version of quantify_overlap_by_svtype(). Statistics for an SVTYPE are missing (NaN) for eval intervals with no
+    overlappers of that SVTYPE.
+    """
+    is_called = numpy.asarray(check_intervals[Keys.is_called], dtype=bool)
+    svtype_codes, svtypes = pandas.factorize(numpy.asarray(check_intervals[Keys.svtype], dtype=object))
+    prefix_overlap_pairs = (
+        (overlap_pairs.subset(is_called.take(overlap_pairs.check_inds)), Keys.is_called),
+        (overlap_pairs, Keys.all_overlappers)
+    )
+    overlap_stats = {
+        f"{prefix}_{k}": v
+        for check_overlap_pairs, prefix in prefix_overlap_pairs
+        for k, v in _quantify_overlap_pairs(check_intervals, eval_intervals, check_overlap_pairs,
+                                            empty_value=0.0).items()
+    }
+    for check_overlap_pairs, prefix in prefix_overlap_pairs:
+        pair_svtype_codes = svtype_codes.take(check_overlap_pairs.check_inds)
+        for svtype_code in numpy.unique(pair_svtype_codes):
+            overlap_stats.update({
+                f"{prefix}_{svtypes[svtype_code]}_{k}": v
+                for k, v in _quantify_overlap_pairs(
+                    check_intervals, eval_intervals, check_overlap_pairs.subset(pair_svtype_codes == svtype_code),
+                    empty_value=numpy.nan
+                ).items()
+            })
+    return overlap_stats
+
+
 def get_test_truth_overlap_stats(
         test_variant_locations: pandas.DataFrame,
         truth_variant_locations: pandas.DataFrame,
@@ -983,7 +1077,24 @@ def _get_stat_optimal_overlap_cutoffs(
     decision_curve_bad = PrecisionRecallCurve.from_good_bad_thresholds(
         good_thresholds=bad_cutoffs, bad_thresholds=good_cutoffs, f_beta=f_beta, is_high_cutoff=False
     )
+    return _get_cutoff_info(
+        selector=selector, stat_good=stat_good, num_good=len(good_cutoffs), decision_curve_good=decision_curve_good,
+        stat_bad=stat_bad, num_bad=len(bad_cutoffs), decision_curve_bad=decision_curve_bad,
+        min_overlap_cutoff_precision=min_overlap_cutoff_precision
+    )
 
+
+def _get_cutoff_info(
+        selector: SvTypeCutoffSelector,
+        stat_good: str,
+        num_good: int,
+        decision_curve_good: PrecisionRecallCurve,
+        stat_bad: str,
+        num_bad: int,
+        decision_curve_bad: PrecisionRecallCurve,
+        min_overlap_cutoff_precision: float
+) -> SvTypeCutoffInfo:
+    """ Choose the optimal "good" and "bad" cutoffs from their precision vs recall curves """
     good_cutoff_point = _choose_cutoff(decision_curve_good, default_cutoff=0.5,
                                        min_overlap_cutoff_precision=min_overlap_cutoff_precision)
     # don't always use for training cutoffs, but final cutoff will always toss things with no overlap
@@ -993,15 +1104,147 @@ def _get_stat_optimal_overlap_cutoffs(
     # noinspection PyTypeChecker
     return SvTypeCutoffInfo(
         selector=selector,
-        stat_good=stat_good, num_good=len(good_cutoffs), cutoff_good=good_cutoff_point.name,
+        stat_good=stat_good, num_good=num_good, cutoff_good=good_cutoff_point.name,
         f_score_good=good_cutoff_point[PrecisionRecallCurve.f_score_key],
         precision_good=good_cutoff_point[PrecisionRecallCurve.precision_key],
-        stat_bad=stat_bad, num_bad=len(bad_cutoffs), cutoff_bad=bad_cutoff_point.name,
+        stat_bad=stat_bad, num_bad=num_bad, cutoff_bad=bad_cutoff_point.name,
         f_score_bad=bad_cutoff_point[PrecisionRecallCurve.f_score_key],
         precision_bad=bad_cutoff_point[PrecisionRecallCurve.precision_key]
     )
 
 
+class OverlapCutoffCurves:
+    """
+    Precision vs recall curves used to find optimal overlap cutoffs, for every SV category and overlap statistic.
+    Equivalent to calling _get_stat_optimal_overlap_cutoffs for each category and statistic, but
+        -rows of the overlap tables that are evidence for good or bad variants are found once, and each selector is
+         evaluated once per table, rather than for every statistic
+        -for each pair of statistics, the values from all the evidence rows are gathered into one contiguous array and
+         sorted once. Each category's rows are then taken from that shared order, and its curves are built from
+         cumulative counts without sorting again.
+    Selectors are evaluated on each table separately, so this relies on them depending only on variant properties
+    (e.g. svtype and svlen), which are the same for a variant in every sample's overlap stats.
+    """
+    __slots__ = ("good_sources", "bad_sources", "good_selected", "bad_selected", "f_beta",
+                 "min_overlap_cutoff_precision")
+    good_sources: List[Tuple[pandas.DataFrame, numpy.ndarray]]  # overlap table, rows with evidence for good variants
+    bad_sources: List[Tuple[pandas.DataFrame, numpy.ndarray]]  # overlap table, rows with evidence for bad variants
+    good_selected: Dict[str, numpy.ndarray]  # map from category to mask selecting its good evidence
+    bad_selected: Dict[str, numpy.ndarray]  # map from category to mask selecting its bad evidence
+    f_beta: float
+    min_overlap_cutoff_precision: float
+
+    def __init__(
+            self,
+            trios_overlap_info: Tuple[Mapping[str, pandas.DataFrame], ...],
+            vapor_info: Mapping[str, pandas.DataFrame],
+            sv_selectors: Mapping[str, SvTypeCutoffSelector],
+            f_beta: float = Default.f_beta,
+            min_overlap_cutoff_precision: float = Default.min_overlap_cutoff_precision,
+            inheritance_af_rareness: float = Default.inheritance_af_rareness,
+            check_some_overlap_key: str = Default.check_some_overlap_key
+    ):
+        self.f_beta = f_beta
+        self.min_overlap_cutoff_precision = min_overlap_cutoff_precision
+        self.good_sources = []
+        self.bad_sources = []
+        for trio in trios_overlap_info:
+            father, mother, child = trio[Keys.father], trio[Keys.mother], trio[Keys.child]
+            # same rules as _get_stat_optimal_overlap_cutoffs:
+            # good SVs: AF < "rareness" threshold AND child has it and at least one parent has it AND both have
+            # non-zero overlap. Then any sample with non-zero overlap has a good cutoff
+            father_has_overlap = (father[check_some_overlap_key] > 0).to_numpy(dtype=bool)
+            mother_has_overlap = (mother[check_some_overlap_key] > 0).to_numpy(dtype=bool)
+            is_good_child_sv = (child[check_some_overlap_key] > 0).to_numpy(dtype=bool) \
+                & (child[Keys.allele_frequency] < inheritance_af_rareness).to_numpy(dtype=bool) \
+                & (child.index.isin(father.index[father_has_overlap]) |
+                   child.index.isin(mother.index[mother_has_overlap]))
+            good_svs = child.index[is_good_child_sv]
+            self.good_sources.extend((
+                (father, numpy.flatnonzero(father.index.isin(good_svs) & father_has_overlap)),
+                (mother, numpy.flatnonzero(mother.index.isin(good_svs) & mother_has_overlap)),
+                (child, numpy.flatnonzero(is_good_child_sv))
+            ))
+            # bad SVs: child has it but parent doesn't
+            self.bad_sources.append(
+                (child, numpy.flatnonzero(~(child.index.isin(father.index) | child.index.isin(mother.index))))
+            )
+        for vapor_variants in vapor_info.values():
+            p_non_ref = vapor_variants[Keys.vapor_p_non_ref].to_numpy()
+            self.good_sources.append((vapor_variants, numpy.flatnonzero(p_non_ref > min_overlap_cutoff_precision)))
+            self.bad_sources.append((vapor_variants, numpy.flatnonzero(p_non_ref < 1.0 - min_overlap_cutoff_precision)))
+
+        selections = {}  # evaluate each selector once per table, even if the table is used by several sources
+
+        def _get_selected(_selector_name: str, _sources: List[Tuple[pandas.DataFrame, numpy.ndarray]]) -> numpy.ndarray:
+            _selected = []
+            for _overlaps, _rows in _sources:
+                _key = (_selector_name, id(_overlaps))
+                if _key not in selections:
+                    selections[_key] = numpy.asarray(sv_selectors[_selector_name](_overlaps), dtype=bool)
+                _selected.append(selections[_key].take(_rows))
+            return numpy.concatenate(_selected) if _selected else numpy.zeros(0, dtype=bool)
+
+        self.good_selected = {
+            selector_name: _get_selected(selector_name, self.good_sources) for selector_name in sv_selectors
+        }
+        self.bad_selected = {
+            selector_name: _get_selected(selector_name, self.bad_sources) for selector_name in sv_selectors
+        }
+
+    @staticmethod
+    def _get_values(stat: Optional[str], sources: List[Tuple[pandas.DataFrame, numpy.ndarray]]) -> numpy.ndarray:
+        """ Gather stat values at the evidence rows of each source. If a table lacks the stat, its values are 0 """
+        values = numpy.concatenate(
+            [
+                overlaps[stat].to_numpy(dtype=numpy.float64).take(rows) if stat in overlaps
+                else numpy.zeros(len(rows))
+                for overlaps, rows in sources
+            ]
+        ) if sources else numpy.zeros(0)
+        # set nan (missing) values to 0, since "missing" only happens if a certain SV type isn't present in the overlap
+        # function, corresponding to 0 overlap support and reciprocal overlap
+        return numpy.nan_to_num(values, nan=0.0, copy=False)
+
+    def get_cutoff_infos(
+            self, sv_selectors: Mapping[str, SvTypeCutoffSelector], stat_good: str, stat_bad: str
+    ) -> Dict[str, SvTypeCutoffInfo]:
+        """
+        Get SvTypeCutoffInfo for every category in sv_selectors for the given pair of statistics, using one shared sort
+        """
+        values = numpy.concatenate(
+            (OverlapCutoffCurves._get_values(stat_good, self.good_sources),
+             OverlapCutoffCurves._get_values(stat_bad, self.bad_sources))
+        )
+        sort_ind = numpy.argsort(values)
+        sorted_values = values.take(sort_ind)
+        num_good_values = sum(len(rows) for _, rows in self.good_sources)
+        sorted_is_good = sort_ind < num_good_values
+        cutoff_infos = {}
+        for selector_name, selector in sv_selectors.items():
+            good_selected, bad_selected = self.good_selected[selector_name], self.bad_selected[selector_name]
+            # taking the category's values in the shared order keeps them sorted
+            sorted_selected = numpy.concatenate((good_selected, bad_selected)).take(sort_ind)
+            category_values = sorted_values[sorted_selected]
+            category_is_good = sorted_is_good[sorted_selected]
+            # the low cutoff curve depends on how argsort orders tied thresholds, so it's built from the same sorted
+            # bad then good thresholds as _get_stat_optimal_overlap_cutoffs uses
+            cutoff_infos[selector_name] = _get_cutoff_info(
+                selector=selector,
+                stat_good=stat_good, num_good=numpy.count_nonzero(good_selected),
+                decision_curve_good=PrecisionRecallCurve.from_sorted_thresholds(
+                    category_values, category_is_good, f_beta=self.f_beta
+                ),
+                stat_bad=stat_bad, num_bad=numpy.count_nonzero(bad_selected),
+                decision_curve_bad=PrecisionRecallCurve.from_good_bad_thresholds(
+                    good_thresholds=category_values[~category_is_good],
+                    bad_thresholds=category_values[category_is_good], f_beta=self.f_beta, is_high_cutoff=False
+                ),
+                min_overlap_cutoff_precision=self.min_overlap_cutoff_precision
+            )
+        return cutoff_infos
+
+
 def get_trios_overlap_info(
         overlap_stats: Dict[str, pandas.DataFrame],
         ped_files: Union[str, Iterable[str]]
@@ -1232,16 +1475,17 @@ def get_optimal_overlap_cutoffs(
             all_stats_linked[base_stat] = (stat, ) + all_stats_linked.get(base_stat, (None, None))[1:]
         else:
             all_stats_linked[base_stat] = all_stats_linked.get(base_stat, (None, None))[:1] + (stat,)
+    overlap_cutoff_curves = OverlapCutoffCurves(
+        trios_overlap_info, vapor_info, sv_selectors, f_beta=f_beta,
+        min_overlap_cutoff_precision=min_overlap_cutoff_precision, inheritance_af_rareness=inheritance_af_rareness
+    )
+    stats_cutoff_infos = [
+        overlap_cutoff_curves.get_cutoff_infos(sv_selectors, stat_good, stat_bad)
+        for (stat_good, stat_bad) in all_stats_linked.values()
+    ]
     overlap_cutoffs = {}
     for selector_name, selector in sv_selectors.items():
-        stats_overlap_cutoff_info = [
-            _get_stat_optimal_overlap_cutoffs(
-                trios_overlap_info, vapor_info, selector, stat_good, stat_bad, f_beta=f_beta,
-                min_overlap_cutoff_precision=min_overlap_cutoff_precision,
-                inheritance_af_rareness=inheritance_af_rareness
-            )
-            for (stat_good, stat_bad) in all_stats_linked.values()
-        ]
+        stats_overlap_cutoff_info = [cutoff_infos[selector_name] for cutoff_infos in stats_cutoff_infos]
         n_good = next((c_i.num_good for c_i in stats_overlap_cutoff_info if c_i.num_good > 0), 0)
         n_bad = next((c_i.num_bad for c_i in stats_overlap_cutoff_info if c_i.num_bad > 0), 0)
         print(f"{selector_name}: {n_good} good, {n_bad} bad")
@@ -1,8 +1,10 @@
 import pandas
 import numpy
 import warnings
+import collections.abc
 from typing \
-    import Optional, Callable, Any, Union, Mapping, List, Tuple, Iterator, Collection, Text, Dict, TypeVar, Iterable
+    import Optional, Callable, Any, Union, Mapping, List, Tuple, Iterator, Collection, Text, Dict, TypeVar, Iterable, \
+    Sequence
 from types import MappingProxyType
 from tqdm.auto import tqdm
 with warnings.catch_warnings():
@@ -28,6 +30,9 @@ IndexChunk = Tuple[numpy.array, Optional[numpy.array]]
 SliceChunk = Tuple[OtherSlice, EvalSlice]
 Chunk = Union[IndexChunk, SliceChunk]
 IndexIntType = numpy.int64
+# OverlapKernel takes check_intervals, eval_intervals, OverlapPairs, and kwargs, and returns a column of results (with
+# one value per eval interval) for each property
+OverlapKernel = Callable[..., Mapping[Text, numpy.ndarray]]
 
 
 class Keys:
@@ -72,6 +77,177 @@ class Default:
         _overlap_required_properties + (
             Keys.id, Keys.svlen, Keys.svtype, Keys.bnd_contig_2, Keys.bnd_end_2, Keys.cpx_intervals, Keys.source
         )
+    use_overlap_kernel = True  # use registered batch kernels in place of per-interval overlap functions
+    shared_memory = parallel_tools.Default.shared_memory  # pass interval tables to workers through shared memory
+    adaptive_schedule = parallel_tools.Default.adaptive_schedule  # schedule overlap tasks largest first, within memory
+
+
+# batch kernels registered as equivalent to per-interval overlap functions
+_overlap_kernels: Dict[OverlapFunc, OverlapKernel] = {}
+
+
+def register_overlap_kernel(func: OverlapFunc) -> Callable[[OverlapKernel], OverlapKernel]:
+    """
+    Decorator to register a batch kernel that computes the same results as overlap function func, for all the
+    intervals in a task at once:
+        kernel(check_intervals, eval_intervals, overlap_pairs, **kwargs) -> Mapping[property_name, numpy.ndarray]
+    where overlap_pairs is an OverlapPairs object listing the check_intervals that overlap each eval interval, and each
+    returned array has one value for each eval interval. apply_interval_overlap_func() will then use the kernel in place
+    of func.
+    """
+    def _register(kernel: OverlapKernel) -> OverlapKernel:
+        _overlap_kernels[func] = kernel
+        return kernel
+    return _register
+
+
+def get_interval_bounds(intervals: pandas.DataFrame) -> Tuple[numpy.ndarray, numpy.ndarray]:
+    """
+    Get begin and end of intervals as plain numpy arrays (interval tables may hold nullable integer columns).
+    """
+    return intervals[Keys.begin].to_numpy(dtype=numpy.int64), intervals[Keys.end].to_numpy(dtype=numpy.int64)
+
+
+class OverlapPairs:
+    """
+    Overlapping (eval, check) interval pairs for one overlap task, in compressed sparse row form: the check intervals
+    that overlap eval interval i are at positions check_inds[offsets[i]:offsets[i + 1]] of check_intervals, in order.
+    Provides vectorized reductions over the overlappers of each eval interval.
+    """
+    __slots__ = ("offsets", "check_inds")
+    offsets: numpy.ndarray
+    check_inds: numpy.ndarray
+
+    def __init__(self, offsets: numpy.ndarray, check_inds: numpy.ndarray):
+        self.offsets = offsets
+        self.check_inds = check_inds
+
+    @staticmethod
+    def from_intervals(
+            check_intervals: pandas.DataFrame,
+            eval_intervals: pandas.DataFrame,
+            exclude_self_overlap: bool = False
+    ) -> "OverlapPairs":
+        """
+        Find all overlapping pairs.
+        Args:
+            check_intervals: pandas.DataFrame
+                Table of Intervals that may overlap Intervals of interest. Should be sorted by (begin, end)
+            eval_intervals: pandas.DataFrame
+                Table of Intervals to evaluate. Should be sorted by (begin, end)
+            exclude_self_overlap: bool (default=False)
+                If True, do not consider an interval to overlap with itself (i.e. with the same index).
+        Returns:
+            overlap_pairs: OverlapPairs
+        """
+        eval_begin, eval_end = get_interval_bounds(eval_intervals)
+        check_begin, check_end = get_interval_bounds(check_intervals)
+        if len(check_intervals) == 0:
+            return OverlapPairs(numpy.zeros(len(eval_intervals) + 1, dtype=IndexIntType),
+                                numpy.empty(0, dtype=IndexIntType))
+        eval_inds, check_inds = OverlapPairs._get_candidates(check_begin, check_end, eval_begin, eval_end)
+        # candidates beginning before the eval interval must end after its begin
+        pair_eval_begin = eval_begin.take(eval_inds)
+        keep = (check_end.take(check_inds) > pair_eval_begin) | (check_begin.take(check_inds) >= pair_eval_begin)
+        if exclude_self_overlap:
+            keep &= check_intervals.index.values.take(check_inds) != eval_intervals.index.values.take(eval_inds)
+        return OverlapPairs(
+            numpy.concatenate(([0], numpy.cumsum(numpy.bincount(eval_inds[keep], minlength=len(eval_intervals)),
+                                                 dtype=IndexIntType))),
+            check_inds[keep]
+        )
+
+    @staticmethod
+    def _get_candidates(
+            check_begin: numpy.ndarray,
+            check_end: numpy.ndarray,
+            eval_begin: numpy.ndarray,
+            eval_end: numpy.ndarray
+    ) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """
+        Get (eval, check) pairs that may overlap: for each eval interval, the check intervals from the first one that
+        could end after eval begin, up to the last one that begins before eval end. Pairs are sorted by eval position,
+        then check position.
+        """
+        right = check_begin.searchsorted(eval_end, side="left")
+        left = numpy.minimum(numpy.maximum.accumulate(check_end).searchsorted(eval_begin, side="right"), right)
+        candidate_offsets = numpy.concatenate(([0], numpy.cumsum(right - left, dtype=IndexIntType)))
+        eval_inds = OverlapPairs._repeat_index(candidate_offsets)
+        check_inds = numpy.arange(candidate_offsets[-1], dtype=IndexIntType) \
+            - candidate_offsets[:-1].take(eval_inds) + left.take(eval_inds)
+        return eval_inds, check_inds
+
+    @staticmethod
+    def _repeat_index(offsets: numpy.ndarray) -> numpy.ndarray:
+        return numpy.repeat(numpy.arange(len(offsets) - 1, dtype=IndexIntType), numpy.diff(offsets))
+
+    @property
+    def num_eval(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def counts(self) -> numpy.ndarray:
+        """ number of overlappers of each eval interval """
+        return numpy.diff(self.offsets)
+
+    @property
+    def eval_inds(self) -> numpy.ndarray:
+        """ position of eval interval for each pair """
+        return OverlapPairs._repeat_index(self.offsets)
+
+    def overlappers(self, eval_ind: int) -> numpy.ndarray:
+        """ positions of check intervals that overlap one eval interval """
+        return self.check_inds[self.offsets[eval_ind]:self.offsets[eval_ind + 1]]
+
+    def subset(self, keep: numpy.ndarray) -> "OverlapPairs":
+        """ Get OverlapPairs with only the pairs where the boolean array keep is True """
+        return OverlapPairs(
+            numpy.concatenate(([0], numpy.cumsum(numpy.bincount(self.eval_inds[keep], minlength=self.num_eval),
+                                                 dtype=IndexIntType))),
+            self.check_inds[keep]
+        )
+
+    def reduce(self, ufunc: numpy.ufunc, pair_values: numpy.ndarray, empty_value: Any) -> numpy.ndarray:
+        """
+        Reduce values for each pair with ufunc (e.g. numpy.maximum) to get one value for each eval interval, or
+        empty_value if it has no overlappers
+        """
+        counts = self.counts
+        has_overlap = counts > 0
+        reduced = numpy.full(self.num_eval, empty_value, dtype=numpy.result_type(pair_values, empty_value))
+        if has_overlap.any():
+            reduced[has_overlap] = ufunc.reduceat(pair_values, self.offsets[:-1][has_overlap])
+        return reduced
+
+    def covered_length(
+            self,
+            check_begin: numpy.ndarray,
+            check_end: numpy.ndarray,
+            eval_begin: numpy.ndarray,
+            eval_end: numpy.ndarray
+    ) -> numpy.ndarray:
+        """
+        Get length of each eval interval that is covered by the union of its overlappers (0 if it has none).
+        Overlappers must be in order of begin, as they are if check intervals are sorted.
+        """
+        if len(self.check_inds) == 0:
+            return numpy.zeros(self.num_eval, dtype=IndexIntType)
+        eval_inds = self.eval_inds
+        o_begin = check_begin.take(self.check_inds).astype(IndexIntType)
+        o_end = check_end.take(self.check_inds).astype(IndexIntType)
+        # running max of overlapper end, restarted for each eval interval by offsetting each interval's values above
+        # those of the previous intervals
+        shift = eval_inds * (int(max(o_end.max(), o_begin.max())) - int(min(o_end.min(), o_begin.min())) + 1)
+        max_o_end = numpy.maximum.accumulate(o_end + shift) - shift
+        # blocks of overlappers with no gap between them
+        is_block_start = numpy.ones(len(o_begin), dtype=bool)
+        is_block_start[1:] = (eval_inds[1:] != eval_inds[:-1]) | (o_begin[1:] > max_o_end[:-1])
+        block_starts = numpy.flatnonzero(is_block_start)
+        block_ends = numpy.concatenate((block_starts[1:], [len(o_begin)])) - 1
+        block_eval_inds = eval_inds.take(block_starts)
+        block_coverage = numpy.minimum(max_o_end.take(block_ends), eval_end.take(block_eval_inds)) \
+            - numpy.maximum(o_begin.take(block_starts), eval_begin.take(block_eval_inds))
+        return numpy.bincount(block_eval_inds, weights=block_coverage, minlength=self.num_eval).astype(IndexIntType)
 
 
 def fix_variants(
@@ -279,12 +455,17 @@ def apply_interval_overlap_func(
         required_worker_memory: Optional[float] = None,
         required_master_memory: Optional[float] = None,
         require_physical_cpus: bool = True,
-        kwargs: KWArgs = MappingProxyType({})
+        kwargs: KWArgs = MappingProxyType({}),
+        use_overlap_kernel: bool = Default.use_overlap_kernel,
+        shared_memory: bool = Default.shared_memory,
+        adaptive_schedule: bool = Default.adaptive_schedule
 ) -> pandas.DataFrame:
     f"""
     For each interval in intervals_df, find subset of intervals that overlap it,
     and evaluate
         func(eval_interval, overlapping_intervals, **kwargs).
+    If a batch kernel has been registered for func (see register_overlap_kernel), evaluate the kernel on all the
+    intervals of each task instead.
 
     This function is finds other-overlaps (e.g. Evidence that
     overlaps with Variants) as opposed to self-overlaps (e.g. Evidence that
@@ -332,6 +513,14 @@ def apply_interval_overlap_func(
             If True, limit number of jobs to number of physical cores in system, not number of hyperthreads.
         kwargs: KWArgs: (Default=empty dict())
             list of keyword arguments passed to func
+        use_overlap_kernel: bool (Default={Default.use_overlap_kernel})
+            If True, use the batch kernel registered for func, if there is one. If False, always evaluate func.
+        shared_memory: bool (Default={Default.shared_memory})
+            If True, pass interval tables to parallel workers through shared memory instead of pickling them. See
+            parallel_tools.pmap.
+        adaptive_schedule: bool (Default={Default.adaptive_schedule})
+            If True, evaluate largest tasks first, throttling dispatch of tasks when memory use is high, and report
+            realized vs. estimated task cost. See parallel_tools.pmap.
     Returns:
         results: pandas.DataFrame
             table of results, with rows corresponding to intervals_df, and
@@ -358,7 +547,8 @@ def apply_interval_overlap_func(
     )
 
     func_kwargs = {
-        "func": func, "kwargs": kwargs, "property_names": property_names, "exclude_self_overlap": exclude_self_overlap
+        "func": func, "kwargs": kwargs, "property_names": property_names, "exclude_self_overlap": exclude_self_overlap,
+        "kernel": _overlap_kernels.get(func, None) if use_overlap_kernel else None
     }
     # place reasonable guesses on memory usage to limit n_jobs
     if required_master_memory is None:
@@ -394,7 +584,8 @@ def apply_interval_overlap_func(
         kwargs=func_kwargs, starmap=True, description=description, n_jobs=n_jobs,
         required_master_memory=required_master_memory,
         required_worker_memory=required_worker_memory,
-        require_physical_cpus=require_physical_cpus
+        require_physical_cpus=require_physical_cpus, shared_memory=shared_memory,
+        adaptive_schedule=adaptive_schedule
     )
     results = pandas.concat(results_itr, axis=0).loc[intervals_df.index]
 
@@ -670,7 +861,7 @@ def _make_interval_overlap_tasks(
         require_physical_cpus: bool = True
 ) -> (Iterator[Tuple[pandas.DataFrame, Optional[pandas.DataFrame]]], Tuple[int], int, int):
     f"""
-    Return generator of tasks for parallel execution, and list of estimated task
+    Return sequence of tasks for parallel execution, and list of estimated task
     sizes. Tasks will typically be connected components (maximal lists of
     intervals that cannot be divided without separating overlapping intervals)
     from intervals_df; however components may be lumped together if they are very
@@ -690,8 +881,8 @@ def _make_interval_overlap_tasks(
         require_physical_cpus: bool (Default=True)
             If True, limit number of jobs to number of physical cores in system, not number of hyperthreads.
     Returns:
-        tasks: generator[tuples]
-            Generator of tasks (check_intervals, eval_intervals) to evaluate
+        tasks: Sequence[tuples]
+            Sequence of tasks (check_intervals, eval_intervals) to evaluate, created as they are accessed
         task_sizes: list[int]
             List of estimated task evaluation time (arbitrary units)
         max_num_intervals: int
@@ -730,12 +921,34 @@ def _make_interval_overlap_tasks(
     max_num_other_intervals = max(s.stop - s.start + 1 for s in check_slices)
     max_num_intervals = max(s.stop - s.start + 1 for s in eval_slices)
 
-    tasks = ((other_intervals_df.loc[check_slice].drop(Keys.contig, axis=1),
-              intervals_df.loc[eval_slice].drop(Keys.contig, axis=1))
-             for check_slice, eval_slice in zip(check_slices, eval_slices))
+    tasks = _IntervalOverlapTasks(intervals_df, other_intervals_df, check_slices, eval_slices)
     return tasks, task_sizes, max_num_intervals, max_num_other_intervals
 
 
+class _IntervalOverlapTasks(collections.abc.Sequence):
+    """
+    Sequence of interval overlap tasks (check_intervals, eval_intervals), created only when accessed
+    """
+    def __init__(
+            self,
+            intervals_df: pandas.DataFrame,
+            other_intervals_df: pandas.DataFrame,
+            check_slices: Sequence[slice],
+            eval_slices: Sequence[slice]
+    ):
+        self._intervals_df = intervals_df
+        self._other_intervals_df = other_intervals_df
+        self._check_slices = check_slices
+        self._eval_slices = eval_slices
+
+    def __len__(self) -> int:
+        return len(self._eval_slices)
+
+    def __getitem__(self, index: int) -> Tuple[pandas.DataFrame, pandas.DataFrame]:
+        return (self._other_intervals_df.loc[self._check_slices[index]].drop(Keys.contig, axis=1),
+                self._intervals_df.loc[self._eval_slices[index]].drop(Keys.contig, axis=1))
+
+
 class _SliceFactory:
     """
     Helper class that builds the minimal index slice that contains all the required indices (which are added via the
@@ -1007,12 +1220,15 @@ def _overlap_eval_func(
         func: OverlapFunc,
         exclude_self_overlap: bool,
         property_names: Union[Collection[Text], Text, None] = None,
-        kwargs: KWArgs = MappingProxyType({})
+        kwargs: KWArgs = MappingProxyType({}),
+        kernel: Optional[OverlapKernel] = None
 ) -> pandas.DataFrame:
     """
     Helper function run by workers. For each interval in eval_intervals, it
     finds the subset of intervals in check_intervals that overlap it, evaluating
         func(eval_interval, overlapping_intervals, **kwargs).
+    or, if a batch kernel is supplied,
+        kernel(check_intervals, eval_intervals, overlap_pairs, **kwargs)
     Args:
         check_intervals: pandas.DataFrame
             Table of Intervals that may overlap Intervals of interest.
@@ -1032,14 +1248,20 @@ def _overlap_eval_func(
             ._fields
         kwargs: KWArgs (default = empty dict())
             Keyword args to be passed to func.
+        kernel: Optional[OverlapKernel] (default=None)
+            Batch kernel that computes the same results as func.
     Returns:
         results: pandas.DataFrame
             table of results, with rows corresponding to eval_intervals, and
             columns corresponding to samples_data
     """
-    results_itr = _gen_overlap_results(
-        check_intervals, eval_intervals, func, exclude_self_overlap=exclude_self_overlap, kwargs=kwargs
-    )
+    overlap_pairs = OverlapPairs.from_intervals(check_intervals, eval_intervals,
+                                                exclude_self_overlap=exclude_self_overlap)
+    if kernel is not None:
+        return _pack_kernel_results(
+            kernel(check_intervals, eval_intervals, overlap_pairs, **kwargs), eval_intervals.index, property_names
+        )
+    results_itr = _gen_overlap_results(check_intervals, eval_intervals, func, overlap_pairs, kwargs=kwargs)
     return _pack_overlap_results(results_itr, eval_intervals.index, property_names)
 
 
@@ -1047,13 +1269,12 @@ def _gen_overlap_results(
         check_intervals: pandas.DataFrame,
         eval_intervals: pandas.DataFrame,
         func: OverlapFunc,
-        exclude_self_overlap: bool,
+        overlap_pairs: OverlapPairs,
         kwargs: Mapping = MappingProxyType({})
 ) -> OverlapOutput:
     """
-    Iterate through eval_intervals and find intervals from check_intervals that
-    overlap with them. Yield the result of func(interval, overlappers) for
-    each interval in eval_intervals.
+    Iterate through eval_intervals and yield the result of func(interval, overlappers) for each interval in
+    eval_intervals.
     Args:
         check_intervals: pandas.DataFrame
             Table of Intervals that may overlap Intervals of interest.
@@ -1064,78 +1285,16 @@ def _gen_overlap_results(
         func: Callable
             Function that implements
             wanted_props = func(interval, overlapping_intervals)
-        exclude_self_overlap: bool
-            If other_intervals_df is not provided (i.e. searching for overlaps between elements of intervals_df),
-            do not consider an individual interval to overlap with itself.
+        overlap_pairs: OverlapPairs
+            The check_intervals that overlap each eval interval
 
     Yields:
         func_result: OverlapOutput
             Properties obtained from
                 func(interval, overlappers, **kwargs)
     """
-    if len(check_intervals) == 0:
-        # no overlapping check intervals, just evaluate func over empty check_intervals for each eval_interval:
-        for eval_interval in eval_intervals.itertuples():
-            yield func(eval_interval, check_intervals, **kwargs)
-        return
-
-    check_begin = check_intervals[Keys.begin].values
-    check_end = check_intervals[Keys.end].values
-    check_index = check_intervals.index.values if exclude_self_overlap else None
-    last_begin = -1
-    # keep track of indices into check_intervals:
-    # -left is index of 1st check_interval with .end > eval_interval.begin
-    # -mid is index of 1st check_interval with .begin >= eval_interval.begin
-    #   (hence all subsequent intervals have .end > eval_interval.begin)
-    # -right is index of 1st check_interval with .begin >= eval_interval.end
-    # -front is index array of check_intervals that overlap eval_inteval
-    #  but have .begin < eval_interval.begin
-    left = numpy.int64(0)
-    mid = numpy.int64(0)
-    right = numpy.int64(0)
-    front = None
-    for eval_interval in eval_intervals.itertuples():
-        # noinspection PyUnresolvedReferences
-        i_begin = eval_interval.begin
-        if i_begin > last_begin:
-            # this interval has a larger .begin than the previous
-            last_begin = i_begin  # update last_begin
-            # .end may have moved forward OR backward, so check for updates to
-            # right starting from previous location of .begin, which is safe:
-            # noinspection PyUnresolvedReferences
-            right = mid + check_begin[mid:].searchsorted(eval_interval.end, side='left')
-            if right > mid:
-                # mid is between previous value and new right
-                mid += check_begin[mid:right + 1].searchsorted(i_begin, side='left')
-            if mid > left:
-                # check for updates to left if mid is greater than left: find first check end bigger than i_begin
-                delta_left = numpy.nonzero(check_end[left:mid] > i_begin)[0]
-                if delta_left.size:
-                    left += delta_left[0]
-                else:
-                    left = mid
-            # front is array of indices to check_intervals with .begin
-            front = numpy.arange(left, mid).compress(
-                check_end[left:mid] > i_begin
-            )
-        else:
-            # this interval has same .begin as previous, thus only .end can have increased.
-            # Check for updates to right:
-            # noinspection PyUnresolvedReferences
-            right += check_begin[right:].searchsorted(
-                eval_interval.end, side='left'
-            )
-        if exclude_self_overlap:
-            # noinspection PyUnresolvedReferences
-            self_ind = check_index.searchsorted(eval_interval.Index, side="left")
-            overlap_inds = numpy.concatenate((
-                front, numpy.arange(mid, self_ind), numpy.arange(self_ind + 1, right)
-            ))
-        else:
-            overlap_inds = numpy.concatenate((
-                front, numpy.arange(mid, right)
-            ))
-        yield func(eval_interval, check_intervals.iloc[overlap_inds], **kwargs)
+    for eval_ind, eval_interval in enumerate(eval_intervals.itertuples()):
+        yield func(eval_interval, check_intervals.iloc[overlap_pairs.overlappers(eval_ind)], **kwargs)
 
 
 def _pack_overlap_results(
@@ -1190,3 +1349,21 @@ def _pack_overlap_results(
         packed_results.columns = property_names
 
     return packed_results
+
+
+def _pack_kernel_results(
+        results: Mapping[Text, numpy.ndarray],
+        index: pandas.Index,
+        property_names: Union[Collection[Text], Text, None]
+) -> pandas.DataFrame:
+    """
+    Pack columns of results from an overlap kernel into pandas.DataFrame, naming them consistently with
+    _pack_overlap_results()
+    """
+    packed_results = pandas.DataFrame(results, index=index)
+    if property_names:
+        if isinstance(property_names, str):
+            property_names = [property_names]
+        if len(property_names) == len(packed_results.columns):
+            packed_results.columns = property_names
+    return packed_results
@@ -7,13 +7,20 @@ import tempfile
 import string
 import dill
 import random
+import weakref
+import time
+import queue
+import threading
+import collections.abc
 import numpy
+import pandas
 from tqdm.auto import tqdm as tqdm
 from tqdm import TqdmWarning
 # noinspection PyUnresolvedReferences
 import multiprocessing
 import multiprocessing.pool
-from typing import Callable, Union, Optional, Sized, Tuple, Iterator, TypeVar, Collection, Iterable, Any
+from multiprocessing import shared_memory as mp_shared_memory
+from typing import Callable, Union, Optional, Sized, Tuple, Iterator, TypeVar, Collection, Iterable, Any, List, Dict
 
 from sv_utils import common
 
@@ -38,6 +45,12 @@ class Default:
     update_time = 0.5  # seconds
     num_chunk_divs = 20  # chunks per worker per job
     n_jobs = -1  # by default, use all available processes
+    shared_memory = False  # if True, pass numpy / pandas data to workers through shared memory instead of pickling
+    shared_memory_min_bytes = 2 ** 16  # smaller arrays are pickled as usual
+    adaptive_schedule = False  # if True, dispatch largest tasks first and throttle dispatch based on memory use
+    max_tasks_in_flight_per_worker = 2  # adaptive schedule: maximum number of dispatched tasks per worker
+    memory_throttle_fraction = 0.9  # adaptive schedule: stop dispatching tasks above this fraction of memory budget
+    memory_poll_time = 0.1  # adaptive schedule: seconds between memory checks while dispatch is throttled
 
 
 def get_process_num() -> int:
@@ -63,7 +76,10 @@ def pmap(
         update_time: Optional[float] = Default.update_time,
         args: Collection = None, kwargs: dict = None,
         chunksize: Optional[int] = None,
-        num_chunk_divs: int = Default.num_chunk_divs
+        num_chunk_divs: int = Default.num_chunk_divs,
+        shared_memory: bool = Default.shared_memory,
+        adaptive_schedule: bool = Default.adaptive_schedule,
+        memory_budget: Optional[Numeric] = None
 ) -> Iterator[OutputType]:
     """
     execute func on each task in tasks, using parallel pool
@@ -124,24 +140,63 @@ def pmap(
             worker, or chunksize = 1, whichever is larger)
         num_chunk_divs: int (Default=20)
             number of chunks per worker
+        shared_memory: bool (Default=False)
+            if True, numpy arrays and pandas columns in tasks, args and kwargs
+                are copied into shared memory blocks, and workers receive
+                views of those blocks instead of unpickled copies. Blocks for
+                each task are freed once its result is returned. Dispatch is
+                paused while (number of workers + 1) * chunksize tasks are in
+                shared memory, so shared memory (e.g. /dev/shm) only needs to
+                hold that many tasks. Ignored when executing serially.
+            if False, pickle all task data
+        adaptive_schedule: bool (Default=False)
+            if True, pass tasks to workers one at a time, in decreasing order
+                of task_sizes (longest-processing-time first), ignoring
+                chunksize and permute_evaluation. Dispatch of new tasks is
+                paused while resident memory of master and workers exceeds
+                Default.memory_throttle_fraction of memory_budget (one task
+                is always kept running). When finished, print a report of
+                realized task time vs. estimated task size.
+                NOTE: if tasks are not a Sequence (e.g. a generator), they
+                      will be stored in a list.
+                Ignored when executing serially.
+            if False, pass chunks of tasks to workers in order
+        memory_budget: float (Default=None)
+            Memory (in GiB) master and workers may use with adaptive_schedule.
+            If None, use the memory they use at start plus available memory.
     OUTPUT:
         results will be yielded either in task or evaluation order, as
         specified specified by the "ordered" keyword.
     """
     sys.stdout.flush()
 
+    adaptive_schedule = adaptive_schedule and pool is not None
+    task_list = tasks
     # get / manipulate input arguments into final forms used by map
     num_workers, args, kwargs, tasks, task_sizes, num_tasks, num_tasks_str, total, disable, chunksize \
         = _validate_map_params(
-            pool, args, kwargs, tasks, task_sizes, num_tasks, update_time, chunksize, num_chunk_divs, permute_evaluation
+            pool, args, kwargs, tasks, task_sizes, num_tasks, update_time, chunksize, num_chunk_divs,
+            permute_evaluation and not adaptive_schedule
         )
 
+    # blocks holding each task in shared memory, freed when the task is done
+    shared_blocks = None
+    shared_tasks = None
     if pool is None:
         print('Executing %s on %s tasks serially'
               % (str(func).split()[1], num_tasks_str))
         result_gen = \
             ((t[0], func(*t[1], *args, **kwargs)) for t in tasks) if starmap\
             else ((t[0], func(t[1], *args, **kwargs)) for t in tasks)
+    elif adaptive_schedule:
+        print('Executing %s on %s tasks with %d parallel workers (adaptive schedule)'
+              % (str(func).split()[1], num_tasks_str, num_workers))
+        func = _UnorderedMapTranslator(func, args, kwargs, starmap, shared_memory=shared_memory, timed=True)
+        if shared_memory:
+            shared_blocks = dict()
+        result_gen = _adaptive_imap(
+            pool, func, task_list, task_sizes, memory_budget=memory_budget, shared_blocks=shared_blocks
+        )
     else:
         if chunksize == 1:
             print('Executing %s on %s tasks with %d parallel workers'
@@ -153,7 +208,11 @@ def pmap(
                              num_workers)
             )
         # translate func to enable re-sorting tasks
-        func = _UnorderedMapTranslator(func, args, kwargs, starmap)
+        func = _UnorderedMapTranslator(func, args, kwargs, starmap, shared_memory=shared_memory)
+        if shared_memory:
+            # hold one chunk per worker, plus one chunk being queued, in shared memory at a time
+            shared_blocks = dict()
+            tasks = shared_tasks = _SharedTaskDispatcher(tasks, shared_blocks, (num_workers + 1) * chunksize)
         # noinspection PyArgumentList
         result_gen = pool.imap_unordered(func, tasks, chunksize=chunksize)
     sys.stdout.flush()
@@ -168,36 +227,47 @@ def pmap(
         with tqdm(total=total, disable=disable, mininterval=update_time, maxinterval=float('inf'), smoothing=0,
                   desc=description) as progress:
             # loop (with progress)
-            for i, r in result_gen:
-                if task_sizes:
-                    num_completed_tasks += 1
-                    progress.set_postfix(refresh=False, tasks=f"{num_completed_tasks}/{num_tasks}")
-                    progress.update(task_sizes[i])
-                else:
-                    progress.update(1)
-
-                if ordered:
-                    if i == next_i:
-                        # get next wanted result, yield it
-                        if flatmap:
-                            yield from r
-                        else:
-                            yield r
-                        next_i += 1
-                        while next_i in r_dict:
+            try:
+                for i, r in result_gen:
+                    if task_sizes:
+                        num_completed_tasks += 1
+                        progress.set_postfix(refresh=False, tasks=f"{num_completed_tasks}/{num_tasks}")
+                        progress.update(task_sizes[i])
+                    else:
+                        progress.update(1)
+                    if shared_blocks is not None:
+                        _unlink_shared_memory(shared_blocks.pop(i))
+                        if shared_tasks is not None:
+                            shared_tasks.release()
+
+                    if ordered:
+                        if i == next_i:
+                            # get next wanted result, yield it
                             if flatmap:
-                                yield from r_dict.pop(next_i)
+                                yield from r
                             else:
-                                yield r_dict.pop(next_i)
+                                yield r
                             next_i += 1
+                            while next_i in r_dict:
+                                if flatmap:
+                                    yield from r_dict.pop(next_i)
+                                else:
+                                    yield r_dict.pop(next_i)
+                                next_i += 1
+                        else:
+                            # this result is not wanted yet. store for later
+                            r_dict[i] = r
                     else:
-                        # this result is not wanted yet. store for later
-                        r_dict[i] = r
-                else:
-                    if flatmap:
-                        yield from r
-                    else:
-                        yield r
+                        if flatmap:
+                            yield from r
+                        else:
+                            yield r
+            finally:
+                if shared_tasks is not None:
+                    shared_tasks.close()
+                if shared_blocks is not None:
+                    while shared_blocks:
+                        _unlink_shared_memory(shared_blocks.popitem()[1])
 
 
 def _validate_map_params(
@@ -323,12 +393,14 @@ class _UnorderedMapTranslator(object):
     """
     Class for translating functions to work with pmap
     """
-    def __init__(self, func, args=None, kwargs=None, starmap=False):
+    def __init__(self, func, args=None, kwargs=None, starmap=False, shared_memory=False, timed=False):
         if args is None:
             args = []
         if kwargs is None:
             kwargs = {}
         self._starmap = starmap
+        self._shared_memory = shared_memory
+        self._timed = timed
         self._master_pid = os.getpid()
         self._pickle_args(func, args, kwargs)
 
@@ -336,11 +408,24 @@ class _UnorderedMapTranslator(object):
         if self._key not in _pool_func_args:
             self._load_func_args()
         func, args, kwargs = _pool_func_args[self._key]
+        task = tup[1]
+        if self._shared_memory:
+            task = _unshare(task)
 
+        start_time = time.perf_counter()
         if self._starmap:
-            return tup[0], func(*tup[1], *args, **kwargs)
+            result = func(*task, *args, **kwargs)
         else:
-            return tup[0], func(tup[1], *args, **kwargs)
+            result = func(task, *args, **kwargs)
+        if self._timed:
+            return tup[0], result, time.perf_counter() - start_time
+        return tup[0], result
+
+    def __getstate__(self):
+        # shared memory blocks are only managed by master
+        state = self.__dict__.copy()
+        state.pop("_shared_blocks", None)
+        return state
 
     def __del__(self):
         if os.getpid() == self._master_pid:
@@ -352,6 +437,10 @@ class _UnorderedMapTranslator(object):
             global _pool_func_args
             if self._key in _pool_func_args:
                 _pool_func_args.pop(self._key)
+            if self._shared_memory:
+                # master frees shared memory holding func and args
+                _unlink_shared_memory(self._shared_blocks)
+                return
             # master removes _key_file
             try:
                 os.remove(self._key_file())
@@ -366,12 +455,29 @@ class _UnorderedMapTranslator(object):
         )
         global _pool_func_args
         _pool_func_args[self._key] = (func, args, kwargs)
+        if self._shared_memory:
+            self._shared_blocks = []
+            pickled = dill.dumps(
+                (func, _share(args, self._shared_blocks), _share(kwargs, self._shared_blocks))
+            )
+            block = mp_shared_memory.SharedMemory(name=self._key, create=True, size=len(pickled))
+            block.buf[:len(pickled)] = pickled
+            block.close()
+            self._shared_blocks.append(block)
+            return
         with open(self._key_file(), 'wb') as f_out:
             dill.dump((func, args, kwargs), f_out)
 
     def _load_func_args(self):
-        with open(self._key_file(), 'rb') as f_in:
-            func, args, kwargs = dill.load(f_in)
+        if self._shared_memory:
+            block = mp_shared_memory.SharedMemory(name=self._key)
+            # block may be padded past the end of the pickle, which dill ignores
+            func, args, kwargs = dill.loads(block.buf)
+            block.close()
+            args, kwargs = _unshare(args), _unshare(kwargs)
+        else:
+            with open(self._key_file(), 'rb') as f_in:
+                func, args, kwargs = dill.load(f_in)
         global _pool_func_args
         _pool_func_args[self._key] = (func, args, kwargs)
         self._is_master = False
@@ -380,6 +486,324 @@ class _UnorderedMapTranslator(object):
         return os.path.join(tempfile.gettempdir(), self._key)
 
 
+class _SharedArray:
+    """
+    Handle to a numpy array that has been copied into a shared memory block
+    """
+    __slots__ = ("name", "shape", "dtype")
+
+    def __init__(self, array: numpy.ndarray, shared_blocks: List[mp_shared_memory.SharedMemory]):
+        block = mp_shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        numpy.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        block.close()
+        shared_blocks.append(block)
+        self.name = block.name
+        self.shape = array.shape
+        self.dtype = array.dtype
+
+    def get(self) -> numpy.ndarray:
+        block = mp_shared_memory.SharedMemory(name=self.name)
+        array = numpy.ndarray(self.shape, dtype=self.dtype, buffer=block.buf)
+        # the array doesn't keep the block open, so close the block only when the array (and all its views) are gone
+        weakref.finalize(array, block.close)
+        return array
+
+
+class _SharedCategorical:
+    """
+    Handle to a pandas.Categorical with codes in shared memory
+    """
+    __slots__ = ("codes", "dtype")
+
+    def __init__(self, categorical: pandas.Categorical, shared_blocks: List[mp_shared_memory.SharedMemory]):
+        self.codes = _share(categorical.codes, shared_blocks)
+        self.dtype = categorical.dtype
+
+    def get(self) -> pandas.Categorical:
+        return pandas.Categorical.from_codes(_unshare(self.codes), dtype=self.dtype)
+
+
+class _SharedMaskedArray:
+    """
+    Handle to a pandas nullable (masked) array, e.g. pandas.arrays.IntegerArray, with data and mask in shared memory
+    """
+    __slots__ = ("array_type", "data", "mask")
+
+    def __init__(self, masked_array: pandas.api.extensions.ExtensionArray,
+                 shared_blocks: List[mp_shared_memory.SharedMemory]):
+        self.array_type = type(masked_array)
+        # noinspection PyProtectedMember
+        self.data = _share(masked_array._data, shared_blocks)
+        # noinspection PyProtectedMember
+        self.mask = _share(masked_array._mask, shared_blocks)
+
+    def get(self) -> pandas.api.extensions.ExtensionArray:
+        return self.array_type(_unshare(self.data), _unshare(self.mask), copy=False)
+
+
+class _SharedSeries:
+    """
+    Handle to a pandas.Series with values in shared memory
+    """
+    __slots__ = ("values", "index", "name")
+
+    def __init__(self, series: pandas.Series, shared_blocks: List[mp_shared_memory.SharedMemory]):
+        self.values = _share(_get_column_values(series), shared_blocks)
+        self.index = series.index
+        self.name = series.name
+
+    def get(self) -> pandas.Series:
+        return pandas.Series(_unshare(self.values), index=self.index, name=self.name, copy=False)
+
+
+class _SharedFrame:
+    """
+    Handle to a pandas.DataFrame with columns in shared memory
+    """
+    __slots__ = ("column_values", "index", "columns", "attrs")
+
+    def __init__(self, frame: pandas.DataFrame, shared_blocks: List[mp_shared_memory.SharedMemory]):
+        self.column_values = [_share(_get_column_values(frame.iloc[:, column_ind]), shared_blocks)
+                              for column_ind in range(frame.shape[1])]
+        self.index = frame.index
+        self.columns = frame.columns
+        self.attrs = frame.attrs
+
+    def get(self) -> pandas.DataFrame:
+        # build from positional keys (column names may be duplicated), without consolidating (copying) columns
+        frame = pandas.DataFrame(
+            {column_ind: _unshare(values) for column_ind, values in enumerate(self.column_values)},
+            index=self.index, copy=False
+        )
+        frame.columns = self.columns
+        frame.attrs = self.attrs
+        return frame
+
+
+_shared_handle_types = (_SharedArray, _SharedCategorical, _SharedMaskedArray, _SharedSeries, _SharedFrame)
+
+
+def _get_column_values(series: pandas.Series) -> Union[numpy.ndarray, pandas.api.extensions.ExtensionArray]:
+    return series.array if pandas.api.types.is_extension_array_dtype(series.dtype) else series.to_numpy()
+
+
+def _share(obj: Any, shared_blocks: List[mp_shared_memory.SharedMemory]) -> Any:
+    """
+    Replace numpy arrays and pandas objects (possibly nested in tuples, lists and dicts) by handles to copies of their
+    data in shared memory, appending the newly-created shared memory blocks to shared_blocks. Arrays smaller than
+    Default.shared_memory_min_bytes and data that can't be shared (e.g. object arrays) are left to be pickled.
+    """
+    if isinstance(obj, pandas.DataFrame):
+        return _SharedFrame(obj, shared_blocks)
+    elif isinstance(obj, pandas.Series):
+        return _SharedSeries(obj, shared_blocks)
+    elif isinstance(obj, numpy.ndarray):
+        return obj if obj.dtype.hasobject or obj.nbytes < Default.shared_memory_min_bytes \
+            else _SharedArray(obj, shared_blocks)
+    elif isinstance(obj, pandas.Categorical):
+        return _SharedCategorical(obj, shared_blocks)
+    elif isinstance(obj, pandas.api.extensions.ExtensionArray) and hasattr(obj, "_data") and hasattr(obj, "_mask"):
+        return _SharedMaskedArray(obj, shared_blocks)
+    elif type(obj) in (tuple, list):
+        return type(obj)(_share(item, shared_blocks) for item in obj)
+    elif type(obj) is dict:
+        return {key: _share(value, shared_blocks) for key, value in obj.items()}
+    else:
+        return obj
+
+
+def _unshare(obj: Any) -> Any:
+    """
+    Reverse _share(), replacing handles by views of data in shared memory
+    """
+    if isinstance(obj, _shared_handle_types):
+        return obj.get()
+    elif type(obj) in (tuple, list):
+        return type(obj)(_unshare(item) for item in obj)
+    elif type(obj) is dict:
+        return {key: _unshare(value) for key, value in obj.items()}
+    else:
+        return obj
+
+
+def _unlink_shared_memory(shared_blocks: Iterable[mp_shared_memory.SharedMemory]):
+    """
+    Free shared memory blocks created by this process (once all processes have closed them)
+    """
+    for block in shared_blocks:
+        try:
+            block.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class _SharedTaskDispatcher:
+    """
+    Iterator copying (task number, task) pairs into shared memory as the pool's task handler thread requests them,
+    holding at most max_tasks in shared memory at once. Call release() as each result is consumed, and close() when
+    done, so that a task handler waiting for a free slot can exit.
+    """
+    def __init__(
+            self,
+            tasks: Iterator[Tuple[int, TaskType]],
+            shared_blocks: Dict[int, List[mp_shared_memory.SharedMemory]],
+            max_tasks: int
+    ):
+        self._tasks = iter(tasks)
+        self._shared_blocks = shared_blocks
+        self._slots = threading.Semaphore(max_tasks)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __iter__(self) -> "_SharedTaskDispatcher":
+        return self
+
+    def __next__(self) -> Tuple[int, Any]:
+        self._slots.acquire()
+        with self._lock:
+            if self._closed:
+                raise StopIteration
+            task_num, task = next(self._tasks)
+            return task_num, _share(task, self._shared_blocks.setdefault(task_num, []))
+
+    def release(self):
+        self._slots.release()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        self._slots.release()
+
+
+def _adaptive_imap(
+        pool: multiprocessing.Pool,
+        func: _UnorderedMapTranslator,
+        tasks: Union[Iterable[TaskType], Iterator[TaskType]],
+        task_sizes: Tuple[float, ...],
+        memory_budget: Optional[Numeric] = None,
+        shared_blocks: Optional[Dict[int, List[mp_shared_memory.SharedMemory]]] = None
+) -> Iterator[Tuple[int, OutputType]]:
+    """
+    Pass tasks to pool one at a time, largest first, pausing dispatch while memory use is near memory_budget. Yield
+    (task number, result) in order of completion, then print a report of realized vs. estimated task cost.
+    Args:
+        pool: multiprocessing.Pool
+        func: _UnorderedMapTranslator
+            Translated function, returning (task number, result, task time)
+        tasks: list, tuple, or iterator yielding data
+        task_sizes: tuple[float]
+            Estimated task sizes. If empty, dispatch tasks in order.
+        memory_budget: float (Default=None)
+            Memory (in GiB) master and workers may use. If None, use the memory they use at start plus available memory.
+        shared_blocks: dict or None (Default=None)
+            If not None, pass tasks through shared memory, storing the blocks holding task i in shared_blocks[i]
+    Yields:
+        task_num: int
+        result: OutputType
+    """
+    if not isinstance(tasks, collections.abc.Sequence):
+        tasks = list(tasks)
+    order = numpy.argsort(-numpy.array(task_sizes), kind="stable") if task_sizes else range(len(tasks))
+    memory_monitor = _PoolMemoryMonitor(pool)
+    if memory_budget is None:
+        memory_budget = memory_monitor.memory_use() + common.available_memory()
+    throttle_memory = Default.memory_throttle_fraction * memory_budget
+    # noinspection PyProtectedMember
+    max_in_flight = Default.max_tasks_in_flight_per_worker * len(pool._pool)
+
+    completed = queue.SimpleQueue()
+    task_times = numpy.full(len(tasks), numpy.nan)
+    num_in_flight = 0
+    num_throttled = 0
+    for task_num in order:
+        is_throttled = False
+        while num_in_flight >= max_in_flight or (num_in_flight > 0 and memory_monitor.memory_use() > throttle_memory):
+            if num_in_flight < max_in_flight and not is_throttled:
+                is_throttled = True
+                num_throttled += 1
+            try:
+                result = completed.get(timeout=Default.memory_poll_time)
+            except queue.Empty:
+                continue
+            num_in_flight -= 1
+            yield _get_timed_result(result, task_times)
+        task = tasks[task_num]
+        if shared_blocks is not None:
+            task = _share(task, shared_blocks.setdefault(task_num, []))
+        pool.apply_async(func, ((task_num, task),), callback=completed.put, error_callback=completed.put)
+        num_in_flight += 1
+    for __ in range(num_in_flight):
+        yield _get_timed_result(completed.get(), task_times)
+
+    print(_get_schedule_report(task_times, task_sizes, memory_monitor.peak_memory_use, memory_budget, num_throttled))
+
+
+def _get_timed_result(
+        result: Union[Tuple[int, OutputType, float], BaseException],
+        task_times: numpy.ndarray
+) -> Tuple[int, OutputType]:
+    """ Record time of a task completed by _adaptive_imap, and return (task number, result) """
+    if isinstance(result, BaseException):
+        raise result
+    task_num, result, task_time = result
+    task_times[task_num] = task_time
+    return task_num, result
+
+
+def _get_schedule_report(
+        task_times: numpy.ndarray,
+        task_sizes: Tuple[float, ...],
+        peak_memory_use: float,
+        memory_budget: float,
+        num_throttled: int
+) -> str:
+    """ Summarize realized vs. estimated task cost, and memory use of _adaptive_imap """
+    report = f"Adaptive schedule: {len(task_times)} tasks, {task_times.sum():.1f} s of task time, " \
+             f"peak memory {peak_memory_use:.2f} of {memory_budget:.2f} GiB budget, " \
+             f"dispatch throttled {num_throttled} times"
+    task_sizes = numpy.array(task_sizes, dtype=float)
+    is_estimated = task_sizes > 0
+    if is_estimated.sum() < 2 or task_times[is_estimated].sum() <= 0:
+        return report
+    task_sizes, task_times = task_sizes[is_estimated], task_times[is_estimated]
+    # express estimated cost in seconds, so that total estimated cost = total realized cost
+    ratio = task_times / (task_sizes * task_times.sum() / task_sizes.sum())
+    correlation = numpy.corrcoef(task_sizes, task_times)[0, 1] \
+        if task_sizes.std() > 0 and task_times.std() > 0 else numpy.nan
+    low, median, high = numpy.percentile(ratio, [5, 50, 95])
+    return report + f"\n  realized vs. estimated task cost: correlation {correlation:.2f}, realized / estimated " \
+                    f"median {median:.2f} (5%: {low:.2f}, 95%: {high:.2f}, max: {ratio.max():.2f})"
+
+
+class _PoolMemoryMonitor:
+    """
+    Track resident memory (in GiB) of master process and pool workers
+    """
+    def __init__(self, pool: multiprocessing.Pool):
+        self._pool = pool
+        self._processes = {os.getpid(): psutil.Process()}
+        self.peak_memory_use = 0.0
+
+    def memory_use(self) -> float:
+        # noinspection PyProtectedMember
+        for worker in self._pool._pool:
+            if worker.pid not in self._processes:
+                try:
+                    self._processes[worker.pid] = psutil.Process(worker.pid)
+                except psutil.NoSuchProcess:
+                    continue
+        memory_use = 0
+        for pid, process in list(self._processes.items()):
+            try:
+                memory_use += process.memory_info().rss
+            except psutil.NoSuchProcess:
+                # worker was replaced
+                self._processes.pop(pid)
+        memory_use /= 2.0 ** 30
+        self.peak_memory_use = max(self.peak_memory_use, memory_use)
+        return memory_use
+
+
 Pool = multiprocessing.get_context('spawn').Pool
 multiprocessing.pool.Pool.pmap = pmap
 
@@ -401,7 +825,10 @@ def parmap(
         n_jobs: int = Default.n_jobs,
         required_worker_memory: Optional[Numeric] = None,
         required_master_memory: Optional[Numeric] = None,
-        require_physical_cpus: bool = False
+        require_physical_cpus: bool = False,
+        shared_memory: bool = Default.shared_memory,
+        adaptive_schedule: bool = Default.adaptive_schedule,
+        memory_budget: Optional[Numeric] = None
 ) -> Iterator[OutputType]:
     """
     execute func on each task in tasks, using parallel pool
@@ -468,6 +895,32 @@ def parmap(
             memory. Amount of memory needed by master process.
         require_physical_cpus: bool (Default=False)
             If True, limit number of jobs to number of physical cores in system, not number of hyperthreads.
+        shared_memory: bool (Default=False)
+            if True, numpy arrays and pandas columns in tasks, args and kwargs
+                are copied into shared memory blocks, and workers receive
+                views of those blocks instead of unpickled copies. Blocks for
+                each task are freed once its result is returned. Dispatch is
+                paused while (number of workers + 1) * chunksize tasks are in
+                shared memory, so shared memory (e.g. /dev/shm) only needs to
+                hold that many tasks. Ignored when executing serially.
+            if False, pickle all task data
+        adaptive_schedule: bool (Default=False)
+            if True, pass tasks to workers one at a time, in decreasing order
+                of task_sizes (longest-processing-time first), ignoring
+                chunksize and permute_evaluation. Dispatch of new tasks is
+                paused while resident memory of master and workers exceeds
+                Default.memory_throttle_fraction of memory_budget (one task
+                is always kept running). When finished, print a report of
+                realized task time vs. estimated task size.
+                NOTE: if tasks are not a Sequence (e.g. a generator), they
+                      will be stored in a list.
+                Ignored when executing serially.
+            if False, pass chunks of tasks to workers in order
+        memory_budget: float (Default=None)
+            Memory (in GiB) master and workers may use with adaptive_schedule.
+            If None, use the memory they use at start plus available memory.
+            With adaptive_schedule, required_worker_memory does not limit the
+            number of workers: memory is managed by throttling dispatch.
     OUTPUT:
         results will be yielded either in task or evaluation order, as
         specified specified by the "ordered" keyword.
@@ -475,7 +928,7 @@ def parmap(
     n_jobs = common.num_jobs_to_use(
         n_jobs,
         required_master_memory=required_master_memory,
-        required_worker_memory=required_worker_memory,
+        required_worker_memory=None if adaptive_schedule else required_worker_memory,
         require_physical_cpus=require_physical_cpus
     )
     if num_tasks is None:
@@ -505,7 +958,8 @@ def parmap(
                 task_sizes=task_sizes, starmap=starmap, flatmap=flatmap,
                 ordered=ordered, permute_evaluation=permute_evaluation,
                 description=description, update_time=update_time, args=args,
-                kwargs=kwargs, chunksize=chunksize, num_chunk_divs=num_chunk_divs
+                kwargs=kwargs, chunksize=chunksize, num_chunk_divs=num_chunk_divs,
+                shared_memory=shared_memory, adaptive_schedule=adaptive_schedule, memory_budget=memory_budget
             ):
                 yield result
         finally:
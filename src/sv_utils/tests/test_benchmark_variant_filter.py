@@ -0,0 +1,131 @@
+import os
+import glob
+import json
+import shutil
+import pytest
+from typing import List, Sequence
+import numpy
+import pandas
+
+from sv_utils import benchmark_variant_filter
+from sv_utils.benchmark_variant_filter import ScoresDataSet, TruthData
+
+
+class Default:
+    resources_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources")
+    small_vcfs_dir = os.path.join(resources_dir, "small_vcfs")
+    short_reads_vcfs = tuple(sorted(glob.glob(os.path.join(small_vcfs_dir, "*.vcf.gz"))))
+    ped_file = os.path.join(resources_dir, "1KGP_2504_and_698_with_GIAB.ped")
+    scores_source = {"gq": {"passing_score": 1, "score_property": benchmark_variant_filter.Keys.gq}}
+    num_parallel_jobs = 2
+
+
+def _write_scores_data_json(tmpdir: str, vcfs: Sequence[str]) -> str:
+    """ Write json describing a data set for the first VCF and one for the remaining VCFs """
+    scores_data_json = os.path.join(tmpdir, "scores_data.json")
+    with open(scores_data_json, 'w') as f_out:
+        json.dump(
+            {
+                "first": {"vcf": vcfs[0], "scores_source": Default.scores_source},
+                "rest": {"vcf": list(vcfs[1:]), "scores_source": Default.scores_source}
+            },
+            f_out
+        )
+    return scores_data_json
+
+
+@pytest.fixture(scope="function")
+def truth_data(tmpdir) -> TruthData:
+    overlap_results_file = os.path.join(tmpdir, "overlap_results.json")
+    with open(overlap_results_file, 'w') as f_out:
+        json.dump({}, f_out)
+    return TruthData(overlap_results_file=overlap_results_file, pedigree_files=(Default.ped_file,))
+
+
+def assert_data_sets_equal(data_sets: List[ScoresDataSet], expected_data_sets: List[ScoresDataSet]):
+    assert [data_set.label for data_set in data_sets] == [data_set.label for data_set in expected_data_sets]
+    for data_set, expected_data_set in zip(data_sets, expected_data_sets):
+        pandas.testing.assert_frame_equal(data_set.scores, expected_data_set.scores)
+        pandas.testing.assert_frame_equal(data_set.allele_counts, expected_data_set.allele_counts)
+        pandas.testing.assert_frame_equal(data_set.metrics, expected_data_set.metrics)
+        pandas.testing.assert_frame_equal(data_set.inheritance_stats, expected_data_set.inheritance_stats)
+        pandas.testing.assert_frame_equal(data_set.genotype_counts, expected_data_set.genotype_counts)
+
+
+def test_load_data_sets_serial_parallel_cached(tmpdir, monkeypatch, truth_data: TruthData):
+    scores_data_json = _write_scores_data_json(tmpdir, Default.short_reads_vcfs)
+    cache_dir = os.path.join(tmpdir, "cache")
+
+    serial_data_sets = ScoresDataSet.from_json(scores_data_json, truth_data=truth_data, num_jobs=1)
+    assert len(serial_data_sets) == 2
+    assert all(data_set.inheritance_stats[benchmark_variant_filter.Keys.num_trios].sum() > 0
+               for data_set in serial_data_sets)
+    parallel_data_sets = ScoresDataSet.from_json(scores_data_json, truth_data=truth_data,
+                                                 num_jobs=Default.num_parallel_jobs)
+    assert_data_sets_equal(parallel_data_sets, serial_data_sets)
+
+    saved_data_sets = ScoresDataSet.from_json(scores_data_json, truth_data=truth_data, num_jobs=1,
+                                              cache_dir=cache_dir)
+    assert_data_sets_equal(saved_data_sets, serial_data_sets)
+    assert len(os.listdir(cache_dir)) == 2
+
+    # data sets must now come from the cache, without reading any VCFs
+    def _fail_load_data(*args, **kwargs):
+        raise AssertionError("data set was loaded instead of read from cache")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(ScoresDataSet, "load_data", _fail_load_data)
+        cached_data_sets = ScoresDataSet.from_json(scores_data_json, truth_data=truth_data, num_jobs=1,
+                                                   cache_dir=cache_dir)
+    assert_data_sets_equal(cached_data_sets, serial_data_sets)
+
+
+def test_load_data_sets_cache_invalidated(tmpdir, truth_data: TruthData):
+    # copy VCFs so that one can be replaced
+    vcfs = [shutil.copy(vcf, str(tmpdir)) for vcf in Default.short_reads_vcfs]
+    scores_data_json = _write_scores_data_json(tmpdir, vcfs)
+    cache_dir = os.path.join(tmpdir, "cache")
+
+    ScoresDataSet.from_json(scores_data_json, truth_data=truth_data, num_jobs=1, cache_dir=cache_dir)
+    shutil.copy(Default.short_reads_vcfs[1], vcfs[0])
+    expected_data_sets = ScoresDataSet.from_json(scores_data_json, truth_data=truth_data, num_jobs=1)
+
+    cached_data_sets = ScoresDataSet.from_json(scores_data_json, truth_data=truth_data, num_jobs=1,
+                                               cache_dir=cache_dir)
+    assert_data_sets_equal(cached_data_sets, expected_data_sets)
+    # only the data set with the replaced VCF is saved again
+    assert len(os.listdir(cache_dir)) == 3
+
+
+def test_get_genotype_stats(truth_data: TruthData):
+    data_set = next(
+        ScoresDataSet(
+            vcfs=Default.short_reads_vcfs, label="all",
+            scores_sources={"gq": benchmark_variant_filter.ScoresSource(**Default.scores_source["gq"])}
+        ).load_data()
+    )
+    # make some no-calls
+    allele_counts = data_set.allele_counts.copy()
+    allele_counts.iloc[::7, ::3] = pandas.NA
+    data_set = ScoresDataSet(vcfs=data_set.vcfs, scores_sources=data_set.scores_sources, label=data_set.label,
+                             scores=data_set.scores, allele_counts=allele_counts, metrics=data_set.metrics)
+    expected_inheritance_stats = data_set.get_inheritance_stats(truth_data).inheritance_stats
+    data_set.inheritance_stats = None
+
+    data_set.get_genotype_stats(truth_data.pedigree_file_info)
+    pandas.testing.assert_frame_equal(data_set.inheritance_stats, expected_inheritance_stats)
+    is_called = allele_counts.notna()
+    expected_genotype_counts = {
+        benchmark_variant_filter.Keys.num_ref_genotypes: (allele_counts == 0) & is_called,
+        benchmark_variant_filter.Keys.num_het_genotypes: (allele_counts == 1) & is_called,
+        benchmark_variant_filter.Keys.num_homvar_genotypes: (allele_counts == 2) & is_called,
+        benchmark_variant_filter.Keys.num_non_ref_genotypes: (allele_counts > 0) & is_called,
+        benchmark_variant_filter.Keys.num_called_genotypes: is_called
+    }
+    for key, expected_genotypes in expected_genotype_counts.items():
+        numpy.testing.assert_array_equal(data_set.genotype_counts[key].to_numpy(),
+                                         expected_genotypes.sum(axis=1).to_numpy(), err_msg=key)
+    numpy.testing.assert_array_equal(
+        data_set.num_variant_alleles.to_numpy(),
+        allele_counts.where(is_called, 0).sum(axis=1).to_numpy(dtype=numpy.int64)
+    )
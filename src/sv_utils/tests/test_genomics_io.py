@@ -14,6 +14,7 @@ class Keys:
     contig = genomics_io.Keys.contig
     begin = genomics_io.Keys.begin
     end = genomics_io.Keys.end
+    svtype = genomics_io.Keys.svtype
 
 
 class Default:
@@ -29,6 +30,8 @@ class Default:
     num_subset_samples = 2
     num_subset_properties = 2
     num_subset_variants = 2
+    num_load_jobs = 3
+    load_chunk_size = 4
 
 
 def get_nontrivial_permutation(permutation_length: int) -> numpy.ndarray:
@@ -170,6 +173,72 @@ def test_subset_vcf(
             )
 
 
+def test_vcf_to_pandas_chunked_parallel(
+        vcf: str = Default.small_vcf,
+        num_jobs: int = Default.num_load_jobs,
+        chunk_size: int = Default.load_chunk_size
+):
+    # loading in small chunks, from several regions of the VCF, must not change the result
+    whole_variants = genomics_io.vcf_to_pandas(vcf)
+    chunked_variants = genomics_io.vcf_to_pandas(vcf, num_jobs=num_jobs, chunk_size=chunk_size)
+    common_test_utils.assert_dataframes_equal(
+        chunked_variants, whole_variants, context=f"num_jobs={num_jobs}, chunk_size={chunk_size}"
+    )
+    for column in whole_variants.columns:
+        if pandas.api.types.is_categorical_dtype(whole_variants[column]):
+            assert chunked_variants[column].cat.categories.equals(whole_variants[column].cat.categories), \
+                f"categories differ for {column}"
+
+
+def test_vcf_column_cache(
+        tmpdir,
+        vcf: str = Default.small_vcf,
+        num_subset_samples: int = Default.num_subset_samples
+):
+    cache_dir = str(tmpdir.mkdir("test_vcf_column_cache"))
+    subset_samples = genomics_io.get_vcf_sample_ids(vcf)[:num_subset_samples]
+    # the first load stores the VCF columns, later loads (including subsets) must be identical to loading the VCF
+    for load_kwargs in [{}, {}, {"samples": subset_samples}, {"samples": subset_samples, "wanted_properties": ["gt"]}]:
+        common_test_utils.assert_dataframes_equal(
+            genomics_io.vcf_to_pandas(vcf, cache_dir=cache_dir, **load_kwargs),
+            genomics_io.vcf_to_pandas(vcf, **load_kwargs),
+            context=f"cached load with {load_kwargs}"
+        )
+    assert len(os.listdir(cache_dir)) == 1
+    # a cache too small to hold two entries keeps only the most recent one
+    genomics_io.vcf_to_pandas(Default.small_vcfs[1], cache_dir=cache_dir, cache_size=1)
+    assert len(os.listdir(cache_dir)) == 1
+
+
+def test_vcf_to_pandas_select_variants(
+        vcf: str = Default.small_vcf,
+        num_subset_variants: int = Default.num_subset_variants
+):
+    whole_variants = genomics_io.vcf_to_pandas(vcf, wanted_properties=(Keys.contig, Keys.begin, Keys.end, Keys.svtype))
+    contigs = whole_variants[(None, Keys.contig)].astype(str)
+    begins = whole_variants[(None, Keys.begin)]
+    ends = whole_variants[(None, Keys.end)]
+    # overlapping regions (samtools-style, 1-based inclusive) should select each overlapping variant once, in file order
+    contig = contigs.iloc[0]
+    region_begin, region_end = begins.iloc[num_subset_variants], ends.iloc[2 * num_subset_variants]
+    regions = [f"{contig}:{region_begin}-{region_end}", f"{contig}:{region_begin + 1}-{region_begin + 2}"]
+    expected_ids = whole_variants.index[(contigs == contig) & (begins <= region_end) & (ends >= region_begin)]
+    for num_jobs in (1, 2):
+        selected_ids = genomics_io.vcf_to_pandas(vcf, wanted_properties=(Keys.id,), regions=regions,
+                                                 num_jobs=num_jobs).index
+        assert selected_ids.equals(expected_ids), f"regions={regions}, num_jobs={num_jobs}"
+
+    wanted_ids = whole_variants.index[::num_subset_variants]
+    selected_ids = genomics_io.vcf_to_pandas(vcf, wanted_properties=(Keys.id,), variant_ids=set(wanted_ids)).index
+    assert selected_ids.equals(wanted_ids)
+
+    svtype = whole_variants[(None, Keys.svtype)].iloc[0]
+    selected_ids = genomics_io.vcf_to_pandas(
+        vcf, wanted_properties=(Keys.id,), variant_filter=lambda record: record.info["SVTYPE"] == svtype
+    ).index
+    assert selected_ids.equals(whole_variants.index[whole_variants[(None, Keys.svtype)] == svtype])
+
+
 def _get_uncompressed_text(filename: str) -> Tuple[str, ...]:
     with pysam.BGZFile(filename, "rb") as f_in:
         return tuple(f_in)
@@ -201,6 +270,44 @@ def test_read_write_bed(
     assert _get_uncompressed_text(temp_out_bed) != _get_uncompressed_text(small_vcf)
 
 
+def test_read_write_columnar(
+        tmpdir,
+        small_vcf: str = Default.small_vcf,
+        small_bed: str = Default.small_bed,
+        test_bed_literal_eval_columns: Set[str] = Default.test_bed_literal_eval_columns
+):
+    temp_out_dir = tmpdir.mkdir("test_write_columnar")
+    # columnar tables exactly preserve types (categoricals, nullable ints, tuples), multi-index columns, and attrs
+    variants = genomics_io.vcf_to_pandas(small_vcf)
+    columnar_file = os.path.join(temp_out_dir, "variants" + genomics_io.Default.columnar_suffix)
+    genomics_io.pandas_to_tsv(columnar_file, variants, write_index=True)
+    loaded_variants = genomics_io.tsv_to_pandas(columnar_file, columns=None)
+    pandas.testing.assert_frame_equal(loaded_variants, variants)
+    assert loaded_variants.attrs == variants.attrs
+
+    # saving / loading BED tables by extension yields the same table as the TSV path
+    bed_variants = genomics_io.bed_to_pandas(small_bed, literal_eval_columns=test_bed_literal_eval_columns)
+    tsv_file = os.path.join(temp_out_dir, os.path.basename(small_bed))
+    columnar_file = os.path.join(temp_out_dir, "variants.bed" + genomics_io.Default.columnar_suffix)
+    genomics_io.pandas_to_bed(tsv_file, bed_variants)
+    genomics_io.pandas_to_bed(columnar_file, bed_variants)
+    loaded_bed_variants = genomics_io.bed_to_pandas(columnar_file)
+    common_test_utils.assert_dataframes_equal(
+        loaded_bed_variants,
+        genomics_io.bed_to_pandas(tsv_file, literal_eval_columns=test_bed_literal_eval_columns),
+        context=f"columnar vs TSV {small_bed}"
+    )
+    pandas.testing.assert_frame_equal(loaded_bed_variants, bed_variants)
+
+    # a Sequence of columns only loads those columns, in the requested order
+    wanted_columns = [Keys.end, Keys.svtype, Keys.begin]
+    genomics_io.pandas_to_tsv(columnar_file, bed_variants)
+    pandas.testing.assert_frame_equal(
+        genomics_io.tsv_to_pandas(columnar_file, columns=wanted_columns),
+        bed_variants.loc[:, wanted_columns].reset_index(drop=True)
+    )
+
+
 def test_vcat_with_categoricals(small_vcfs: Sequence[str] = Default.small_vcfs,
                                 num_subset_samples: int = Default.num_subset_samples):
     # We have a lot of samples. To save time just test with a few, if a few work, they'll all work
@@ -1,9 +1,11 @@
 import os
 import glob
+import numpy
+import pandas
 import pytest
 from typing import Iterable
 
-from sv_utils import get_genome_track_overlaps, genomics_io
+from sv_utils import get_genome_track_overlaps, genomics_io, interval_overlaps
 
 
 class Default:
@@ -31,3 +33,25 @@ def test_get_genome_track_overlaps(
     #     -the overlap index has all the variants (it is the same as the index of the vcf)
     variant_ids = genomics_io.get_vcf_variant_ids(vcf)
     assert overlaps.index.equals(variant_ids)
+
+
+def test_overlap_support_kernel_matches_callback():
+    keys = genomics_io.Keys
+    check_intervals = pandas.DataFrame(
+        {keys.contig: ["chr1"] * 3, keys.begin: [100, 300, 310], keys.end: [110, 305, 315]}
+    )
+    # zero-length with no overlappers, fully covered, partially covered, and no overlappers
+    eval_intervals = pandas.DataFrame(
+        {keys.contig: ["chr1"] * 4, keys.begin: [50, 100, 300, 200], keys.end: [50, 110, 310, 260]},
+        index=pandas.Index(["a", "b", "c", "d"], name=keys.id)
+    )
+    overlaps = {
+        use_overlap_kernel: interval_overlaps.apply_interval_overlap_func(
+            get_genome_track_overlaps._overlap_support, eval_intervals, check_intervals, n_jobs=1,
+            use_overlap_kernel=use_overlap_kernel
+        )
+        for use_overlap_kernel in (False, True)
+    }
+    pandas.testing.assert_frame_equal(overlaps[True], overlaps[False])
+    numpy.testing.assert_array_equal(overlaps[True][get_genome_track_overlaps.Keys.overlap_support].loc[["a", "b", "c", "d"]].values,
+                                     [0.0, 1.0, 0.5, 0.0])
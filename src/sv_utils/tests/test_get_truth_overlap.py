@@ -3,10 +3,11 @@ import glob
 import pytest
 import json
 from typing import Iterable, Dict, Sequence
+import numpy
 import pysam
 import pandas
 
-from sv_utils import genomics_io, get_truth_overlap
+from sv_utils import genomics_io, get_truth_overlap, benchmark_overlap_cutoffs
 
 
 class Default:
@@ -22,6 +23,9 @@ class Default:
     pacbio_no_vapor_sample_id = "HG00733"
     vapor_no_pacbio_sample_id = "HG00512"
     pacbio_and_vapor_sample_id = "HG00514"
+    num_synthetic_variants = 5000
+    num_synthetic_trios = 2
+    num_synthetic_vapor_samples = 2
 
 
 @pytest.fixture(scope="function")
@@ -92,6 +96,102 @@ def assert_all_variant_ids_valid(confident_variants: get_truth_overlap.Confident
         assert not invalid_ids, f"In sample_confident_variants for {sample_id}, invalid variants: {invalid_ids}"
 
 
+def _baseline_from_good_bad_thresholds(
+        good_thresholds: numpy.ndarray,
+        bad_thresholds: numpy.ndarray,
+        f_beta: float = get_truth_overlap.Default.f_beta,
+        is_high_cutoff: bool = True
+) -> get_truth_overlap.PrecisionRecallCurve:
+    """ Frozen copy of PrecisionRecallCurve.from_good_bad_thresholds from before curves could be built pre-sorted """
+    nan_replacement = -numpy.inf if is_high_cutoff else numpy.inf
+    thresholds = numpy.nan_to_num(numpy.concatenate((good_thresholds, bad_thresholds)), nan=nan_replacement)
+    n_good = len(good_thresholds)
+    n_bad = len(bad_thresholds)
+    if n_good == 0 or n_bad == 0:
+        # noinspection PyTypeChecker
+        return get_truth_overlap.PrecisionRecallCurve.empty_curve
+
+    sort_ind = numpy.argsort(thresholds)[::-1] if is_high_cutoff else numpy.argsort(thresholds)
+    thresholds = thresholds.take(sort_ind)
+    recall = numpy.concatenate(
+        (numpy.full(n_good, 1.0 / n_good), numpy.zeros(n_bad))
+    ).take(sort_ind).cumsum()
+    precision = numpy.concatenate(
+        (numpy.ones(n_good), numpy.zeros(n_bad))
+    ).take(sort_ind).cumsum() \
+        / numpy.arange(1, len(sort_ind) + 1)
+
+    if is_high_cutoff:
+        __, de_dup_index = numpy.unique(thresholds[::-1], return_index=True)
+
+        def _de_dup(_arr):
+            return _arr[::-1].take(de_dup_index)[::-1]
+    else:
+        __, de_dup_index = numpy.unique(thresholds, return_index=True)
+
+        def _de_dup(_arr):
+            return _arr.take(de_dup_index)
+
+    thresholds, recall, precision = _de_dup(thresholds), _de_dup(recall), _de_dup(precision)
+    return get_truth_overlap.PrecisionRecallCurve.from_arrays(
+        thresholds=thresholds, precision=precision, recall=recall, num_good=n_good, num_bad=n_bad, is_sorted=True,
+        f_beta=f_beta, is_high_cutoff=is_high_cutoff
+    )
+
+
+def assert_curves_equal(curve: get_truth_overlap.PrecisionRecallCurve,
+                        expected_curve: get_truth_overlap.PrecisionRecallCurve):
+    assert curve.threshold.tolist() == expected_curve.threshold.tolist()
+    assert curve.precision.tolist() == expected_curve.precision.tolist()
+    assert curve.recall.tolist() == expected_curve.recall.tolist()
+    assert curve.f_score.tolist() == expected_curve.f_score.tolist()
+
+
+def test_precision_recall_curve_ties(random_seed: int = 0, num_curves: int = 200):
+    good_thresholds = numpy.array([0.0, 0.5, 0.5, 1.0])
+    bad_thresholds = numpy.array([0.0, 0.0, 0.5])
+    # selecting at a high cutoff selects every variant at that threshold
+    good_curve = get_truth_overlap.PrecisionRecallCurve.from_good_bad_thresholds(good_thresholds, bad_thresholds)
+    assert good_curve.threshold.tolist() == [1.0, 0.5, 0.0]
+    assert good_curve.precision.tolist() == [1.0, 3 / 4, 4 / 7]
+    assert good_curve.recall.tolist() == pytest.approx([1 / 4, 3 / 4, 1.0])
+    # curves with many tied thresholds must be identical to the original algorithm
+    random_state = numpy.random.RandomState(random_seed)
+    for _ in range(num_curves):
+        good_thresholds, bad_thresholds = (
+            numpy.sort(numpy.round(random_state.random_sample(random_state.randint(1, 100)) * 8) / 8)
+            for _ in range(2)
+        )
+        for is_high_cutoff in (True, False):
+            assert_curves_equal(
+                get_truth_overlap.PrecisionRecallCurve.from_good_bad_thresholds(
+                    good_thresholds, bad_thresholds, is_high_cutoff=is_high_cutoff
+                ),
+                _baseline_from_good_bad_thresholds(good_thresholds, bad_thresholds, is_high_cutoff=is_high_cutoff)
+            )
+
+
+def test_overlap_cutoff_curves(
+        monkeypatch,
+        num_synthetic_variants: int = Default.num_synthetic_variants,
+        num_synthetic_trios: int = Default.num_synthetic_trios,
+        num_synthetic_vapor_samples: int = Default.num_synthetic_vapor_samples
+):
+    # curves from the shared sort must give identical cutoffs to finding them for each category separately with the
+    # original curve algorithm
+    overlap_info = benchmark_overlap_cutoffs.make_synthetic_overlap_info(
+        num_variants=num_synthetic_variants, num_trios=num_synthetic_trios,
+        num_vapor_samples=num_synthetic_vapor_samples
+    )
+    with monkeypatch.context() as patch:
+        patch.setattr(get_truth_overlap.PrecisionRecallCurve, "from_good_bad_thresholds",
+                      staticmethod(_baseline_from_good_bad_thresholds))
+        expected_cutoff_infos = benchmark_overlap_cutoffs.get_cutoff_infos_per_selector(overlap_info)
+    assert benchmark_overlap_cutoffs.cutoff_infos_equal(
+        expected_cutoff_infos, benchmark_overlap_cutoffs.get_cutoff_infos_shared_sort(overlap_info)
+    )
+
+
 @pytest.mark.integration_test
 def test_get_truth_overlap(
         capsys,
@@ -5,7 +5,7 @@ import pandas
 import pytest
 from typing import Tuple, Union, Dict, Collection
 
-from sv_utils import interval_overlaps, genomics_io, get_truth_overlap
+from sv_utils import interval_overlaps, genomics_io, get_truth_overlap, get_genome_track_overlaps
 import common_test_utils
 
 Record = Union[numpy.record, Tuple]
@@ -44,6 +44,7 @@ class Keys:
     value_sum = "value_sum"
     primary_id = interval_overlaps.Keys.primary_id
     is_single_interval = interval_overlaps.Keys.is_single_interval
+    is_called = get_truth_overlap.Keys.is_called
 
 
 def get_interval_overlaps_test_data(
@@ -384,3 +385,51 @@ def test_real_variants_overlap(small_vcf: str = Default.small_vcf,
     # * the index for variant_overlaps should be identical to the index for variants
     common_test_utils.assert_indices_equal(variant_overlaps.index, variants.index,
                                            context="variant_overlaps.index != variants.index")
+
+
+def test_overlap_pairs(num_check_itrs: int = Default.num_check_itrs, num_check: int = 300, num_eval: int = 200):
+    random_state = numpy.random.RandomState(0)
+
+    def _random_intervals(num_intervals: int) -> pandas.DataFrame:
+        begin = random_state.randint(0, 10000, num_intervals)
+        length = random_state.randint(1, 500, num_intervals)
+        # include a few intervals long enough to overlap most of the others
+        is_long = random_state.rand(num_intervals) < 0.02
+        length[is_long] = random_state.randint(1, 10000, is_long.sum())
+        return pandas.DataFrame({Keys.begin: begin, Keys.end: begin + length}) \
+            .sort_values([Keys.begin, Keys.end]).reset_index(drop=True)
+
+    for itr in range(num_check_itrs):
+        check_intervals = _random_intervals(num_check)
+        for eval_intervals, exclude_self_overlap in (
+                (_random_intervals(num_eval), False), (check_intervals, False), (check_intervals, True)
+        ):
+            overlap_pairs = interval_overlaps.OverlapPairs.from_intervals(
+                check_intervals, eval_intervals, exclude_self_overlap=exclude_self_overlap
+            )
+            assert overlap_pairs.num_eval == len(eval_intervals)
+            for eval_ind, (begin, end) in enumerate(
+                    zip(eval_intervals[Keys.begin].values, eval_intervals[Keys.end].values)
+            ):
+                is_overlapper = (check_intervals[Keys.begin].values < end) & (check_intervals[Keys.end].values > begin)
+                if exclude_self_overlap:
+                    is_overlapper[eval_ind] = False
+                numpy.testing.assert_array_equal(overlap_pairs.overlappers(eval_ind), numpy.flatnonzero(is_overlapper))
+
+
+@pytest.mark.integration_test
+def test_overlap_kernels_match_overlap_funcs(small_vcf: str = Default.small_vcf,
+                                             wanted_properties: Collection[str] = Default.wanted_properties):
+    variants = genomics_io.vcf_to_pandas(small_vcf, wanted_properties=wanted_properties)
+    variant_simple_intervals = interval_overlaps.fix_variants(variants)
+    variant_simple_intervals[Keys.is_called] = numpy.random.RandomState(0).rand(len(variant_simple_intervals)) < 0.5
+    for overlap_func in (get_truth_overlap.quantify_overlap, get_truth_overlap.quantify_overlap_by_svtype,
+                         get_genome_track_overlaps._overlap_support):
+        overlaps = interval_overlaps.apply_interval_overlap_func(
+            overlap_func, variant_simple_intervals, use_overlap_kernel=False
+        )
+        kernel_overlaps = interval_overlaps.apply_interval_overlap_func(
+            overlap_func, variant_simple_intervals, use_overlap_kernel=True
+        )
+        pandas.testing.assert_frame_equal(kernel_overlaps.sort_index(axis=1), overlaps.sort_index(axis=1),
+                                          obj=overlap_func.__name__)
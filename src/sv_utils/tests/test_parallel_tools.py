@@ -1,7 +1,9 @@
 #!/usr/bin/env python
 
+import os
 import numpy
 import numpy.random
+import pandas
 import time
 import pytest
 import random
@@ -85,7 +87,7 @@ def _is_multiple_of_5(int_list: numpy.ndarray) -> numpy.ndarray:
 
 def _run_accuracy_trial(pool, starmap=False, args=None, kwargs=None,
                         permute_evaluation=False, ordered=True,
-                        chunksize=None):
+                        chunksize=None, shared_memory=False):
     """
     For given set of input parameters test that parallel execution
     returns correct results by comparing to serial
@@ -107,7 +109,7 @@ def _run_accuracy_trial(pool, starmap=False, args=None, kwargs=None,
     parallel_results = list(parallel_tools.pmap(
         pool, _star_func, tasks, args=args, kwargs=kwargs, update_time=None,
         starmap=starmap, ordered=ordered, chunksize=chunksize,
-        permute_evaluation=permute_evaluation
+        permute_evaluation=permute_evaluation, shared_memory=shared_memory
     ))
     # check equality
     if ordered:
@@ -172,6 +174,114 @@ def test_accuracy(pool):
     _run_accuracy_trial(pool, chunksize=1)
 
 
+def _make_frame_tasks(num_tasks: int = 20, num_rows: int = 100) -> Iterator[pandas.DataFrame]:
+    """
+    generate tasks that are DataFrames with a variety of column types
+    """
+    for task_num in range(num_tasks):
+        frame = pandas.DataFrame(
+            {
+                "float": numpy.random.randn(num_rows),
+                "int": numpy.random.randint(0, 10, num_rows),
+                "nullable": pandas.array(numpy.random.randint(0, 10, num_rows), dtype="Int32"),
+                "category": pandas.Categorical(numpy.random.choice(["a", "b", "c"], num_rows)),
+                "bool": numpy.random.rand(num_rows) < 0.5,
+                "object": [_random_word(3) for __ in range(num_rows)]
+            },
+            index=[f"{task_num}_{row}" for row in range(num_rows)]
+        )
+        frame.loc[frame.index[::3], "nullable"] = pandas.NA
+        yield frame
+
+
+def _frame_func(frame: pandas.DataFrame, offsets: numpy.ndarray) -> pandas.DataFrame:
+    return frame.assign(total=frame["float"] + frame["int"] + offsets[:len(frame)])
+
+
+def test_shared_memory(pool, monkeypatch):
+    """
+    Test that passing tasks through shared memory returns correct results
+    """
+    # share every array, no matter how small
+    monkeypatch.setattr(parallel_tools.Default, "shared_memory_min_bytes", 0)
+    _run_accuracy_trial(pool, shared_memory=True)
+    _run_accuracy_trial(pool, starmap=True, kwargs={'extra_val_2': _random_word()}, shared_memory=True)
+    _run_accuracy_trial(pool, permute_evaluation=True, ordered=False, chunksize=10, shared_memory=True)
+
+    tasks = list(_make_frame_tasks())
+    offsets = numpy.random.randn(1000)
+    serial_results = [_frame_func(task, offsets) for task in tasks]
+    parallel_results = list(parallel_tools.pmap(
+        pool, _frame_func, tasks, kwargs={"offsets": offsets}, update_time=None, shared_memory=True
+    ))
+    for parallel_result, serial_result in zip(parallel_results, serial_results):
+        pandas.testing.assert_frame_equal(parallel_result, serial_result)
+
+
+def _sum_after_sleep(array: numpy.ndarray, sleep_time: float = 0.02) -> float:
+    time.sleep(sleep_time)
+    return array.sum()
+
+
+def _num_shared_blocks(nbytes: int, shm_dir: str = "/dev/shm") -> int:
+    num_blocks = 0
+    for entry in os.scandir(shm_dir):
+        try:
+            num_blocks += entry.is_file() and entry.stat().st_size == nbytes
+        except FileNotFoundError:  # unlinked while scanning
+            pass
+    return num_blocks
+
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="requires /dev/shm")
+def test_shared_memory_bounded(pool):
+    """
+    Test that tasks are copied into shared memory as they are dispatched, not all up front
+    """
+    num_workers = len(pool._pool)
+    num_elements = 123457  # distinctive block size, to count only this test's blocks
+    nbytes = num_elements * numpy.dtype(numpy.float64).itemsize
+    for chunksize in (1, 3):
+        tasks = (numpy.full(num_elements, float(task_num)) for task_num in range(20 * (num_workers + 1) * chunksize))
+        max_blocks = 0
+        results = []
+        for result in parallel_tools.pmap(pool, _sum_after_sleep, tasks, chunksize=chunksize, update_time=None,
+                                          shared_memory=True):
+            results.append(result)
+            max_blocks = max(max_blocks, _num_shared_blocks(nbytes))
+        assert results == [task_num * num_elements for task_num in range(len(results))]
+        assert 0 < max_blocks <= (num_workers + 1) * chunksize
+        assert _num_shared_blocks(nbytes) == 0
+
+
+def test_adaptive_schedule(pool, capsys):
+    """
+    Test that largest-first, memory-throttled scheduling returns correct results and reports task cost
+    """
+    tasks = list(_make_star_tasks(num_tasks=100))
+    task_sizes = [_get_task_size(task) for task in tasks]
+    serial_results = [_star_func(*task) for task in tasks]
+    parallel_results = list(parallel_tools.pmap(
+        pool, _star_func, tasks, task_sizes=task_sizes, starmap=True, update_time=None, adaptive_schedule=True
+    ))
+    assert parallel_results == serial_results
+    assert "realized vs. estimated task cost" in capsys.readouterr().out
+
+    # with no memory to spare, dispatch is throttled to one task at a time, but all tasks still complete
+    parallel_results = list(parallel_tools.pmap(
+        pool, _star_func, (task for task in tasks), task_sizes=task_sizes, starmap=True, ordered=False,
+        update_time=None, adaptive_schedule=True, memory_budget=0, shared_memory=True
+    ))
+    assert sorted(parallel_results) == sorted(serial_results)
+
+    # flatmap without task sizes
+    tasks = [numpy.arange(t * 100, (t + 1) * 100) for t in range(10)]
+    parallel_results = list(parallel_tools.pmap(
+        pool, _is_multiple_of_5, tasks, flatmap=True, update_time=None, adaptive_schedule=True
+    ))
+    assert numpy.array_equal(parallel_results, _is_multiple_of_5(numpy.arange(1000)))
+
+
 def test_performance(pool, capsys, test_time=0.5):
     """
     Check that parallel execution is faster, wait bar can draw
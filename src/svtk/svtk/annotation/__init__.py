@@ -1 +1,2 @@
 from .annotate import annotate_vcf
+from .element_index import ElementIndex
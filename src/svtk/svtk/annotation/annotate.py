@@ -5,14 +5,20 @@
 
 """
 
+import multiprocessing
+import numpy as np
 import pandas as pd
 import pysam
-from .annotate_intersection import annotate_intersection
-from .classify_effect import classify_effect
+from .annotate_intersection import annotate_intersection, disruption_type
+from .classify_effect import classify_effect, classify_disrupt, CLASSIFIED_ELEMENTS
+from .element_index import HIT_TYPES, SPAN, MAX_PAIRS
 from .nearest_tss import annotate_nearest_tss
 import svtk.utils as svu
 
 
+ENGINES = ('bedtools', 'index')
+
+
 def annotate_gencode(sv, gencode):
     # Annotate Gencode hits and predicted effects
     hits = annotate_intersection(sv, gencode, filetype='gtf')
@@ -83,14 +89,259 @@ def annotate(sv, gencode, noncoding):
 
     effects = pd.concat([coding_anno, noncoding_anno])
 
-    # Aggregate genic effects by variant ID
-    effects = effects.pivot_table(index='name',
-                                  columns='effect',
-                                  values='gene_name',
-                                  aggfunc=lambda s: ','.join(sorted(set(s))),
-                                  fill_value='NA')
+    return aggregate_effects(effects)
 
-    return effects
+
+def aggregate_effects(effects):
+    """
+    Aggregate genic effects by variant ID.
+
+    Parameters
+    ----------
+    effects : pd.DataFrame
+        Columns = (name, svtype, gene_name, effect)
+
+    Returns
+    -------
+    effects : pd.DataFrame
+        Sorted, comma-delimited gene names with each effect (columns) for each
+        variant ID (index), or 'NA'
+    """
+    effects = effects.dropna(subset=['name', 'effect'])
+    effects = effects.drop_duplicates(['name', 'effect', 'gene_name'])
+    if len(effects) == 0:
+        return pd.DataFrame(index=pd.Index([], name='name'),
+                            columns=pd.Index([], name='effect'))
+    effects = effects.sort_values(['name', 'effect', 'gene_name'])
+
+    # Join gene names within each run of (name, effect)
+    keys = effects[['name', 'effect']]
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = (keys.values[1:] != keys.values[:-1]).any(axis=1)
+    first = np.flatnonzero(first)
+    bounds = np.append(first, len(keys)).tolist()
+    genes = effects['gene_name'].tolist()
+    genelists = [','.join(genes[a:b]) for a, b in zip(bounds[:-1], bounds[1:])]
+
+    genelists = pd.Series(genelists,
+                          index=pd.MultiIndex.from_frame(keys.iloc[first]))
+    return genelists.unstack(fill_value='NA')
+
+
+def _hits_frame(sv, query_idx, gene_names, genes, effects):
+    """Format variant/gene hits as rows of (name, svtype, gene_name, effect)"""
+    return pd.DataFrame({
+        'name': sv.names[query_idx],
+        'svtype': sv.get_svtypes()[query_idx],
+        'gene_name': np.array(gene_names, dtype=object)[genes],
+        'effect': effects})
+
+
+def _index_hits(sv, index, query, max_pairs=MAX_PAIRS):
+    """
+    Find elements overlapping each interval with an ElementIndex.
+
+    Returns
+    -------
+    query_idx, element_idx, hit_types : np.ndarray of int
+    """
+    contig_codes = index.encode_contigs(sv.contigs)[sv.contig_codes[query]]
+    start, end = sv.start[query], sv.end[query]
+
+    query_idx, element_idx = [], []
+    for q, e in index.overlaps(contig_codes, start, end, max_pairs):
+        query_idx.append(q)
+        element_idx.append(e)
+    query_idx = np.concatenate(query_idx + [np.zeros(0, dtype=np.int64)])
+    element_idx = np.concatenate(element_idx + [np.zeros(0, dtype=np.int64)])
+    hit_types = index.hit_types(start[query_idx], end[query_idx], element_idx)
+
+    # Check every svtype and hit type combination can be classified
+    svtype_codes = sv.svtype_codes[query][query_idx]
+    for svtype, hit_type in set(zip(svtype_codes.tolist(), hit_types.tolist())):
+        disruption_type(HIT_TYPES[hit_type], sv.svtypes[svtype])
+
+    return query[query_idx], element_idx, hit_types
+
+
+def annotate_gencode_index(sv, gencode, max_pairs=MAX_PAIRS):
+    """
+    Annotate Gencode hits, predicted effects and nearest TSS with an index.
+
+    Parameters
+    ----------
+    sv : svtk.utils.IntervalTable
+        SV breakpoints and CNV intervals
+    gencode : ElementIndex
+        Gencode annotations
+    max_pairs : int, optional
+        Maximum number of candidate hits tested at once
+
+    Returns
+    -------
+    effects : pd.DataFrame
+        Genic effects other than GENE_OTHER
+    nearest_tss : pd.DataFrame
+        Nearest TSS of every interval
+    """
+    name_codes, _ = pd.factorize(sv.names)
+    query = np.flatnonzero(name_codes >= 0)
+    query_idx, element_idx, hit_types = _index_hits(sv, gencode, query,
+                                                    max_pairs)
+
+    # Group hits by variant, svtype and gene
+    n_svtypes, n_genes = len(sv.svtypes), len(gencode.gene_names)
+    keys = name_codes[query_idx].astype(np.int64)
+    keys = (keys * n_svtypes + sv.svtype_codes[query_idx]) * n_genes
+    keys += gencode.gene[element_idx]
+    _, first, groups = np.unique(keys, return_index=True, return_inverse=True)
+
+    # Most severe hit of each classified element type, as in classify_effect
+    columns = np.array([CLASSIFIED_ELEMENTS.index(t) if t in CLASSIFIED_ELEMENTS else -1
+                        for t in gencode.element_types] + [-1])
+    columns = columns[gencode.element_type[element_idx]]
+    classified = columns >= 0
+    element_hits = np.full((len(first), len(CLASSIFIED_ELEMENTS)), -1)
+    np.maximum.at(element_hits, (groups[classified], columns[classified]),
+                  hit_types[classified])
+
+    # Classify each distinct combination of svtype and element hits once
+    signatures = np.column_stack([sv.svtype_codes[query_idx[first]],
+                                  element_hits])
+    signatures, signature_idx = np.unique(signatures, axis=0,
+                                          return_inverse=True)
+    effects = np.empty(len(signatures), dtype=object)
+    for i, (svtype, *hits) in enumerate(signatures.tolist()):
+        disrupt_dict = {element: HIT_TYPES[hit]
+                        for element, hit in zip(CLASSIFIED_ELEMENTS, hits)
+                        if hit >= 0}
+        effects[i] = classify_disrupt(disrupt_dict, sv.svtypes[svtype])
+    effects = effects[signature_idx]
+
+    keep = effects != 'GENE_OTHER'
+    effects = _hits_frame(sv, query_idx[first][keep], gencode.gene_names,
+                          gencode.gene[element_idx[first]][keep], effects[keep])
+
+    # Annotate nearest TSS
+    contig_codes = gencode.encode_contigs(sv.contigs)[sv.contig_codes[query]]
+    tss_idx, genes = gencode.nearest_tss(contig_codes, sv.start[query],
+                                         sv.end[query])
+    nearest_tss = _hits_frame(sv, query[tss_idx], gencode.gene_names, genes,
+                              'NEAREST_TSS')
+
+    return effects, nearest_tss
+
+
+def annotate_noncoding_index(sv, noncoding, max_pairs=MAX_PAIRS):
+    """
+    Annotate noncoding hits with an index.
+
+    Parameters
+    ----------
+    sv : svtk.utils.IntervalTable
+    noncoding : ElementIndex
+        Noncoding elements
+    max_pairs : int, optional
+
+    Returns
+    -------
+    effects : pd.DataFrame
+    """
+    name_codes, _ = pd.factorize(sv.names)
+    query = np.flatnonzero(name_codes >= 0)
+    query_idx, element_idx, hit_types = _index_hits(sv, noncoding, query,
+                                                    max_pairs)
+
+    effects = np.where(hit_types == SPAN, 'NONCODING_SPAN',
+                       'NONCODING_BREAKPOINT').astype(object)
+    effects = _hits_frame(sv, query_idx, noncoding.gene_names,
+                          noncoding.gene[element_idx], effects)
+
+    return effects.drop_duplicates()
+
+
+def _annotate_index_chunk(args):
+    sv, gencode, noncoding = args
+    coding_anno, nearest_tss = (None, None) if gencode is None else \
+        annotate_gencode_index(sv, gencode)
+    noncoding_anno = None if noncoding is None else \
+        annotate_noncoding_index(sv, noncoding)
+
+    return coding_anno, nearest_tss, noncoding_anno
+
+
+def split_intervals(sv, n_chunks):
+    """
+    Split intervals into chunks of similar size, keeping the intervals of
+    each variant in the same chunk.
+
+    Parameters
+    ----------
+    sv : svtk.utils.IntervalTable
+    n_chunks : int
+
+    Returns
+    -------
+    chunks : list of svtk.utils.IntervalTable
+    """
+    if len(sv) == 0:
+        return [sv]
+
+    names = sv.names
+    starts = np.flatnonzero(np.append(True, names[1:] != names[:-1]))
+    targets = np.linspace(0, len(sv), n_chunks + 1)[1:-1]
+    bounds = starts[np.minimum(np.searchsorted(starts, targets), len(starts) - 1)]
+    bounds = np.unique(np.concatenate([[0], bounds, [len(sv)]]))
+
+    return [sv.take(slice(a, b)) for a, b in zip(bounds[:-1], bounds[1:])
+            if b > a]
+
+
+def annotate_index(sv, gencode, noncoding, processes=1):
+    """
+    Annotate SV with prebuilt element indexes.
+
+    Equivalent to `annotate` with the Gencode and noncoding elements loaded
+    as `ElementIndex`es, and intervals as an `IntervalTable`. Intervals are
+    annotated in chunks by a pool of worker processes if requested.
+
+    Parameters
+    ----------
+    sv : svtk.utils.IntervalTable
+        SV breakpoints and CNV intervals
+    gencode : ElementIndex
+        Gencode annotations
+    noncoding : ElementIndex
+        Noncoding elements
+    processes : int, optional
+        Number of worker processes
+
+    Returns
+    -------
+    effects : pd.DataFrame
+        See `aggregate_effects`
+    """
+    tasks = [(chunk, gencode, noncoding) for chunk in
+             split_intervals(sv, 4 * processes if processes > 1 else 1)]
+    if processes > 1:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.map(_annotate_index_chunk, tasks)
+    else:
+        results = [_annotate_index_chunk(task) for task in tasks]
+
+    coding_anno, nearest_tss, noncoding_anno = [
+        pd.concat(anno) if anno[0] is not None else None
+        for anno in zip(*results)]
+
+    # Only include TSS if no genic hit observed
+    if coding_anno is not None:
+        nearest_tss = nearest_tss.loc[~nearest_tss.name.isin(coding_anno.name)]
+    if noncoding_anno is not None:
+        noncoding_anno = noncoding_anno.drop_duplicates()
+
+    effects = pd.concat([coding_anno, nearest_tss, noncoding_anno])
+
+    return aggregate_effects(effects)
 
 
 GENCODE_INFO = [
@@ -113,19 +364,27 @@ NONCODING_INFO = [
 ]
 
 
-def annotate_vcf(vcf, gencode, noncoding, annotated_vcf):
+def annotate_vcf(vcf, gencode, noncoding, annotated_vcf, engine='bedtools',
+                 processes=1):
     """
     Parameters
     ----------
     vcf : pysam.VariantFile
-    gencode : pbt.BedTool
+    gencode : pbt.BedTool or ElementIndex
         Gencode gene annotations
-    noncoding : pbt.BedTool
+    noncoding : pbt.BedTool or ElementIndex
         Noncoding elements
     annotated_vcf : str
         Path to output VCF
+    engine : str, optional
+        'bedtools' to intersect BedTools, or 'index' to query ElementIndexes
+    processes : int, optional
+        Number of worker processes used by the index engine
     """
 
+    if engine not in ENGINES:
+        raise ValueError('Invalid annotation engine: %s' % engine)
+
     # Add metadata lines for annotations
     header = vcf.header
 
@@ -144,10 +403,15 @@ def annotate_vcf(vcf, gencode, noncoding, annotated_vcf):
         fname = vcf.filename.decode()
     else:
         fname = vcf.filename
-    sv = svu.vcf2bedtool(fname, split_bnd=True, split_cpx=True,
-                         simple_sinks=True, include_unresolved=False)
+    if engine == 'index':
+        sv = svu.vcf2intervals(fname, split_bnd=True, split_cpx=True,
+                               simple_sinks=True, include_unresolved=False)
+        effects = annotate_index(sv, gencode, noncoding, processes)
+    else:
+        sv = svu.vcf2bedtool(fname, split_bnd=True, split_cpx=True,
+                             simple_sinks=True, include_unresolved=False)
+        effects = annotate(sv, gencode, noncoding)
 
-    effects = annotate(sv, gencode, noncoding)
     effects = effects.to_dict(orient='index')
     # Add results to variant records and save
     for record in vcf:
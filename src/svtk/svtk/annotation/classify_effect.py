@@ -6,6 +6,9 @@
 Classify predicted genic effect of SV.
 """
 
+# Element types which the classification of a genic hit depends on
+CLASSIFIED_ELEMENTS = ['CDS', 'UTR', 'transcript', 'gene', 'promoter']
+
 
 def classify_del(disrupt_dict):
     """
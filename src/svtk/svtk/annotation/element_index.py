@@ -0,0 +1,409 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+
+"""
+Prebuilt index of genomic elements for annotating SV without bedtools.
+"""
+
+import gzip
+import json
+import os
+import numpy as np
+from .annotate_intersection import split_gencode_fields
+
+
+# Coordinates are offset by (segment << SHIFT), so that the elements of every
+# (element type, contig) segment can be searched in one sorted array
+SHIFT = 40
+
+# Hit types, in the order in which they are reported by classify_effect when
+# an element type is hit more than once
+HIT_TYPES = ['BOTH-INSIDE', 'ONE-INSIDE', 'SPAN']
+BOTH_INSIDE, ONE_INSIDE, SPAN = range(len(HIT_TYPES))
+
+MAX_PAIRS = 2 ** 22
+
+ARRAYS = ('start', 'end', 'gene', 'element_type', 'start_key', 'max_end_key',
+          'tss_plus_key', 'tss_plus_gene', 'tss_minus_key', 'tss_minus_gene')
+
+
+def _open(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt')
+    return open(path)
+
+
+def _overlap_coords(start, end):
+    """Treat zero-length intervals as 1bp either side, as bedtools does"""
+    zero = start == end
+    return start - zero, end + zero
+
+
+def _expand(lo, n):
+    """Indices of each query, and lo[query] + offset for offset < n[query]"""
+    query = np.repeat(np.arange(n.shape[0]), n)
+    offsets = np.arange(query.shape[0]) - np.repeat(np.cumsum(n) - n, n)
+    return query, lo[query] + offsets
+
+
+def _chunks(n, max_pairs):
+    """Split queries into runs with at most max_pairs candidates (or one query)"""
+    cumsum = np.cumsum(n)
+    first = 0
+    while first < n.shape[0]:
+        done = cumsum[first - 1] if first > 0 else 0
+        last = max(np.searchsorted(cumsum, done + max_pairs, side='right'),
+                   first + 1)
+        yield first, last
+        first = last
+
+
+class ElementIndex(object):
+    """
+    Sorted arrays of genomic elements, with interned contig, element type and
+    gene names.
+
+    Elements are sorted by element type, contig and start. Each element is
+    keyed by (segment << SHIFT) + coordinate, where segment enumerates the
+    (element type, contig) pairs, along with a running maximum of end keys,
+    so the elements overlapping any interval are found with two binary
+    searches. Transcription start sites of transcripts are stored separately
+    for each strand.
+
+    An index is built once from a GTF or BED, saved as a directory of .npy
+    arrays, and memory-mapped when loaded.
+    """
+
+    def __init__(self, filetype, contigs, element_types, gene_names, arrays,
+                 path=None):
+        """
+        filetype : str
+            'gtf' or 'bed'
+        contigs : list of str
+        element_types : list of str
+            GTF feature types, or ['noncoding'] for a BED
+        gene_names : list of str
+            GTF gene names, or BED element classes
+        arrays : dict of {str: np.ndarray}
+            See `ARRAYS`. Starts are 0-based.
+        path : str, optional
+            Directory the index was loaded from
+        """
+        self.filetype = filetype
+        self.contigs = contigs
+        self.element_types = element_types
+        self.gene_names = gene_names
+        self.path = path
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+
+        self.contig_codes = {contig: i for i, contig in enumerate(contigs)}
+
+    def __reduce__(self):
+        # Let worker processes map a saved index instead of copying it
+        if self.path is not None:
+            return (ElementIndex.load, (self.path, ))
+        return (ElementIndex, (self.filetype, self.contigs, self.element_types,
+                               self.gene_names,
+                               {name: getattr(self, name) for name in ARRAYS}))
+
+    @classmethod
+    def from_elements(cls, filetype, chroms, starts, ends, element_types,
+                      genes, strands=None):
+        """
+        Build an index from lists of element fields.
+
+        Parameters
+        ----------
+        filetype : str
+        chroms, element_types, genes : list of str
+        starts, ends : list of int
+            0-based coordinates
+        strands : list of str, optional
+            Strand of each element, used for transcription start sites
+        """
+
+        contig_codes, type_codes, gene_codes = {}, {}, {}
+
+        def _encode(values, codes):
+            return np.array([codes.setdefault(v, len(codes)) for v in values],
+                            dtype=np.int32)
+
+        contig = _encode(chroms, contig_codes)
+        element_type = _encode(element_types, type_codes)
+        gene = _encode(genes, gene_codes)
+        start = np.array(starts, dtype=np.int64)
+        end = np.array(ends, dtype=np.int64)
+
+        segment = element_type.astype(np.int64) * len(contig_codes) + contig
+        ov_start, ov_end = _overlap_coords(start, end)
+        start_key = (segment << SHIFT) + ov_start
+        order = np.argsort(start_key, kind='stable')
+
+        # Running maximum of end keys within each segment. Segment offsets
+        # keep it from carrying over between segments.
+        max_end_key = np.maximum.accumulate(((segment << SHIFT) + ov_end)[order])
+
+        # Transcription start sites, as 1bp intervals
+        if strands is not None and 'transcript' in type_codes:
+            strand = np.array(strands, dtype=object)
+            is_tx = element_type == type_codes['transcript']
+            is_minus = strand == '-'
+            tss = np.where(is_minus, end, start)
+            tss_key = (contig.astype(np.int64) << SHIFT) + tss
+            plus = np.flatnonzero(is_tx & ~is_minus)
+            minus = np.flatnonzero(is_tx & is_minus)
+            plus = plus[np.argsort(tss_key[plus], kind='stable')]
+            minus = minus[np.argsort(tss_key[minus], kind='stable')]
+        else:
+            tss_key = np.zeros(0, dtype=np.int64)
+            plus = minus = np.zeros(0, dtype=np.int64)
+
+        arrays = dict(start=start[order], end=end[order], gene=gene[order],
+                      element_type=element_type[order],
+                      start_key=start_key[order], max_end_key=max_end_key,
+                      tss_plus_key=tss_key[plus], tss_plus_gene=gene[plus],
+                      tss_minus_key=tss_key[minus], tss_minus_gene=gene[minus])
+
+        return cls(filetype, list(contig_codes), list(type_codes),
+                   list(gene_codes), arrays)
+
+    @classmethod
+    def from_gtf(cls, path):
+        """
+        Index Gencode gene annotations.
+
+        Parameters
+        ----------
+        path : str
+            GTF, optionally gzipped
+        """
+        chroms, starts, ends, types, genes, strands = [], [], [], [], [], []
+        with _open(path) as gtf:
+            for line in gtf:
+                if line.startswith(('#', 'track', 'browser')):
+                    continue
+                fields = line.rstrip('\n').split('\t')
+                chroms.append(fields[0])
+                types.append(fields[2])
+                starts.append(int(fields[3]) - 1)
+                ends.append(int(fields[4]))
+                strands.append(fields[6])
+                genes.append(split_gencode_fields(fields[8])['gene_name'])
+
+        return cls.from_elements('gtf', chroms, starts, ends, types, genes,
+                                 strands)
+
+    @classmethod
+    def from_bed(cls, path):
+        """
+        Index noncoding elements.
+
+        Parameters
+        ----------
+        path : str
+            BED, optionally gzipped. Columns = chr,start,end,element_class
+        """
+        chroms, starts, ends, genes = [], [], [], []
+        with _open(path) as bed:
+            for line in bed:
+                if line.startswith(('#', 'track', 'browser')):
+                    continue
+                fields = line.rstrip('\n').split('\t')
+                chroms.append(fields[0])
+                starts.append(int(fields[1]))
+                ends.append(int(fields[2]))
+                genes.append(fields[3])
+
+        return cls.from_elements('bed', chroms, starts, ends,
+                                 ['noncoding'] * len(chroms), genes)
+
+    def save(self, path):
+        """
+        Save the index as a directory of .npy arrays.
+
+        Parameters
+        ----------
+        path : str
+        """
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAYS:
+            np.save(os.path.join(path, name + '.npy'), getattr(self, name))
+        with open(os.path.join(path, 'index.json'), 'w') as f:
+            json.dump(dict(filetype=self.filetype, contigs=self.contigs,
+                           element_types=self.element_types,
+                           gene_names=self.gene_names), f)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-map an index saved with `save`.
+
+        Parameters
+        ----------
+        path : str
+        """
+        with open(os.path.join(path, 'index.json')) as f:
+            info = json.load(f)
+        arrays = {name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+                  for name in ARRAYS}
+
+        return cls(info['filetype'], info['contigs'], info['element_types'],
+                   info['gene_names'], arrays, path=path)
+
+    def encode_contigs(self, contigs):
+        """
+        Parameters
+        ----------
+        contigs : list of str
+
+        Returns
+        -------
+        codes : np.ndarray of int
+            Index contig code of each contig, or -1 if it has no elements
+        """
+        return np.array([self.contig_codes.get(c, -1) for c in contigs],
+                        dtype=np.int64)
+
+    def hit_types(self, start, end, element_idx):
+        """
+        Classify how intervals overlap elements, as in
+        `annotate_intersection.intersection_type`.
+
+        Parameters
+        ----------
+        start, end : np.ndarray of int
+            0-based coordinates of each interval
+        element_idx : np.ndarray of int
+            Element overlapped by each interval
+
+        Returns
+        -------
+        hit_types : np.ndarray of int
+            Indices into `HIT_TYPES`
+        """
+        element_start = self.start[element_idx]
+        if self.filetype == 'gtf':
+            element_start = element_start + 1
+        element_end = self.end[element_idx]
+
+        start_inside = (start > element_start) & (start < element_end)
+        end_inside = (end > element_start) & (end < element_end)
+        both_inside = (start > element_start) & (end < element_end)
+
+        return np.where(both_inside, BOTH_INSIDE,
+                        np.where(start_inside | end_inside, ONE_INSIDE, SPAN))
+
+    def overlaps(self, contig_codes, start, end, max_pairs=MAX_PAIRS):
+        """
+        Find elements of every type overlapping each interval, as with
+        `bedtools intersect -wa -wb`.
+
+        Parameters
+        ----------
+        contig_codes : np.ndarray of int
+            Index contig code of each interval (see `encode_contigs`)
+        start, end : np.ndarray of int
+            0-based coordinates of each interval
+        max_pairs : int, optional
+            Maximum number of candidate pairs tested at once
+
+        Yields
+        ------
+        query_idx : np.ndarray of int
+        element_idx : np.ndarray of int
+            Indices of overlapping interval/element pairs
+        """
+        ov_start, ov_end = _overlap_coords(start, end)
+        n_contigs = len(self.contigs)
+
+        # One query per interval and element type
+        query = np.tile(np.flatnonzero(contig_codes >= 0),
+                        len(self.element_types))
+        element_type = np.repeat(np.arange(len(self.element_types)),
+                                 np.count_nonzero(contig_codes >= 0))
+        segment = element_type * n_contigs + contig_codes[query]
+
+        # Elements ending after the interval starts, up to the last element
+        # starting before it ends
+        lo = np.searchsorted(self.max_end_key,
+                             (segment << SHIFT) + ov_start[query], side='right')
+        hi = np.searchsorted(self.start_key,
+                             (segment << SHIFT) + ov_end[query], side='left')
+        n = np.maximum(hi - lo, 0)
+
+        for first, last in _chunks(n, max_pairs):
+            idx, element_idx = _expand(lo[first:last], n[first:last])
+            query_idx = query[first:last][idx]
+            element_end = _overlap_coords(self.start[element_idx],
+                                          self.end[element_idx])[1]
+            keep = element_end > ov_start[query_idx]
+            yield query_idx[keep], element_idx[keep]
+
+    def nearest_tss(self, contig_codes, start, end):
+        """
+        Find the nearest transcription start site to each interval, as with
+        `bedtools closest -D b -id -t all` against 1bp TSS intervals.
+
+        Overlapping TSS are nearest. Otherwise, only TSS downstream of the
+        interval on their own strand are considered, and all TSS tied for the
+        shortest distance are reported.
+
+        Parameters
+        ----------
+        contig_codes : np.ndarray of int
+        start, end : np.ndarray of int
+
+        Returns
+        -------
+        query_idx : np.ndarray of int
+        gene : np.ndarray of int
+            Gene codes of the nearest TSS of each interval
+        """
+        ov_start, ov_end = _overlap_coords(start, end)
+        query = np.flatnonzero(contig_codes >= 0)
+        base = contig_codes[query] << SHIFT
+        qs, qe = base + ov_start[query], base + ov_end[query]
+        next_base = base + (1 << SHIFT)
+
+        plus_key, minus_key = self.tss_plus_key, self.tss_minus_key
+
+        # TSS within the interval
+        plus_lo = np.searchsorted(plus_key, qs, side='left')
+        plus_hi = np.searchsorted(plus_key, qe, side='left')
+        minus_lo = np.searchsorted(minus_key, qs, side='left')
+        minus_hi = np.searchsorted(minus_key, qe, side='left')
+        overlap = (plus_hi > plus_lo) | (minus_hi > minus_lo)
+
+        # Nearest + strand TSS after the interval
+        plus_pos = np.append(plus_key, np.iinfo(np.int64).max)[plus_hi]
+        plus_dist = np.where(plus_pos < next_base, plus_pos - qe + 1,
+                             np.iinfo(np.int64).max)
+
+        # Nearest - strand TSS before the interval
+        minus_pos = np.append(minus_key, -1)[minus_lo - 1]
+        minus_dist = np.where(minus_pos >= base, qs - minus_pos,
+                              np.iinfo(np.int64).max)
+
+        dist = np.minimum(plus_dist, minus_dist)
+        found = dist < np.iinfo(np.int64).max
+        use_plus = ~overlap & found & (plus_dist == dist)
+        use_minus = ~overlap & found & (minus_dist == dist)
+
+        # All TSS tied at the nearest position
+        plus_lo = np.where(overlap, plus_lo, plus_hi)
+        plus_hi = np.where(overlap, plus_hi, np.where(
+            use_plus, np.searchsorted(plus_key, plus_pos, side='right'), plus_hi))
+        minus_hi = np.where(overlap, minus_hi, minus_lo)
+        minus_lo = np.where(overlap, minus_lo, np.where(
+            use_minus, np.searchsorted(minus_key, minus_pos, side='left'), minus_lo))
+
+        plus_idx, plus_tss = _expand(plus_lo, plus_hi - plus_lo)
+        minus_idx, minus_tss = _expand(minus_lo, minus_hi - minus_lo)
+
+        query_idx = np.concatenate([query[plus_idx], query[minus_idx]])
+        gene = np.concatenate([self.tss_plus_gene[plus_tss],
+                               self.tss_minus_gene[minus_tss]])
+
+        return query_idx, gene
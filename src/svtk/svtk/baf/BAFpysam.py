@@ -1,4 +1,6 @@
 #!/usr/bin/env python
+from collections import OrderedDict
+import copy
 from scipy import stats
 import numpy as np
 from sklearn import mixture
@@ -28,45 +30,160 @@ def ROH(F, M, E, length, thres=0.0001):
         return False
 
 
+def Deltest_array(F, M, E, length, thres1=0.0005):
+    """
+    Vectorized Deltest over per-sample het SNP counts.
+
+    Parameters
+    ----------
+    F, M, E : np.ndarray of int
+        Het SNP counts before, inside, and after the CNV
+    length : int
+
+    Returns
+    -------
+    ratio : np.ndarray of float
+        Del statistic of each sample (NaN where is_roh)
+    is_roh : np.ndarray of bool
+        Samples in a run of homozygosity
+    """
+    thres1 = min(50 / length, thres1)
+    low_M = M / length < thres1
+    is_roh = (F / length < thres1) & low_M | (E / length < thres1) & low_M
+
+    flank = np.minimum(F, E)
+    ratio = np.log10((M + thres1 * length) / (flank + thres1 * length))
+    ratio[is_roh] = np.nan
+
+    return ratio, is_roh
+
+
+class GMMFitter:
+
+    def __init__(self, n_init=20, max_iter=200, cache_size=0, decimals=3,
+                 warm_start=False, random_state=None):
+        """
+        Fit the mixture model of null Del statistics used by DeletionTest.
+
+        The default parameters reproduce a fresh fit per CNV. Fitting can be
+        made cheaper with fewer initializations or iterations, by reusing a
+        model already fit to a null distribution which is identical after
+        rounding, or by initializing each fit from the previous one.
+
+        Parameters
+        ----------
+        n_init : int, optional
+            Number of initializations per fit
+        max_iter : int, optional
+            Maximum EM iterations per fit
+        cache_size : int, optional
+            Number of fitted models to keep for reuse. 0 disables caching.
+        decimals : int, optional
+            Null ratios are rounded to this many decimals to key the cache
+        warm_start : bool, optional
+            Initialize each fit from the previous fitted model
+        random_state : int or np.random.RandomState, optional
+
+        Attributes
+        ----------
+        n_fits : int
+            Number of models fit
+        n_cached : int
+            Number of fits served from the cache
+        """
+        self.n_init = n_init
+        self.max_iter = max_iter
+        self.cache_size = cache_size
+        self.decimals = decimals
+        self.warm_start = warm_start
+        self.random_state = random_state
+
+        self.cache = OrderedDict()
+        self.previous = None
+
+        self.n_fits = 0
+        self.n_cached = 0
+
+    def fit(self, nullratio):
+        """
+        Parameters
+        ----------
+        nullratio : np.ndarray
+            Del statistics of non-ROH controls, shape (n, 1)
+
+        Returns
+        -------
+        gmm : mixture.BayesianGaussianMixture
+        """
+        key = None
+        if self.cache_size > 0:
+            # Adding 0 maps -0.0 to 0.0
+            key = (np.round(np.sort(nullratio, axis=None), self.decimals) + 0.0).tobytes()
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.n_cached += 1
+                return self.cache[key]
+
+        if self.warm_start and self.previous is not None:
+            gmm = copy.deepcopy(self.previous)
+        else:
+            gmm = mixture.BayesianGaussianMixture(
+                n_components=3, covariance_type='spherical', n_init=self.n_init,
+                max_iter=self.max_iter, random_state=self.random_state,
+                warm_start=self.warm_start)
+        gmm.fit(nullratio)
+        self.n_fits += 1
+
+        if self.warm_start:
+            self.previous = gmm
+        if key is not None:
+            self.cache[key] = gmm
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+        return gmm
+
+
 class DeletionTest:
 
-    def __init__(self, obj, probands, length, random_state=None):
+    def __init__(self, obj, probands, length, random_state=None, fitter=None):
+        """
+        fitter : GMMFitter, optional
+            Fits the null model. Defaults to a fresh, full fit per CNV
+            using random_state.
+        """
         self.length = length  # length of SV
         self.obj = obj  # het file
-        # self.homobkgrd=0
-        # self.hetbkgrd=0
         self.probands = probands  # python list of proband IDs
         self.count = {}  # record of FME count and Deltest statistic for everyone
         self.nullratio = []  # list of del statistic for non-ROH controls
-        # if not os.path.isfile(self.regionfile):
-        # raise ValueError("file not found")
 
         if self.obj.shape[0] == 0:
             self.nullavg = 'nan'
             self.ns = 0
         else:
-            nsROH = 0  # total number of SNP in nonROH controls in SV region
-            ns = 0  # total number of SNPs in SV region
-            for index, row in self.obj.iterrows():
-                F = row['before']
-                M = row['inside']
-                E = row['after']
-                # print(dat[-1])
-                self.count[row['sample']] = {
-                    'F': F, 'M': M, 'E': E, 'Ratio': Deltest(F, M, E, self.length)}
-                if row['sample'] not in self.probands and Deltest(F, M, E, self.length) != 'ROH':
-                    self.nullratio.append(Deltest(F, M, E, self.length))
-                    # print(F,M,E)
-                    nsROH += M
-                ns += M
-
-            self.nullavg = nsROH / (len(self.nullratio) + 1)
+            samples = self.obj['sample'].tolist()
+            F = self.obj['before'].to_numpy()
+            M = self.obj['inside'].to_numpy()
+            E = self.obj['after'].to_numpy()
+            ratio, is_roh = Deltest_array(F, M, E, self.length)
+
+            for i, sample in enumerate(samples):
+                self.count[sample] = {'F': F[i], 'M': M[i], 'E': E[i],
+                                      'Ratio': 'ROH' if is_roh[i] else ratio[i]}
+
+            # Del statistic of non-ROH controls
+            is_null = ~self.obj['sample'].isin(self.probands).to_numpy() & ~is_roh
+            nsROH = M[is_null].sum()  # total number of SNP in nonROH controls in SV region
+            ns = M.sum()  # total number of SNPs in SV region
+
+            self.nullavg = nsROH / (np.count_nonzero(is_null) + 1)
             self.ns = ns
-            self.nullratio = np.array(self.nullratio).reshape(-1, 1)
+            self.nullratio = ratio[is_null].reshape(-1, 1)
             if self.is_trainable_nullratio:
-                self.gmm = mixture.BayesianGaussianMixture(
-                    n_components=3, covariance_type='spherical', n_init=20, max_iter=200, random_state=random_state
-                ).fit(self.nullratio)
+                if fitter is None:
+                    fitter = GMMFitter(random_state=random_state)
+                self.gmm = fitter.fit(self.nullratio)
     # def Ttest(self,sample):
 
         # testlist=[self.count[x]['Ratio'] for x in sample if self.count[x]['Ratio']!='ROH']
@@ -178,28 +295,21 @@ class KS2sample:
         self.probands = probands
         self.controlst = []
         self.dct = {}
-        # if not os.path.isfile(self.regionfile):
-        # raise ValueError("file not found")
         if obj.shape[0] == 0:
             self.mean = ''
-        for index, row in self.obj.iterrows():
-            if row['sample'] not in probands:
-                self.controlst.append(row['baf'])
-            else:
-                if row['sample'] not in self.dct.keys():
-                    self.dct[row['sample']] = [row['baf']]
-                else:
-                    self.dct[row['sample']].append(row['baf'])
+            return
+
+        is_proband = obj['sample'].isin(probands).to_numpy()
+        bafs = obj['baf'].to_numpy()
+        self.controlst = bafs[~is_proband]
 
-        # self.mean=np.mean(self.controlst)##
-        # self.sd=np.std(self.controlst)##
-        # print(self.mean,self.sd)
+        proband_bafs = bafs[is_proband]
+        for sample, idx in obj.loc[is_proband].groupby('sample', sort=False).indices.items():
+            self.dct[sample] = proband_bafs[idx]
 
     def test(self, samples):
-        testset = []
-        for sample in samples:
-            if sample in self.dct.keys():
-                testset += self.dct[sample]
+        testset = [self.dct[sample] for sample in samples if sample in self.dct]
+        testset = np.concatenate(testset) if len(testset) > 0 else []
         if len(testset) < 1:
             return 'nan', "lowSNPs"
         elif len(self.controlst) < 1:
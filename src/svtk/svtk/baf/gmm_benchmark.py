@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Compare null model fitting strategies for the BAF deletion test.
+
+Each strategy scores every CNV in a BAF bed, and its scores are compared to
+the reference (full fit per CNV, as run by `svtk baf-test` by default).
+
+usage: python -m svtk.baf.gmm_benchmark cnv.bed baf.txt.gz batch.txt
+"""
+
+import argparse
+import sys
+import time
+import numpy as np
+from svtk.baf.BAFpysam import DeletionTest, GMMFitter
+from svtk.cli.baf_test import preprocess
+import pysam
+
+
+STRATEGIES = [
+    ('reference', {}),
+    ('fast', dict(n_init=3, max_iter=100)),
+    ('warm_start', dict(n_init=3, max_iter=100, warm_start=True)),
+    ('cache', dict(cache_size=1000, decimals=2)),
+    ('fast_cache_warm', dict(n_init=3, max_iter=100, cache_size=1000,
+                             decimals=2, warm_start=True)),
+]
+
+
+def load_cnvs(bed, tbx, samples):
+    cnvs = []
+    with open(bed) as f:
+        for line in f:
+            if line.startswith('#'):
+                continue
+            dat = line.rstrip().split('\t')
+            chrom, start, end = dat[0], int(dat[1]), int(dat[2])
+            try:
+                het_counts, _ = preprocess(chrom, start, end, tbx, samples=samples)
+            except ValueError:
+                continue
+            if not het_counts.empty:
+                cnvs.append((het_counts, dat[4].split(','), min(end - start, 1000000)))
+
+    return cnvs
+
+
+def score_cnvs(cnvs, **kwargs):
+    fitter = GMMFitter(random_state=np.random.RandomState(0), **kwargs)
+    scores = np.full(len(cnvs), np.nan)
+
+    start = time.time()
+    for i, (het_counts, probands, length) in enumerate(cnvs):
+        Del = DeletionTest(het_counts, probands, length, fitter=fitter)
+        _, delp = Del.Ttest(probands)
+        if not isinstance(delp, str):
+            scores[i] = delp
+
+    return scores, time.time() - start, fitter
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('bed', help='BAF bed of CNVs.')
+    parser.add_argument('file', help='Compiled snp file')
+    parser.add_argument('batch', help='Batch sample table')
+    args = parser.parse_args(argv)
+
+    with open(args.batch) as f:
+        f.readline()
+        samples = [line.split('\t')[0] for line in f]
+    tbx = pysam.TabixFile(args.file)
+    cnvs = load_cnvs(args.bed, tbx, samples)
+
+    header = 'strategy seconds speedup fits cached scored max_abs_diff mean_abs_diff'
+    sys.stdout.write('\t'.join(header.split()) + '\n')
+
+    for name, kwargs in STRATEGIES:
+        scores, seconds, fitter = score_cnvs(cnvs, **kwargs)
+        if name == 'reference':
+            reference, ref_seconds = scores, seconds
+
+        scored = ~np.isnan(scores) & ~np.isnan(reference)
+        diff = np.abs(scores[scored] - reference[scored])
+        max_diff = diff.max() if diff.size > 0 else 0
+        mean_diff = diff.mean() if diff.size > 0 else 0
+
+        row = [name, '%.2f' % seconds, '%.1f' % (ref_seconds / seconds),
+               fitter.n_fits, fitter.n_cached, np.count_nonzero(scored),
+               '%.4g' % max_diff, '%.4g' % mean_diff]
+        sys.stdout.write('\t'.join(str(x) for x in row) + '\n')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
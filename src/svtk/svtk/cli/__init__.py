@@ -5,7 +5,7 @@ from .count_svtypes import main as count_svtypes
 from .bincov import main as bincov
 from .rdtest2vcf import main as rdtest2vcf
 from .resolve import main as resolve
-from .annotate import main as annotate
+from .annotate import main as annotate, index_main as annotate_index
 from .utils import vcf2bed, remote_tabix
 from .pesr_test import pe_test, sr_test, count_pe, count_sr
 from .adjudicate import main as adjudicate
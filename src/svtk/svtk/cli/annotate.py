@@ -39,13 +39,30 @@ the SV meets the defined criteria:
 
 An SV is annotated with a new NONCODING INFO field containing all classes of
 noncoding elements which the variant overlaps.
+
+With `--engine index`, annotations are loaded into sorted in-memory arrays
+instead of being intersected with bedtools. `--gencode` and `--noncoding` may
+then also be indexes prebuilt with `svtk annotate-index`, which are
+memory-mapped on load.
 """
 
 import argparse
+import os
 import sys
 import pysam
 import pybedtools as pbt
 import svtk.annotation as anno
+from svtk.annotation.annotate import ENGINES
+
+
+def load_index(path, filetype):
+    """Memory-map a prebuilt index, or build one from a GTF or BED"""
+    if os.path.isdir(path):
+        return anno.ElementIndex.load(path)
+    elif filetype == 'gtf':
+        return anno.ElementIndex.from_gtf(path)
+    else:
+        return anno.ElementIndex.from_bed(path)
 
 
 def main(argv):
@@ -58,6 +75,15 @@ def main(argv):
     parser.add_argument('--noncoding', help='Noncoding elements (bed). '
                         'Columns = chr,start,end,element_class,element_name')
     parser.add_argument('annotated_vcf', help='Annotated variants.')
+    parser.add_argument('--engine', choices=ENGINES, default='bedtools',
+                        help='Method used to find overlapping elements. '
+                        '"index" queries sorted arrays of elements in memory, '
+                        'and accepts indexes built by `svtk annotate-index`. '
+                        '[bedtools]')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='With --engine index, annotate chunks of '
+                        'variants in parallel with this many worker '
+                        'processes. [1]')
 
     # Print help if no arguments specified
     if len(argv) == 0:
@@ -74,10 +100,44 @@ def main(argv):
 
     vcf = pysam.VariantFile(args.vcf)
 
-    gencode = None if args.gencode is None else pbt.BedTool(args.gencode)
-    noncoding = None if args.noncoding is None else pbt.BedTool(args.noncoding)
+    if args.engine == 'index':
+        gencode = None if args.gencode is None else \
+            load_index(args.gencode, 'gtf')
+        noncoding = None if args.noncoding is None else \
+            load_index(args.noncoding, 'bed')
+    else:
+        gencode = None if args.gencode is None else pbt.BedTool(args.gencode)
+        noncoding = None if args.noncoding is None else \
+            pbt.BedTool(args.noncoding)
+
+    anno.annotate_vcf(vcf, gencode, noncoding, args.annotated_vcf,
+                      engine=args.engine, processes=args.processes)
+
+
+def index_main(argv):
+    parser = argparse.ArgumentParser(
+        description='Build an annotation index for `svtk annotate --engine '
+        'index` from Gencode gene annotations or noncoding elements.',
+        prog='svtk annotate-index',
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('annotations', help='Gencode gene annotations (GTF) '
+                        'or noncoding elements (bed).')
+    parser.add_argument('index', help='Output index directory.')
+    parser.add_argument('--filetype', choices=['gtf', 'bed'], default=None,
+                        help='Annotation format. [inferred from extension]')
+
+    # Print help if no arguments specified
+    if len(argv) == 0:
+        parser.print_help()
+        sys.exit(1)
+    args = parser.parse_args(argv)
+
+    filetype = args.filetype
+    if filetype is None:
+        is_gtf = args.annotations.endswith(('.gtf', '.gtf.gz'))
+        filetype = 'gtf' if is_gtf else 'bed'
 
-    anno.annotate_vcf(vcf, gencode, noncoding, args.annotated_vcf)
+    load_index(args.annotations, filetype).save(args.index)
 
 
 if __name__ == '__main__':
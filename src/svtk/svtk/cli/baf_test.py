@@ -1,13 +1,39 @@
 #!usr/bin/env python
 from svtk.baf.BAFpysam import *
 import argparse
-from collections import deque
+import io
 import numpy as np
 import pandas as pd
 import pysam
 import sys
 ##########
 
+BAF_COLUMNS = ['chr', 'pos', 'baf', 'sample']
+BAF_DTYPES = {'chr': str, 'pos': np.int64, 'baf': np.float64, 'sample': str}
+REGIONS = ['before', 'inside', 'after']
+
+
+def parse_bafs(lines):
+    """
+    Parse tabix rows of a BAF file into typed columns.
+
+    Parameters
+    ----------
+    lines : list of str
+        Tab-delimited rows (chr, pos, baf, sample)
+
+    Returns
+    -------
+    bafs : pd.DataFrame
+    """
+    if len(lines) == 0:
+        return pd.DataFrame()
+
+    return pd.read_csv(io.StringIO('\n'.join(lines) + '\n'), sep='\t',
+                       header=None, names=BAF_COLUMNS, dtype=BAF_DTYPES,
+                       keep_default_na=False, na_values={'baf': ['nan', 'NaN']},
+                       float_precision='round_trip')
+
 
 def preprocess(chrom, start, end, tbx, samples, window=None):
     """
@@ -37,50 +63,38 @@ def preprocess(chrom, start, end, tbx, samples, window=None):
     # Load and filter SNP sites
     if window is None:
         window = end - start
-    # records = tbx.fetch(chrom, start - window, end + window,parser=pysam.asTuple())
-    # sites = deque()
-    bafs = deque()
     if window < 1000000:
-        for record in tbx.fetch(chrom, max(1, start - window), end + window, parser=pysam.asTuple()):
-            bafs.append(np.array(record))
+        regions = [(max(1, start - window), end + window)]
     else:
-
-        for record in tbx.fetch(chrom, max(1, start - 1000000), start, parser=pysam.asTuple()):
-            bafs.append(np.array(record))
-        for record in tbx.fetch(chrom, (start + end) // 2 - 500000, (start + end) // 2 + 500000, parser=pysam.asTuple()):
-            bafs.append(np.array(record))
-        for record in tbx.fetch(chrom, end, end + 1000000, parser=pysam.asTuple()):
-            bafs.append(np.array(record))
-    bafs = np.array(bafs)
-    # if bafs.shape[0] == 0:
-    # return 0,0
-    bafs = pd.DataFrame(bafs)
+        regions = [(max(1, start - 1000000), start),
+                   ((start + end) // 2 - 500000, (start + end) // 2 + 500000),
+                   (end, end + 1000000)]
+    lines = [line for region in regions for line in tbx.fetch(chrom, *region)]
+    bafs = parse_bafs(lines)
     if bafs.empty:
         return bafs, bafs
-    bafs.columns = ['chr', 'pos', 'baf', 'sample']
-    bafs = bafs[bafs['sample'].isin(samples)]
-    # print(bafs)
+
+    sample_ids = pd.Index(samples).unique()
+    sample_idx = sample_ids.get_indexer(bafs['sample'])
+    keep = sample_idx >= 0
+    bafs = bafs.loc[keep].reset_index(drop=True)
     if bafs.empty:
         return bafs, bafs
-    bafs['pos'] = bafs.pos.astype(int)
-    bafs['baf'] = bafs.baf.astype(float)
-    # print(bafqs)
-    bafs.loc[bafs.pos <= start, 'region'] = 'before'
-    bafs.loc[bafs.pos >= end, 'region'] = 'after'
-    bafs.loc[(bafs.pos > start) & (bafs.pos < end), 'region'] = 'inside'
-    het_counts = bafs.groupby('sample region'.split()).size(
-    ).reset_index().rename(columns={0: 'count'})
-    het_counts = het_counts.pivot_table(
-        values='count', index='sample', columns='region', fill_value=0)
-    het_counts = het_counts.reindex(samples).fillna(0).astype(int)
-    cols = 'before inside after sample'.split()
-    het_counts = het_counts.reset_index()
-    for colname in cols:
-        if colname not in het_counts.columns:
-            het_counts[colname] = 0
-    # het_counts = het_counts.reset_index()[cols]
+    sample_idx = sample_idx[keep]
+
+    # Bin SNPs before (0), inside (1), and after (2) the CNV
+    pos = bafs['pos'].to_numpy()
+    region_idx = np.where(pos >= end, 2, np.where(pos <= start, 0, 1))
+    bafs['region'] = np.array(REGIONS, dtype=object)[region_idx]
+
+    # Per-sample counts of heterozygous SNPs in each window
+    counts = np.bincount(sample_idx * 3 + region_idx, minlength=3 * sample_ids.shape[0])
+    counts = counts.reshape(-1, 3)[sample_ids.get_indexer(samples)]
+    het_counts = pd.DataFrame(counts, columns=REGIONS)
+    het_counts.insert(0, 'sample', list(samples))
+
     # Report BAF for variants inside CNV
-    called_bafs = bafs.loc[bafs.region == 'inside'].copy()
+    called_bafs = bafs.loc[region_idx == 1].copy()
     return het_counts, called_bafs
 
 
@@ -93,6 +107,20 @@ def main(argv):
     parser.add_argument('file', help='Compiled snp file')
     parser.add_argument('-b', '--batch',)
     parser.add_argument('--index', help='Tabix index for remote bed')
+    parser.add_argument('--gmm-n-init', type=int, default=20,
+                        help='Initializations per null model fit. [20]')
+    parser.add_argument('--gmm-max-iter', type=int, default=200,
+                        help='Maximum EM iterations per null model fit. [200]')
+    parser.add_argument('--gmm-cache', type=int, default=0,
+                        help='Number of fitted null models to reuse across '
+                        'CNVs with the same null distribution. 0 to '
+                        'disable. [0]')
+    parser.add_argument('--gmm-cache-decimals', type=int, default=3,
+                        help='Decimals to round null ratios to when matching '
+                        'cached models. [3]')
+    parser.add_argument('--gmm-warm-start', action='store_true', default=False,
+                        help='Initialize each null model fit from the '
+                        'previous CNV\'s fit.')
     # help='Samples')
 
     # Print help if no arguments specified
@@ -128,6 +156,9 @@ def main(argv):
     # this is necessary to avoid stochasticity in calculation of KS statistic
     np.random.seed(0)
     random_state = np.random.RandomState(0)
+    fitter = GMMFitter(n_init=args.gmm_n_init, max_iter=args.gmm_max_iter,
+                       cache_size=args.gmm_cache, decimals=args.gmm_cache_decimals,
+                       warm_start=args.gmm_warm_start, random_state=random_state)
 
     with open(args.bed, 'r') as f:
         for line in f:
@@ -149,7 +180,7 @@ def main(argv):
                 # Running BAF testing
                 if not het_counts.empty:
                     Del = DeletionTest(het_counts, samplelist,
-                                       min(end - start, 1000000), random_state=random_state)
+                                       min(end - start, 1000000), fitter=fitter)
                     KS = KS2sample(called_bafs, samplelist)
                     ks, ksp = KS.test(samplelist)
                     mean, delp = Del.Ttest(samplelist)
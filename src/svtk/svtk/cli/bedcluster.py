@@ -26,6 +26,11 @@ import pybedtools as pbt
 
 BedCall = namedtuple('BedCall', 'chrom start end name sample svtype'.split())
 
+ENGINES = ('bedtools', 'sweep')
+
+# Maximum number of candidate pairs tested at once by the sweep engine
+MAX_PAIRS = 2 ** 22
+
 
 def rmsstd(intervals):
     starts = np.array([interval.start for interval in intervals])
@@ -39,7 +44,161 @@ def rmsstd(intervals):
     return np.sqrt(SS)
 
 
-def bedcluster(bed, frac=0.8, intersection=None):
+def overlap_pairs(starts, ends, frac, max_pairs=MAX_PAIRS):
+    """
+    Find pairs of intervals with a minimum reciprocal overlap.
+
+    Each interval's candidate partners are the following intervals that
+    start early enough to overlap it by frac, found with a binary search on
+    the sorted starts. Candidates are tested in chunks of at most max_pairs
+    pairs, so memory does not depend on how many intervals overlap.
+    Overlap fractions are compared in single precision, as by bedtools.
+
+    Parameters
+    ----------
+    starts, ends : np.ndarray of int
+        Interval coordinates, sorted by start
+    frac : float
+        Minimum reciprocal overlap
+    max_pairs : int
+        Maximum number of candidate pairs to test at once
+
+    Yields
+    ------
+    idx1, idx2 : np.ndarray of int
+        Indices of overlapping pairs, with idx1 < idx2
+    """
+    n = starts.shape[0]
+    lengths = ends - starts
+
+    # A partner starting at or after an interval overlaps it by at most
+    # end - partner start. Loosen the bound slightly so rounding never
+    # excludes a pair; every candidate is tested exactly below.
+    min_overlap = np.floor(frac * lengths * (1 - 1e-6)).astype(np.int64)
+    limits = np.minimum(ends, ends - min_overlap + 1)
+    n_partners = np.searchsorted(starts, limits, side='left') - np.arange(n) - 1
+    n_partners = np.maximum(n_partners, 0)
+    cum_partners = np.cumsum(n_partners)
+
+    frac = np.float32(frac)
+    first = 0
+    while first < n:
+        offset = cum_partners[first - 1] if first > 0 else 0
+        last = np.searchsorted(cum_partners, offset + max_pairs, side='right')
+        last = max(last, first + 1)
+
+        counts = n_partners[first:last]
+        idx1 = np.repeat(np.arange(first, last), counts)
+        idx2 = idx1 + 1 + np.arange(idx1.shape[0]) - \
+            np.repeat(np.cumsum(counts) - counts, counts)
+
+        overlap = np.minimum(ends[idx1], ends[idx2]) - starts[idx2]
+        fovlp = overlap.astype(np.float32)
+        keep = ((overlap > 0) &
+                (fovlp / lengths[idx1].astype(np.float32) >= frac) &
+                (fovlp / lengths[idx2].astype(np.float32) >= frac))
+
+        yield idx1[keep], idx2[keep]
+        first = last
+
+
+def _spanning_edges(idx1, idx2, n):
+    """
+    Replace edges on n nodes with edges from each node to the first node of
+    its connected component, preserving the components.
+    """
+    G = sparse.coo_matrix((np.ones(idx1.shape[0], dtype=np.uint8),
+                           (idx1, idx2)), shape=(n, n))
+    n_comp, labels = csgraph.connected_components(G, connection='weak')
+    first = np.full(n_comp, n, dtype=np.int64)
+    np.minimum.at(first, labels, np.arange(n))
+    nodes = np.flatnonzero(first[labels] != np.arange(n))
+
+    return nodes, first[labels[nodes]]
+
+
+def sweep_graph(intervals, variant_indices, frac, max_pairs=MAX_PAIRS):
+    """
+    Build graph linking variants with reciprocal overlap, without bedtools.
+
+    Intervals are loaded into arrays and grouped by chromosome and svtype,
+    with identical intervals in a group sharing a single node. Overlapping
+    pairs of distinct intervals are found with `overlap_pairs`, and the
+    edges are periodically reduced to a spanning forest so that memory
+    stays proportional to the number of intervals. As in bedtools,
+    zero-length intervals are extended by 1bp on either side.
+
+    Parameters
+    ----------
+    intervals : list of pybedtools.Interval
+        Columns: chr, start, end, name, sample, svtype.
+    variant_indices : dict of {str: int}
+        Graph node of each variant ID
+    frac : float
+        Minimum reciprocal overlap for two variants to be linked together.
+    max_pairs : int
+        Maximum number of candidate pairs to test at once
+
+    Returns
+    -------
+    G : scipy.sparse.coo_matrix
+    """
+    n = len(variant_indices)
+    if len(intervals) == 0:
+        return sparse.coo_matrix((n, n), dtype=np.uint8)
+
+    names = np.array([variant_indices[interval.name] for interval in intervals],
+                     dtype=np.int64)
+    starts = np.array([interval.start for interval in intervals], dtype=np.int64)
+    ends = np.array([interval.end for interval in intervals], dtype=np.int64)
+    group_indices = {}
+    groups = np.array([group_indices.setdefault((interval.chrom, interval.fields[5]),
+                                                len(group_indices))
+                       for interval in intervals], dtype=np.int64)
+
+    zero_length = starts == ends
+    starts[zero_length] -= 1
+    ends[zero_length] += 1
+
+    # Offset each group so intervals in different groups never overlap
+    offset = np.int64(2) ** 40 * groups
+    coords, nodes = np.unique(np.stack([starts + offset, ends + offset], axis=1),
+                              axis=0, return_inverse=True)
+    nodes = nodes.reshape(-1)
+    n_nodes = coords.shape[0]
+
+    idx1, idx2 = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    edges = deque()
+    n_edges = 0
+    for pairs in overlap_pairs(coords[:, 0], coords[:, 1], frac, max_pairs):
+        edges.append(pairs)
+        n_edges += pairs[0].shape[0]
+        if n_edges > max(max_pairs, n_nodes):
+            edges.appendleft((idx1, idx2))
+            idx1, idx2 = _spanning_edges(
+                np.concatenate([e[0] for e in edges]),
+                np.concatenate([e[1] for e in edges]), n_nodes)
+            edges.clear()
+            n_edges = 0
+    edges.appendleft((idx1, idx2))
+    idx1, idx2 = _spanning_edges(np.concatenate([e[0] for e in edges]),
+                                 np.concatenate([e[1] for e in edges]),
+                                 n_nodes)
+
+    # Link each interval's variant to the variant of the first interval
+    # with its coordinates, and through it to the rest of its component
+    first_interval = np.full(n_nodes, len(intervals), dtype=np.int64)
+    np.minimum.at(first_interval, nodes, np.arange(len(intervals)))
+    root = np.arange(n_nodes)
+    root[idx1] = idx2
+    row = names
+    col = names[first_interval[root[nodes]]]
+
+    data = np.ones(row.shape[0], dtype=np.uint8)
+    return sparse.coo_matrix((data, (row, col)), shape=(n, n))
+
+
+def bedcluster(bed, frac=0.8, intersection=None, engine='bedtools'):
     """
     Single linkage clustering of a bed file based on reciprocal overlap.
 
@@ -53,11 +212,35 @@ def bedcluster(bed, frac=0.8, intersection=None):
         Pre-intersected bed. Sometimes necessary for large bed files.
         Columns: (chrA, startA, endA, nameA, sampleA, svtypeA,
                   chrB, startB, endB, nameB, sampleB, svtypeB)
+    engine : str, optional
+        Method used to find overlapping variants. 'bedtools' self-intersects
+        the bed with bedtools; 'sweep' finds overlaps in memory with
+        `sweep_graph`. Both produce identical clusters.
 
     Returns
     -------
     clusters : list of deque of pybedtools.Interval
     """
+    if engine not in ENGINES:
+        raise ValueError('Invalid clustering engine: %s' % engine)
+    if engine == 'sweep' and intersection is not None:
+        raise ValueError('Pre-computed intersection requires bedtools engine')
+
+    if engine == 'sweep':
+        intervals = list(bed.intervals)
+        variant_indices = {variant_id: index for index, variant_id in enumerate(
+            sorted({interval.name for interval in intervals}))
+        }
+        G = sweep_graph(intervals, variant_indices, frac)
+
+        n_comp, cluster_labels = csgraph.connected_components(
+            G, connection='weak')
+        clusters = [[] for _ in range(n_comp)]
+        for interval in intervals:
+            label = cluster_labels[variant_indices[interval.name]]
+            clusters[label].append(interval)
+        return clusters
+
     # Get list of unique variant IDs and map to indices on sparse graph
     variant_indices = {variant_id: index for index, variant_id in enumerate(
         sorted({interval.name for interval in bed.intervals}))
@@ -161,6 +344,11 @@ def main(argv):
                         help='Temporary directory [/tmp]')
     parser.add_argument('-s', '--intersection', default=None,
                         help='Pre-computed self-intersection of bed.')
+    parser.add_argument('--engine', choices=ENGINES, default='bedtools',
+                        help='Method used to find overlapping variants. '
+                        '"sweep" finds overlaps in memory instead of writing '
+                        'a self-intersection of the bed, and produces '
+                        'identical clusters. [bedtools]')
 
     # Print help if no arguments specified
     if len(argv) == 0:
@@ -191,7 +379,7 @@ def main(argv):
     else:
         intersection = None
 
-    clusters = bedcluster(bed, args.frac, intersection)
+    clusters = bedcluster(bed, args.frac, intersection, args.engine)
 
     # Get samples for VAF calculation
     samples = sorted(set([interval.fields[4] for interval in bed.intervals]))
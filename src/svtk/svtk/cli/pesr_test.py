@@ -11,6 +11,7 @@ import sys
 import pysam
 import pandas as pd
 from svtk.pesr import SRTestRunner, PETestRunner, PETest, SRTest
+from svtk.utils import EvidenceCache
 
 
 def sr_test(argv):
@@ -51,6 +52,16 @@ def sr_test(argv):
                         'Same format as RdTest, one column per sample.')
     parser.add_argument('--log', action='store_true', default=False,
                         help='Print progress log to stderr.')
+    parser.add_argument('--batch-window', action='store_true', default=False,
+                        help='Fetch each breakpoint window with a single '
+                        'tabix query and test all positions at once. '
+                        'Output is identical to the per-position test.')
+    parser.add_argument('--cache-window', type=int, default=0,
+                        help='Read evidence in blocks of at least this many bp '
+                        'and share them across consecutive variants. Cache '
+                        'statistics are printed to stderr. 0 to disable. [0]')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Random seed for background sample selection.')
 
     # Print help if no arguments specified
     if len(argv) == 0:
@@ -68,6 +79,9 @@ def sr_test(argv):
             raise Exception('Must provide tabix index with remote URL')
         countfile = pysam.TabixFile(args.countfile, parser=pysam.asTuple())
 
+    if args.cache_window > 0:
+        countfile = EvidenceCache(countfile, window=args.cache_window)
+
     if args.fout in '- stdout'.split():
         fout = sys.stdout
     else:
@@ -89,9 +103,13 @@ def sr_test(argv):
 
     runner = SRTestRunner(vcf, countfile, fout, args.background, common=args.common,
                           window=args.window, ins_window=args.insertion_window,
-                          whitelist=whitelist, medians=medians, log=args.log)
+                          whitelist=whitelist, medians=medians, log=args.log,
+                          batch=args.batch_window, seed=args.seed)
     runner.run()
 
+    if args.cache_window > 0:
+        sys.stderr.write(countfile.report() + '\n')
+
 
 def pe_test(argv):
     parser = argparse.ArgumentParser(
@@ -126,6 +144,17 @@ def pe_test(argv):
                         'Same format as RdTest, one column per sample.')
     parser.add_argument('--log', action='store_true', default=False,
                         help='Print progress log to stderr.')
+    parser.add_argument('--max-pairs', type=int, default=1000000,
+                        help='Maximum number of discordant pairs to load per '
+                        'variant. Variants exceeding it are reported to '
+                        'stderr and given zero counts. 0 for no limit. '
+                        '[1000000]')
+    parser.add_argument('--cache-window', type=int, default=0,
+                        help='Read evidence in blocks of at least this many bp '
+                        'and share them across consecutive variants. Cache '
+                        'statistics are printed to stderr. 0 to disable. [0]')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Random seed for background sample selection.')
 
     if len(argv) == 0:
         parser.print_help()
@@ -157,6 +186,9 @@ def pe_test(argv):
             raise Exception('Must provide tabix index with remote URL')
         discfile = pysam.TabixFile(args.disc)
 
+    if args.cache_window > 0:
+        discfile = EvidenceCache(discfile, window=args.cache_window)
+
     if args.medianfile is not None:
         medians = pd.read_table(args.medianfile)
         medians = pd.melt(medians, var_name='sample', value_name='median_cov')
@@ -164,10 +196,14 @@ def pe_test(argv):
         medians = None
 
     runner = PETestRunner(vcf, discfile, fout, args.background, args.common,
-                          args.window_in, args.window_out, whitelist, medians=medians, log=args.log)
+                          args.window_in, args.window_out, whitelist, medians=medians, log=args.log,
+                          max_pairs=args.max_pairs, seed=args.seed)
 
     runner.run()
 
+    if args.cache_window > 0:
+        sys.stderr.write(discfile.report() + '\n')
+
 
 def count_pe(argv):
     parser = argparse.ArgumentParser(
@@ -197,6 +233,11 @@ def count_pe(argv):
                         '(optional). If provided, each sample\'s split '
                         'counts will be normalized accordingly. '
                         'Same format as RdTest, one column per sample.')
+    parser.add_argument('--max-pairs', type=int, default=1000000,
+                        help='Maximum number of discordant pairs to load per '
+                        'variant. Variants exceeding it are reported to '
+                        'stderr and given zero counts. 0 for no limit. '
+                        '[1000000]')
 
     if len(argv) == 0:
         parser.print_help()
@@ -235,7 +276,7 @@ def count_pe(argv):
         medians = None
 
     petest = PETest(discfile, args.common, args.window_in,
-                    args.window_out, medians=medians)
+                    args.window_out, medians=medians, max_pairs=args.max_pairs)
 
     for record in vcf:
         counts = petest.load_counts(record, args.window_in, args.window_out)
@@ -277,6 +318,10 @@ def count_sr(argv):
                         '(optional). If provided, each sample\'s split '
                         'counts will be normalized accordingly. '
                         'Same format as RdTest, one column per sample.')
+    parser.add_argument('--cache-window', type=int, default=0,
+                        help='Read evidence in blocks of at least this many bp '
+                        'and share them across consecutive variants. Cache '
+                        'statistics are printed to stderr. 0 to disable. [0]')
     # Print help if no arguments specified
     if len(argv) == 0:
         parser.print_help()
@@ -293,6 +338,9 @@ def count_sr(argv):
             raise Exception('Must provide tabix index with remote URL')
         countfile = pysam.TabixFile(args.countfile, parser=pysam.asTuple())
 
+    if args.cache_window > 0:
+        countfile = EvidenceCache(countfile, window=args.cache_window)
+
     if args.fout in '- stdout'.split():
         fout = sys.stdout
     else:
@@ -333,3 +381,6 @@ def count_sr(argv):
             for row in counts[header].values:
                 fout.write('\t'.join([str(x) for x in row]) + '\n')
             #  counts[header].to_csv(fout, header=False, index=False, sep='\t', na_rep='NA')
+
+    if args.cache_window > 0:
+        sys.stderr.write(countfile.report() + '\n')
@@ -72,28 +72,30 @@ def vcf2bed(argv):
 
     include_unresolved = not args.no_unresolved
 
-    bt = svu.vcf2bedtool(vcf,
-                         split_bnd=args.split_bnd,
-                         include_samples=args.include_samples,
-                         include_strands=False,
-                         split_cpx=args.split_cpx,
-                         include_infos=args.info,
-                         annotate_ins=False,
-                         report_alt=True,
-                         no_sort_coords=args.no_sort_coords,
-                         simple_sinks=args.simple_sinks,
-                         include_unresolved=include_unresolved,
-                         include_filters=args.include_filters)
+    table = svu.vcf2intervals(vcf,
+                              split_bnd=args.split_bnd,
+                              include_samples=args.include_samples,
+                              include_strands=False,
+                              split_cpx=args.split_cpx,
+                              include_infos=args.info,
+                              annotate_ins=False,
+                              report_alt=True,
+                              no_sort_coords=args.no_sort_coords,
+                              simple_sinks=args.simple_sinks,
+                              include_unresolved=include_unresolved,
+                              include_filters=args.include_filters)
 
     if args.bed in 'stdout -'.split():
-        if args.header:
-            sys.stdout.write(header + '\n')
-        sys.stdout.write(str(bt))
+        fout = sys.stdout
     else:
-        if args.header:
-            bt.saveas(args.bed, trackline=header)
-        else:
-            bt.saveas(args.bed)
+        fout = open(args.bed, 'w')
+
+    if args.header:
+        fout.write(header + '\n')
+    fout.writelines(table.to_bed_lines())
+
+    if fout is not sys.stdout:
+        fout.close()
 
 
 def remote_tabix(argv):
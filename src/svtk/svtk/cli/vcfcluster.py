@@ -19,7 +19,7 @@ import sys
 from collections import deque
 from pysam import VariantFile, TabixFile
 
-from svtk.vcfcluster import VCFCluster
+from svtk.vcfcluster import VCFCluster, cluster_parallel
 
 
 def flatten_pos(records, name, fout):
@@ -120,6 +120,22 @@ def main(argv):
     parser.add_argument('--single-end', action='store_true',
                         default=False,
                         help='Require only one end to be within the minimum distance.')
+    parser.add_argument('--engine', choices=['pairwise', 'array', 'sweep'],
+                        default='pairwise',
+                        help='Method used to link candidate records. "array" '
+                        'only tests pairs of records within the clustering '
+                        'distance. "sweep" links records as they are read '
+                        'and keeps only records within the clustering '
+                        'distance in memory. All produce identical clusters. '
+                        '[pairwise]')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='Cluster contigs in parallel with this many '
+                        'worker processes. Requires indexed VCFs. Output '
+                        'is identical to a serial run. [1]')
+    parser.add_argument('--split-records', type=int, default=0,
+                        help='With --processes, further split contigs at gaps '
+                        'wider than the clustering distance into regions of '
+                        'at least this many records. [0: split by contig]')
     #  parser.add_argument('--cluster-bed', type=argparse.FileType('w'),
     #                      help='Bed of constituent calls in each cluster')
 
@@ -150,7 +166,8 @@ def main(argv):
                      preserve_header=args.preserve_header,
                      do_cluster=do_cluster,
                      do_merge=do_merge,
-                     single_end=args.single_end)
+                     single_end=args.single_end,
+                     engine=args.engine)
 
     # Open new file
     if args.fout in '- stdout'.split():
@@ -158,9 +175,7 @@ def main(argv):
     else:
         fout = open(args.fout, 'w')
 
-    fout = VariantFile(fout, mode='w', header=svc.header)
-
-    for i, cluster in enumerate(svc.cluster()):
+    def _cluster_id(index):
         if args.prefix:
             cluster_id = [args.prefix]
         else:
@@ -168,12 +183,46 @@ def main(argv):
         if args.region:
             chrom = args.region.split(':')[0]
             cluster_id.append(chrom)
+        cluster_id.append(str(index + 1))
+        return '_'.join(cluster_id)
+
+    if args.processes > 1:
+        # Records are formatted by the workers, so write text directly
+        fout.write(str(svc.header))
+        clusters = cluster_parallel(
+            filepaths, args.processes, region=args.region,
+            split_records=args.split_records, dist=args.dist,
+            blacklist=args.blacklist, frac=args.frac, svtypes=svtypes,
+            match_svtypes=match_svtypes, preserve_ids=args.preserve_ids,
+            preserve_genotypes=args.preserve_genotypes,
+            sample_overlap=args.sample_overlap,
+            preserve_header=args.preserve_header, do_cluster=do_cluster,
+            do_merge=do_merge, single_end=args.single_end,
+            engine=args.engine)
+
+        for i, (cluster_index, lines) in enumerate(clusters):
+            if do_merge and do_cluster:
+                cluster_index = i
+            cluster_id = _cluster_id(cluster_index)
+
+            for line in lines:
+                if do_merge:
+                    fields = line.split('\t', 3)
+                    fields[2] = cluster_id
+                    line = '\t'.join(fields)
+                fout.write(line)
+
+        fout.close()
+        return
+
+    fout = VariantFile(fout, mode='w', header=svc.header)
+
+    for i, cluster in enumerate(svc.cluster()):
         if do_merge and do_cluster:
             cluster_index = i
         else:
             cluster_index = cluster[0].info['CLUSTER']
-        cluster_id.append(str(cluster_index + 1))
-        cluster_id = '_'.join(cluster_id)
+        cluster_id = _cluster_id(cluster_index)
 
         for record in cluster:
             # Name record
@@ -91,19 +91,22 @@ def link_cpx(vcf, bkpt_window=300):
         Path to breakpoint VCF
     """
 
-    bt = svu.vcf2bedtool(vcf.filename, annotate_ins=False)
+    intervals = svu.vcf2intervals(vcf.filename, annotate_ins=False)
 
     # Identify breakpoints which overlap within specified window
-    overlap = bt.window(bt, w=bkpt_window).saveas()
+    # (including each breakpoint with itself)
+    idx1, idx2 = intervals.window_pairs(bkpt_window)
+    idx1 = np.concatenate([np.arange(len(intervals)), idx1])
+    idx2 = np.concatenate([np.arange(len(intervals)), idx2])
 
     # Exclude intersections where two DELs or two DUPs cluster together
-    overlap = overlap.filter(lambda b: not (
-        b.fields[4] == "DEL" and b.fields[10] == "DEL")).saveas()
-    overlap = overlap.filter(lambda b: not (
-        b.fields[4] == "DUP" and b.fields[10] == "DUP")).saveas()
+    svtypes = intervals.get_svtypes()
+    keep = ~(((svtypes[idx1] == "DEL") & (svtypes[idx2] == "DEL")) |
+             ((svtypes[idx1] == "DUP") & (svtypes[idx2] == "DUP")))
 
     # Get linked variant IDs
-    links = [(b[3], b[9]) for b in overlap.intervals]
+    links = list(zip(intervals.names[idx1[keep]].tolist(),
+                     intervals.names[idx2[keep]].tolist()))
     linked_IDs = natsort.natsorted(set(itertools.chain.from_iterable(links)))
     linked_IDs = np.array(linked_IDs)
 
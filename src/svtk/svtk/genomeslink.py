@@ -8,6 +8,7 @@ Implementation of single-linkage clustering for genomic coordinates.
 Not actually an implementation of the SLINK algorithm.
 """
 
+from bisect import bisect_left, insort
 from collections import deque
 from itertools import combinations
 from operator import itemgetter
@@ -19,6 +20,8 @@ from .utils import is_smaller_chrom
 
 
 class GSNode(object):
+    __slots__ = ('chrA', 'posA', 'chrB', 'posB', 'name')
+
     def __init__(self, chrA, posA, chrB, posB, name='.'):
         """
         Node in graph-based single-linkage clustering of genomic coordinates.
@@ -126,12 +129,51 @@ class GSNode(object):
             return is_smaller_chrom(self.chrA, other.chrA)
 
     def __str__(self):
-        return ('{chrA}\t{posA}\t{posB}\t{chrA}\t{name}'.format(
-                **self.__dict__))
+        return ('{0}\t{1}\t{2}\t{0}\t{3}'.format(
+                self.chrA, self.posA, self.posB, self.name))
+
+
+def window_pairs(pos, dist):
+    """
+    Find all pairs of positions less than a given distance apart.
+
+    Positions are sorted once and each position's partners are found with a
+    binary search, so only pairs within the window are ever generated.
+
+    Parameters
+    ----------
+    pos : np.ndarray of int
+    dist : int
+
+    Returns
+    -------
+    idx1 : np.ndarray of int
+    idx2 : np.ndarray of int
+        Indices into pos of each pair, with idx1 < idx2
+    """
+    order = np.argsort(pos, kind='stable')
+    sorted_pos = pos[order]
+    n = sorted_pos.shape[0]
+
+    # Number of downstream partners within dist of each sorted position
+    ends = np.searchsorted(sorted_pos, sorted_pos + dist, side='left')
+    n_partners = np.maximum(ends - np.arange(n) - 1, 0)
+
+    first = np.repeat(np.arange(n), n_partners)
+    offsets = np.arange(first.shape[0]) - \
+        np.repeat(np.cumsum(n_partners) - n_partners, n_partners)
+    second = first + 1 + offsets
+
+    idx1, idx2 = order[first], order[second]
+
+    return np.minimum(idx1, idx2), np.maximum(idx1, idx2)
 
 
 class GenomeSLINK(object):
-    def __init__(self, nodes, dist, size=1, blacklist=None, single_end=False):
+    ENGINES = ('pairwise', 'array', 'sweep')
+
+    def __init__(self, nodes, dist, size=1, blacklist=None, single_end=False,
+                 engine='pairwise'):
         """
         Graph-based single-linkage clustering of genomic coordinates.
 
@@ -149,13 +191,24 @@ class GenomeSLINK(object):
             inside an excluding region is omitted. (NOTE: not overlap-based.)
         single_end : bool, optional
             Require only one end to be within min dist.
+        engine : str, optional
+            Method used to link candidates within a batch. 'pairwise' tests
+            every pair of candidates; 'array' first prunes pairs with a sweep
+            over posA/posB and only tests pairs within the clustering
+            distance. 'sweep' does not form batches, and instead links each
+            node to nearby nodes in an active window as it is read (see
+            `sweep_clusters`). All produce identical clusters.
         """
 
+        if engine not in self.ENGINES:
+            raise ValueError('Invalid clustering engine: %s' % engine)
+
         self.nodes = nodes
         self.dist = dist
         self.size = size
         self.blacklist = blacklist
         self.single_end = single_end
+        self.engine = engine
 
     def is_clusterable_with(self, first, second):
         """
@@ -178,6 +231,50 @@ class GenomeSLINK(object):
         else:
             return False
 
+    def node_arrays(self, candidates):
+        """
+        Columnar representation of a candidate batch.
+
+        Returns
+        -------
+        nodes : dict of np.ndarray
+            posA, posB and integer-encoded chrB of each candidate
+        """
+        _, chrB = np.unique([node.chrB for node in candidates],
+                            return_inverse=True)
+
+        return {
+            'posA': np.array([node.posA for node in candidates], dtype=np.int64),
+            'posB': np.array([node.posB for node in candidates], dtype=np.int64),
+            'chrB': chrB,
+        }
+
+    def clusters_with_arrays(self, nodes, idx1, idx2):
+        """
+        Vectorized `clusters_with` over pairs of candidates.
+
+        Parameters
+        ----------
+        nodes : dict of np.ndarray
+            Candidate batch, as returned by `node_arrays`
+        idx1, idx2 : np.ndarray of int
+            Indices of pairs to test, with idx1 < idx2
+
+        Returns
+        -------
+        clusters : np.ndarray of bool
+        """
+        posA, posB, chrB = nodes['posA'], nodes['posB'], nodes['chrB']
+
+        closeA = np.abs(posA[idx1] - posA[idx2]) < self.dist
+        closeB = np.abs(posB[idx1] - posB[idx2]) < self.dist
+        if self.single_end:
+            close = closeA | closeB
+        else:
+            close = closeA & closeB
+
+        return (chrB[idx1] == chrB[idx2]) & close
+
     def filter_nodes(self):
         """
         Filter provided nodes. By default, remove nodes in blacklisted regions.
@@ -219,14 +316,7 @@ class GenomeSLINK(object):
                 candidates.append(node)
 
             else:
-                # Permit inequality if not parallelizing by chromosome, but
-                # enforce sorted order
-                n, p = node, prev
-                if n.chrA != p.chrA and is_smaller_chrom(n.chrA, p.chrA):
-                    msg = 'Breakend with reverse CTX ordering found'
-                    print(prev, list(prev.record.samples.keys())[0])
-                    print(node, list(node.record.samples.keys())[0])
-                    raise Exception(msg)
+                self.check_order(prev, node)
 
                 yield candidates
                 candidates = deque([node])
@@ -235,8 +325,27 @@ class GenomeSLINK(object):
 
         yield candidates
 
-    def cluster_candidates(self, candidates, *args, **kwargs):
-        """Batch of clustering"""
+    def check_order(self, prev, node):
+        """
+        Raise if node is on a chromosome before that of the previous node.
+        """
+        # Permit inequality if not parallelizing by chromosome, but
+        # enforce sorted order
+        n, p = node, prev
+        if n.chrA != p.chrA and is_smaller_chrom(n.chrA, p.chrA):
+            msg = 'Breakend with reverse CTX ordering found'
+            print(prev, list(prev.record.samples.keys())[0])
+            print(node, list(node.record.samples.keys())[0])
+            raise Exception(msg)
+
+    def pairwise_graph(self, candidates):
+        """
+        Build adjacency matrix of candidates by testing every pair.
+
+        Returns
+        -------
+        G : scipy.sparse.lil_matrix
+        """
         n = len(candidates)
 
         # Permit clusters of size 1
@@ -249,20 +358,78 @@ class GenomeSLINK(object):
             if self.clusters_with(node1, node2):
                 G[p1, p2] = 1
 
+        return G
+
+    def array_graph(self, candidates):
+        """
+        Build adjacency matrix of candidates from pairs within cluster distance.
+
+        Candidate pairs are found with a sweep over sorted posA (and posB, if
+        only a single end is required to match) and tested in bulk with
+        `clusters_with_arrays`. Subclasses which add criteria to
+        `clusters_with` without a vectorized equivalent are only consulted
+        for the remaining pairs.
+
+        Returns
+        -------
+        G : scipy.sparse.coo_matrix
+        """
+        n = len(candidates)
+        nodes = self.node_arrays(candidates)
+
+        if self.single_end:
+            idxA = window_pairs(nodes['posA'], self.dist)
+            idxB = window_pairs(nodes['posB'], self.dist)
+            keys = np.unique(np.concatenate([idxA[0] * n + idxA[1],
+                                             idxB[0] * n + idxB[1]]))
+            idx1, idx2 = keys // n, keys % n
+        else:
+            idx1, idx2 = window_pairs(nodes['posA'], self.dist)
+
+        # Test pairs in the same order as the pairwise engine
+        order = np.lexsort((idx2, idx1))
+        idx1, idx2 = idx1[order], idx2[order]
+
+        keep = self.clusters_with_arrays(nodes, idx1, idx2)
+        idx1, idx2 = idx1[keep], idx2[keep]
+
+        cls = type(self)
+        if cls.clusters_with is not GenomeSLINK.clusters_with and \
+                cls.clusters_with_arrays is GenomeSLINK.clusters_with_arrays:
+            keep = [self.clusters_with(candidates[p1], candidates[p2])
+                    for p1, p2 in zip(idx1, idx2)]
+            keep = np.array(keep, dtype=bool)
+            idx1, idx2 = idx1[keep], idx2[keep]
+
+        data = np.ones(idx1.shape[0], dtype=np.uint8)
+        G = sparse.coo_matrix((data, (idx1, idx2)), shape=(n, n))
+
+        return G
+
+    def cluster_candidates(self, candidates, *args, **kwargs):
+        """Batch of clustering"""
+        if self.engine == 'array':
+            G = self.array_graph(candidates)
+        else:
+            G = self.pairwise_graph(candidates)
+
         # Get indices of connected components
         n_comp, comp_list = csgraph.connected_components(G, connection='weak')
         cluster_names = np.arange(n_comp)
 
         # Remove clusters with less than minimum size
-        cluster_sizes = [np.sum(comp_list == i) for i in cluster_names]
-        cluster_sizes = np.array(cluster_sizes)
+        cluster_sizes = np.bincount(comp_list, minlength=n_comp)
         cluster_names = cluster_names[np.where(cluster_sizes >= self.size)]
 
+        # Group candidate indices by component, preserving input order
+        members = np.argsort(comp_list, kind='stable')
+        bounds = np.concatenate([[0], np.cumsum(cluster_sizes)])
+
         # Convert indices back to lists of Nodes
         # Sort clusters internally by first read's position
         clusters = deque()
         for cname in cluster_names:
-            cluster_idx = np.where(comp_list == cname)[0]
+            cluster_idx = members[bounds[cname]:bounds[cname + 1]]
             if len(cluster_idx) == 1:
                 cluster = [candidates[cluster_idx[0]]]
             else:
@@ -273,6 +440,122 @@ class GenomeSLINK(object):
         for cluster in sorted(clusters, key=lambda c: c[0].posA):
             yield cluster
 
+    def sweep_clusters(self):
+        """
+        Single linkage clustering with a sweep over sorted nodes.
+
+        Nodes stay in an active set, ordered by chrB and posB, while their
+        posA is within the clustering distance of the sweep. Each new node
+        is tested only against the active nodes found by a range query on
+        posB, and clusters are merged incrementally with union-find. A
+        cluster is finished as soon as none of its members are active.
+        Memory is then bounded by the active window and by finished
+        clusters held back to keep the output order of `cluster_candidates`,
+        rather than by the size of the batches from `get_candidates`.
+
+        With `single_end`, nodes in a batch can link by posB alone, so they
+        stay active until the end of their batch.
+
+        Yields
+        ------
+        cluster : list of GSNode
+        """
+        active = []       # (chrB, posB, index) of active nodes, sorted
+        window = deque()  # (index, node) of active nodes, in input order
+        nodes = {}        # index -> node, for nodes in unfinished clusters
+        parent = {}       # union-find forest over node indices
+        members = {}      # root -> indices of nodes in cluster
+        n_active = {}     # root -> number of active nodes in cluster
+        finished = {}     # first index -> finished cluster, held until yielded
+        done = set()      # indices of nodes in finished clusters
+        next_index = 0    # clusters are yielded in order of their first node
+
+        def _find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        def _union(root1, root2):
+            if len(members[root1]) < len(members[root2]):
+                root1, root2 = root2, root1
+            parent[root2] = root1
+            members[root1].extend(members.pop(root2))
+            n_active[root1] += n_active.pop(root2)
+            return root1
+
+        def _deactivate(i, node):
+            active.pop(bisect_left(active, (node.chrB, node.posB, i)))
+            root = _find(i)
+            n_active[root] -= 1
+            if n_active[root] > 0:
+                return
+
+            # No remaining node can link to the cluster
+            cluster_idx = members.pop(root)
+            del n_active[root]
+            cluster = [nodes.pop(j) for j in cluster_idx]
+            for j in cluster_idx:
+                del parent[j]
+            done.update(cluster_idx)
+            if len(cluster) >= self.size:
+                finished[min(cluster_idx)] = sorted(
+                    cluster, key=lambda v: (v.posA, v.name))
+
+        def _release():
+            nonlocal next_index
+            while next_index in done:
+                done.remove(next_index)
+                cluster = finished.pop(next_index, None)
+                if cluster is not None:
+                    yield cluster
+                next_index += 1
+
+        prev = None
+        for index, node in enumerate(self.filter_nodes()):
+            if prev is not None and not self.is_clusterable_with(prev, node):
+                self.check_order(prev, node)
+                while window:
+                    _deactivate(*window.popleft())
+            elif not self.single_end:
+                while window and node.posA - window[0][1].posA >= self.dist:
+                    _deactivate(*window.popleft())
+            yield from _release()
+
+            # Active nodes with posB within dist of the node
+            lo = bisect_left(active, (node.chrB, node.posB - self.dist + 1))
+            hi = bisect_left(active, (node.chrB, node.posB + self.dist))
+            partners = [i for _, _, i in active[lo:hi]]
+            if self.single_end:
+                # Nodes with posA within dist may link regardless of posB
+                for i, other in reversed(window):
+                    if node.posA - other.posA >= self.dist:
+                        break
+                    if other.chrB == node.chrB and \
+                            abs(node.posB - other.posB) >= self.dist:
+                        partners.append(i)
+            partners.sort()
+
+            nodes[index] = node
+            parent[index] = index
+            members[index] = [index]
+            n_active[index] = 1
+            root = index
+            for i in partners:
+                # Nodes already in the same cluster need not be tested
+                other_root = _find(i)
+                if other_root != root and \
+                        self.clusters_with(nodes[i], node):
+                    root = _union(root, other_root)
+
+            insort(active, (node.chrB, node.posB, index))
+            window.append((index, node))
+            prev = node
+
+        while window:
+            _deactivate(*window.popleft())
+        yield from _release()
+
     def cluster(self, *args, **kwargs):
         """
         Perform single linkage clustering on a candidate batch of GSNodes
@@ -282,6 +565,11 @@ class GenomeSLINK(object):
         list of GSNode
             A cluster of GSNodes
         """
+        if self.engine == 'sweep':
+            for cluster in self.sweep_clusters():
+                yield cluster
+            return
+
         for cs in self.get_candidates():
             for cluster in self.cluster_candidates(cs, *args, **kwargs):
                 yield cluster
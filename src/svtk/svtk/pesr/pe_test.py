@@ -6,30 +6,50 @@
 
 """
 
-from collections import defaultdict
+import io
+import sys
+from itertools import islice
 import numpy as np
 import pandas as pd
-import pysam
 from .pesr_test import PESRTest, PESRTestRunner
 
 
-class _DiscPair:
-    def __init__(self, chrA, posA, strandA, chrB, posB, strandB, sample):
-        self.chrA = chrA
-        self.posA = int(posA)
-        self.strandA = strandA
-        self.chrB = chrB
-        self.posB = int(posB)
-        self.strandB = strandB
-        self.sample = sample
+DISC_COLUMNS = 'chrA posA strandA chrB posB strandB sample'.split()
+DISC_DTYPES = dict(chrA=str, posA=np.int64, strandA=str,
+                   chrB=str, posB=np.int64, strandB=str, sample=str)
+
+
+def parse_disc_pairs(lines):
+    """
+    Parse discordant pair rows into typed columns.
+
+    Arguments
+    ---------
+    lines : list of str
+        Tab-delimited rows: chrA, posA, strandA, chrB, posB, strandB, sample
+
+    Returns
+    -------
+    pairs : pd.DataFrame
+    """
+    if len(lines) == 0:
+        return pd.DataFrame({col: pd.Series(dtype=dtype)
+                             for col, dtype in DISC_DTYPES.items()})
+
+    return pd.read_csv(io.StringIO('\n'.join(str(line) for line in lines)),
+                       sep='\t', header=None, names=DISC_COLUMNS,
+                       usecols=range(len(DISC_COLUMNS)), dtype=DISC_DTYPES,
+                       keep_default_na=False, na_filter=False)
 
 
 class PETest(PESRTest):
-    def __init__(self, discfile, common=False, window_in=50, window_out=500, medians=None):
+    def __init__(self, discfile, common=False, window_in=50, window_out=500, medians=None,
+                 max_pairs=1000000):
         self.discfile = discfile
         self.window_in = window_in
         self.window_out = window_out
         self.common = common
+        self.max_pairs = max_pairs
 
         super().__init__(medians, common)
 
@@ -92,35 +112,38 @@ class PETest(PESRTest):
         region = '{0}:{1}-{2}'.format(record.chrom, startA, endA)
 
         try:
-            pairs = self.discfile.fetch(region=region, parser=pysam.asTuple())
+            lines = self.discfile.fetch(region=region)
         except ValueError:
-            pairs = []
-
-        counts = defaultdict(int)
-        i = 0
-        for pair in pairs:
-            pair = _DiscPair(*pair)
-            if (i > 1000000):
-                print(region)
-                counts = defaultdict(int)
-                break
-            i += 1
-            # Pairs were selected based on window around chrA;
-            # just need to check chrB
-            if pair.chrB != record.info['CHR2']:
-                continue
-            if not (startB <= pair.posB < endB):
-                continue
-
-            # Require pairs match breakpoint strand
-            if pair.strandA != strandA or pair.strandB != strandB:
-                continue
-
-            counts[pair.sample] += 1
-
-        counts = pd.DataFrame.from_dict({'count': counts})
-        counts = counts.reset_index()
-        counts = counts.rename(columns={'index': 'sample'})
+            lines = []
+
+        # Skip regions too dense to test
+        if self.max_pairs:
+            lines = list(islice(lines, self.max_pairs + 1))
+            if len(lines) > self.max_pairs:
+                msg = ('WARNING: more than {0} discordant pairs in region {1} '
+                       '(record {2}); setting counts to zero.\n')
+                sys.stderr.write(msg.format(self.max_pairs, region, record.id))
+                lines = []
+        else:
+            lines = list(lines)
+
+        pairs = parse_disc_pairs(lines)
+
+        # Pairs were selected based on window around chrA;
+        # just need to check chrB
+        posB = pairs['posB'].to_numpy()
+        keep = ((pairs['chrB'] == record.info['CHR2']).to_numpy() &
+                (startB <= posB) & (posB < endB))
+
+        # Require pairs match breakpoint strand
+        keep &= ((pairs['strandA'] == strandA) &
+                 (pairs['strandB'] == strandB)).to_numpy()
+
+        sample_idx, samples = pd.factorize(pairs['sample'].to_numpy()[keep])
+        counts = pd.DataFrame({
+            'sample': samples,
+            'count': np.bincount(sample_idx, minlength=len(samples)),
+        })
 
         return counts
 
@@ -128,18 +151,26 @@ class PETest(PESRTest):
 class PETestRunner(PESRTestRunner):
     def __init__(self, vcf, discfile, fout, n_background=160, common=False,
                  window_in=50, window_out=500,
-                 whitelist=None, blacklist=None, medians=None, log=False):
+                 whitelist=None, blacklist=None, medians=None, log=False,
+                 max_pairs=1000000, seed=None):
         """
         vcf : pysam.VariantFile
-        discfile : pysam.TabixFile
+        discfile : pysam.TabixFile or svtk.utils.EvidenceCache
+        max_pairs : int
+            Maximum number of discordant pairs to load per record. Records
+            exceeding it are reported and given zero counts.
+        seed : int
+            Seed for background sample selection
         """
         self.petest = PETest(discfile, common, window_in,
-                             window_out, medians=medians)
+                             window_out, medians=medians, max_pairs=max_pairs)
         self.fout = fout
 
-        super().__init__(vcf, common, n_background, whitelist, blacklist, log)
+        super().__init__(vcf, common, n_background, whitelist, blacklist, log, seed)
 
     def test_record(self, record):
+        self.advance_evidence(self.petest.discfile, record, self.petest.window_out)
+
         if not self._strand_check(record):
             counts = self.petest.null_score(null_val=np.nan)
         else:
@@ -41,32 +41,30 @@ class PESRTest:
             Negative log10 p-value
         """
 
-        # Restrict to called or background samples
-        counts = counts.loc[counts['sample'].isin(samples + background)].copy()
+        # Observed count of each called and background sample
+        sample_idx = pd.Index(counts['sample']).get_indexer(samples + background)
+        observed = sample_idx >= 0
 
         # Return null score if no eligible clipped reads present
-        if counts.shape[0] == 0:
+        if not observed.any():
             return self.null_score()
 
-        # Add called and background samples with no observed clipped reads
-        counts = counts.set_index('sample')['count']\
-                       .reindex(samples + background)\
-                       .fillna(0).reset_index()
+        # Samples with no observed clipped reads have zero count
+        values = np.zeros(sample_idx.shape[0])
+        values[observed] = counts['count'].to_numpy(dtype=float)[sample_idx[observed]]
+        values = np.nan_to_num(values)
 
-        # Label samples
-        counts['is_called'] = counts['sample'].isin(samples)
-
-        # Calculate enrichment
-        result = counts.groupby('is_called')['count'].median()
-
-        # Fill 0 if called in all samples
-        result = result.reindex([True, False]).fillna(0)
-        result.index = ['called', 'background']
+        # Calculate enrichment, filling 0 if called in all samples
+        n_called = len(samples)
+        called_median = np.median(values[:n_called]) if n_called > 0 else 0.0
+        background_median = np.median(values[n_called:]) if len(background) > 0 else 0.0
         if self.common != "False":
             if len(samples) > len(background):
-                result.background = 0.0
-        pval = max(ss.poisson.cdf(result.background, result.called), sys.float_info.min)
-        result['log_pval'] = np.abs(np.log10(pval))
+                background_median = 0.0
+        pval = max(ss.poisson.cdf(background_median, called_median), sys.float_info.min)
+
+        result = pd.Series([called_median, background_median, np.abs(np.log10(pval))],
+                           index=['called', 'background', 'log_pval'], name='count')
 
         return result
 
@@ -93,7 +91,17 @@ class PESRTest:
 
 class PESRTestRunner:
     def __init__(self, vcf, common=False, n_background=160, whitelist=None, blacklist=None,
-                 log=False):
+                 log=False, seed=None):
+        """
+        vcf : pysam.VariantFile
+        n_background : int
+            Maximum number of background samples to test against
+        whitelist : list of str
+        blacklist : list of str
+        seed : int, optional
+            Seed for background sample selection. Uses numpy's global
+            random state if not provided.
+        """
         self.vcf = vcf
 
         self.common = common
@@ -103,6 +111,14 @@ class PESRTestRunner:
         self.whitelist = whitelist if whitelist else self.samples
         self.blacklist = blacklist if blacklist else []
 
+        # Resolve sample identities once per VCF
+        self.sample_names = np.array(self.samples, dtype=object)
+        self.sample_rank = np.argsort(np.argsort(self.sample_names, kind='stable'), kind='stable')
+        self.whitelist_mask = self._sample_mask(self.whitelist)
+        self.blacklist_mask = self._sample_mask(self.blacklist)
+
+        self.rng = np.random.RandomState(seed) if seed is not None else np.random
+
         self.log = log
 
     def run(self):
@@ -131,29 +147,57 @@ class PESRTestRunner:
     def test_record(self, record):
         called, background = self.choose_background(record)
 
+    @staticmethod
+    def advance_evidence(evidence, record, window):
+        """Drop cached evidence behind the first window queried for a record"""
+        if isinstance(evidence, svu.EvidenceCache):
+            evidence.advance(record.chrom, record.pos - window)
+
     def choose_background(self, record, whitelist=None, blacklist=None):
         # Select called and background samples
-        called = svu.get_called_samples(record)
-        background = [s for s in self.samples if s not in called]
+        called = self.called_indices(record)
+        is_background = np.ones(len(self.samples), dtype=bool)
+        is_background[called] = False
 
         # Permit override of specified white/blacklists
-        whitelist = whitelist if whitelist is not None else self.whitelist
-        blacklist = blacklist if blacklist is not None else self.blacklist
-
-        def _filter_whitelist(samples):
-            return [s for s in samples if s in whitelist]
-
-        def _filter_blacklist(samples):
-            return [s for s in samples if s not in blacklist]
+        if whitelist is not None:
+            whitelist_mask = self._sample_mask(whitelist)
+        else:
+            whitelist_mask = self.whitelist_mask
+        if blacklist is not None:
+            blacklist_mask = self._sample_mask(blacklist)
+        else:
+            blacklist_mask = self.blacklist_mask
+
+        eligible = whitelist_mask & ~blacklist_mask
+        called = called[eligible[called]]
+        background = np.flatnonzero(is_background & eligible)
+
+        if background.shape[0] >= self.n_background:
+            background = self.rng.choice(background, self.n_background,
+                                         replace=False)
+
+        return self.sample_names[called].tolist(), self.sample_names[background].tolist()
+
+    def called_indices(self, record):
+        """
+        Indices of samples with a variant call, as in svu.get_called_samples
 
-        called = _filter_whitelist(called)
-        background = _filter_whitelist(background)
+        Returns
+        -------
+        called : np.ndarray of int
+            Sample indices, ordered by sample ID
+        """
+        is_called = np.array([s['GT'] not in svu.NULL_GT for s in record.samples.values()],
+                             dtype=bool)
+        called = np.flatnonzero(is_called)
 
-        called = _filter_blacklist(called)
-        background = _filter_blacklist(background)
+        if record.info.get('SVTYPE', None) == 'CNV':
+            is_cnv = np.array([s['CN'] != 2 for s in record.samples.values()], dtype=bool)
+            called = np.concatenate([called, np.flatnonzero(is_cnv)])
 
-        if len(background) >= self.n_background:
-            background = np.random.choice(background, self.n_background,
-                                          replace=False).tolist()
+        return called[np.argsort(self.sample_rank[called], kind='stable')]
 
-        return called, background
+    def _sample_mask(self, samples):
+        samples = set(samples)
+        return np.array([s in samples for s in self.samples], dtype=bool)
@@ -14,11 +14,12 @@ from .pesr_test import PESRTest, PESRTestRunner
 
 
 class SRTest(PESRTest):
-    def __init__(self, countfile, common=False, window=50, ins_window=50, medians=None):
+    def __init__(self, countfile, common=False, window=50, ins_window=50, medians=None, batch=False):
         self.countfile = countfile
         self.window = window
         self.ins_window = ins_window
         self.common = common
+        self.batch = batch
 
         super().__init__(medians, common)
 
@@ -142,6 +143,104 @@ class SRTest(PESRTest):
 
         return counts
 
+    def test_window(self, chrom, positions, strand, called, background):
+        """
+        Test enrichment of clipped reads at every position in a window.
+
+        Equivalent to calling `test` at each position, but the window is
+        fetched with a single tabix query and the medians and p-values are
+        computed on a positions x samples count matrix.
+
+        Arguments
+        ---------
+        chrom : str
+        positions : list of int
+            Sorted positions to test
+        strand : str
+        called : list of str
+            List of called samples to test
+        background : list of str
+            List of samples to use as background
+
+        Returns
+        -------
+        results : pd.DataFrame
+            Columns: called, background, log_pval. One row per position.
+        """
+
+        positions = np.asarray(positions, dtype=int)
+        samples = called + background
+
+        counts = self.load_window_counts(chrom, positions[0], positions[-1], strand)
+        counts = self.normalize_counts(counts)
+        counts = counts.loc[counts['sample'].isin(samples)]
+
+        # Pivot to positions x samples, leaving out excluded positions.
+        # Called samples may be listed twice (CNV), so pivot on unique IDs
+        sample_ids = pd.Index(samples).unique()
+        rows = pd.Index(positions).get_indexer(counts['pos'])
+        cols = sample_ids.get_indexer(counts['sample'])
+        keep = rows >= 0
+        rows, cols = rows[keep], cols[keep]
+
+        matrix = np.zeros((positions.shape[0], sample_ids.shape[0]))
+        matrix[rows, cols] = np.nan_to_num(counts['count'].to_numpy(dtype=float)[keep])
+        matrix = matrix[:, sample_ids.get_indexer(samples)]
+
+        # Positions without any eligible clipped reads get the null score
+        observed = np.zeros(positions.shape[0], dtype=bool)
+        observed[rows] = True
+
+        n_called = len(called)
+        if n_called > 0:
+            called_median = np.median(matrix[:, :n_called], axis=1)
+        else:
+            called_median = np.zeros(positions.shape[0])
+        if len(background) > 0:
+            background_median = np.median(matrix[:, n_called:], axis=1)
+        else:
+            background_median = np.zeros(positions.shape[0])
+        if self.common != "False":
+            if len(called) > len(background):
+                background_median = np.zeros(positions.shape[0])
+
+        pval = np.maximum(ss.poisson.cdf(background_median, called_median), sys.float_info.min)
+        log_pval = np.abs(np.log10(pval))
+
+        results = pd.DataFrame({'called': called_median,
+                                'background': background_median,
+                                'log_pval': log_pval})
+        results.loc[~observed, :] = 0.0
+
+        return results
+
+    def load_window_counts(self, chrom, start, end, strand):
+        """Load pandas DataFrame of all positions in [start, end] from tabixfile"""
+
+        start = max(start, 1)
+        if start <= end:
+            region = '{0}:{1}-{2}'.format(chrom, start, end)
+            try:
+                lines = self.countfile.fetch(region)
+            except ValueError:
+                lines = []
+        else:
+            lines = []
+
+        cols = 'chrom pos clip count sample'.split()
+        counts = pd.DataFrame.from_records(
+            [l[:5] for l in lines], columns=cols)
+        counts['pos'] = counts['pos'].astype(int)
+        counts['count'] = counts['count'].astype(int)
+
+        # Restrict to splits in orientation of interest
+        clip = 'right' if strand == '+' else 'left'
+        counts = counts.loc[(counts['clip'] == clip) &
+                            (counts['pos'] >= start) &
+                            (counts['pos'] <= end)].copy()
+
+        return counts
+
     def _test_total(self, results):
         """Test enrichment of posA+posB"""
         total = results['called background'.split()].sum()
@@ -159,18 +258,26 @@ class SRTest(PESRTest):
                     invalid_pos_list=[]):
         """Test enrichment at all positions within window"""
 
-        # Run SR test at each position
-        results = []
         positions = [p for p in range(left_boundary, right_boundary + 1) if p not in invalid_pos_list]
-        for pos in positions:
-            result = self.test(chrom, pos, strand, samples, background)
-            result = result.to_frame().transpose()
-            result['pos'] = pos
-            # make negative so it sorts correctly
-            result['dist'] = -np.abs(pos - coord)
-            results.append(result)
 
-        results = pd.concat(results, ignore_index=True)
+        if self.batch and len(positions) > 0:
+            # Test the whole window at once
+            results = self.test_window(chrom, positions, strand, samples, background)
+            results['pos'] = positions
+            # make negative so it sorts correctly
+            results['dist'] = -np.abs(results['pos'] - coord)
+        else:
+            # Run SR test at each position
+            results = []
+            for pos in positions:
+                result = self.test(chrom, pos, strand, samples, background)
+                result = result.to_frame().transpose()
+                result['pos'] = pos
+                # make negative so it sorts correctly
+                result['dist'] = -np.abs(pos - coord)
+                results.append(result)
+
+            results = pd.concat(results, ignore_index=True)
 
         # Choose most significant position, using distance to predicted
         # breakpoint as tiebreaker
@@ -182,23 +289,30 @@ class SRTest(PESRTest):
 
 class SRTestRunner(PESRTestRunner):
     def __init__(self, vcf, countfile, fout, n_background=160, common=False, window=100, ins_window=50,
-                 whitelist=None, blacklist=None, medians=None, log=False):
+                 whitelist=None, blacklist=None, medians=None, log=False, batch=False, seed=None):
         """
         vcf : pysam.VariantFile
-        countfile : pysam.TabixFile
+        countfile : pysam.TabixFile or svtk.utils.EvidenceCache
         fout : writable file
         n_background : int
         window : int
         ins_window : int
         whitelist : list of str
         blacklist : list of str
+        batch : bool
+            Fetch and test each breakpoint window with a single query
+        seed : int
+            Seed for background sample selection
         """
-        self.srtest = SRTest(countfile, common=common, window=window, ins_window=ins_window, medians=medians)
+        self.srtest = SRTest(countfile, common=common, window=window, ins_window=ins_window, medians=medians,
+                             batch=batch)
         self.fout = fout
 
-        super().__init__(vcf, common, n_background, whitelist, blacklist, log)
+        super().__init__(vcf, common, n_background, whitelist, blacklist, log, seed)
 
     def test_record(self, record):
+        self.advance_evidence(self.srtest.countfile, record, self.srtest.window)
+
         called, background = self.choose_background(record)
         counts = self.srtest.test_record(record, called, background)
         counts = counts.rename(columns={'called': 'called_median',
@@ -12,19 +12,44 @@ from .utils import recip, make_bnd_alt, update_best_genotypes, get_called_sample
 from .genomeslink import GSNode
 
 
+class _Codes(dict):
+    """Intern hashable values as sequential integer codes"""
+
+    def __missing__(self, key):
+        code = len(self)
+        self[key] = code
+        return code
+
+
+# Integer encodings shared by all SVRecords, so codes are comparable across
+# files. Only equality between codes is meaningful.
+CONTIG_CODES = _Codes()
+SVTYPE_CODES = _Codes()
+STRANDS_CODES = _Codes()
+ALT_CODES = _Codes()
+
+
 class SVFile(object):
-    def __init__(self, vcf):
+    def __init__(self, vcf, sample_index=None):
         """
         Wrapper for standardized VCF files.
 
         Parameters
         ----------
         vcf : pysam.VariantFile
+        sample_index : dict of {str: int}, optional
+            Bit position of each sample in called sample bitsets. Must be
+            shared by all files whose records are compared with each other.
+            Defaults to the order of samples in the VCF header.
         """
         self.reader = vcf
         self.filename = vcf.filename.decode('utf-8')
         self.samples = list(self.reader.header.samples)
 
+        if sample_index is None:
+            sample_index = {s: i for i, s in enumerate(self.samples)}
+        self.sample_index = sample_index
+
         # Confirm all standard INFO fields are present
         required_info = 'SVTYPE CHR2 END STRANDS SVLEN ALGORITHMS'.split()
         for info in required_info:
@@ -63,6 +88,11 @@ class SVFile(object):
             msg = msg.format(chrom, start)
             raise ValueError(msg)
 
+        # Contigs absent from the header have no calls
+        if chrom not in self.reader.header.contigs:
+            self.reader = iter(())
+            return
+
         # First check if VCF is empty
         try:
             pos = self.reader.tell()
@@ -87,23 +117,37 @@ class SVFile(object):
 
     def next(self):
         record = next(self.reader)
-        return SVRecord(record)
+        return SVRecord(record, self.sample_index)
 
 
 class SVRecord(GSNode):
     """
     Clusterable VCF record.
+
+    Fields required for clustering are extracted once on construction and
+    stored in slots, along with integer codes for contigs, svtype, strands
+    and insertion subclass, so the wrapped VariantRecord is only needed when
+    merging.
     """
+    __slots__ = ('record', 'sources', 'called_samples', 'sample_index',
+                 '_sample_bits', 'svtype', 'strands', 'alt', 'svlen',
+                 'is_secondary', 'chrA_code', 'chrB_code', 'svtype_code',
+                 'strands_code', 'alt_code')
 
-    def __init__(self, record):
+    def __init__(self, record, sample_index=None):
         """
         record : pysam.VariantRecord
             Must specify 'CHR2' and 'END' in INFO
+        sample_index : dict of {str: int}, optional
+            Bit position of each sample in `sample_bits`. Defaults to the
+            order of samples in the record's header.
         """
 
         self.record = record
         self.sources = record.info['ALGORITHMS']
         self.called_samples = None
+        self.sample_index = sample_index
+        self._sample_bits = None
 
         chrA = record.chrom
         posA = record.pos
@@ -113,12 +157,48 @@ class SVRecord(GSNode):
 
         super().__init__(chrA, posA, chrB, posB, name)
 
+        info = record.info
+        self.svtype = info['SVTYPE']
+        self.strands = info['STRANDS'] if 'STRANDS' in info else None
+        self.alt = record.alts[0] if record.alts else None
+        self.svlen = info['SVLEN'] if 'SVLEN' in info else None
+        self.is_secondary = 'SECONDARY' in info
+
+        self.chrA_code = CONTIG_CODES[self.chrA]
+        self.chrB_code = CONTIG_CODES[self.chrB]
+        self.svtype_code = SVTYPE_CODES[self.svtype]
+        self.strands_code = -1 if self.strands is None else STRANDS_CODES[self.strands]
+        # Only insertion subclasses are compared, so avoid interning every BND alt
+        self.alt_code = ALT_CODES[self.alt] if self.svtype == 'INS' else -1
+
     def get_called_samples_set(self):
         if self.called_samples is not None:
             return self.called_samples
         self.called_samples = set(get_called_samples(self.record))
         return self.called_samples
 
+    @property
+    def sample_bits(self):
+        """
+        Returns
+        -------
+        sample_bits : np.ndarray of uint8
+            Packed bitset of called samples, indexed by `sample_index`
+        """
+        if self._sample_bits is not None:
+            return self._sample_bits
+
+        sample_index = self.sample_index
+        if sample_index is None:
+            sample_index = {s: i for i, s in enumerate(self.record.header.samples)}
+
+        called = np.zeros(len(sample_index), dtype=bool)
+        for sample in self.get_called_samples_set():
+            called[sample_index[sample]] = True
+        self._sample_bits = np.packbits(called)
+
+        return self._sample_bits
+
     def overlaps(self, other, frac=0.0):
         """
         Check if two records meet minimum reciprocal overlap.
@@ -133,7 +213,7 @@ class SVRecord(GSNode):
         if self.svtype == 'INS':
             # If either record's insertion length is unknown, consider
             # overlap met
-            svlens = self.record.info['SVLEN'], other.record.info['SVLEN']
+            svlens = self.svlen, other.svlen
             if svlens[0] == -1 or svlens[1] == -1:
                 return True
             # Otherwise, model insertion region as (coord + ins length)
@@ -144,16 +224,6 @@ class SVRecord(GSNode):
 
         return recip(self.posA, posBs[0], other.posA, posBs[1], frac)
 
-    @property
-    def svtype(self):
-        """
-        Returns
-        -------
-        svtype : str
-            One of {DEL, DUP, INV, BND}
-        """
-        return self.record.info['SVTYPE']
-
     @property
     def is_tloc(self):
         return self.chrA != self.chrB
@@ -1,6 +1,8 @@
 from .utils import *
+from .intervals import IntervalTable, vcf2intervals, vcf2bedtool
 from .bgzipfile import BgzipFile
 from .helpers import reciprocal_overlap, overlap_frac
 from .multi_tabixfile import MultiTabixFile
+from .evidence_cache import EvidenceCache
 from .genotype_merging import update_best_genotypes
 from .rdtest import RdTest
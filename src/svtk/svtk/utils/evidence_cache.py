@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+
+"""
+Cache rows of position-indexed evidence files across consecutive queries.
+
+PE and SR evidence files are tabix-indexed on a single position column.
+When testing a sorted VCF, neighbouring records query overlapping windows,
+so each BGZF block would otherwise be decompressed and parsed many times.
+"""
+
+from collections import OrderedDict
+import re
+import numpy as np
+
+
+_REGION = re.compile(r'^(.+):(\d+)-(\d+)$')
+
+
+class EvidenceCache:
+    def __init__(self, tabixfile, window=100000, max_rows=2000000):
+        """
+        Read-ahead cache over a tabix-indexed evidence file.
+
+        Queries are served from in-memory blocks of rows. On a miss, a block
+        spanning at least `window` bp from the start of the query is read
+        from the file. Blocks behind the current record are dropped with
+        `advance`, and least recently used blocks are dropped when more than
+        `max_rows` rows are held.
+
+        Results are identical to fetching directly from the file, provided
+        each row is indexed on a single position (tabix -b and -e on the
+        same column), as for PE and SR evidence files.
+
+        Parameters
+        ----------
+        tabixfile : pysam.TabixFile or svtk.utils.MultiTabixFile
+        window : int, optional
+            Minimum span (bp) of each block read from the file
+        max_rows : int, optional
+            Maximum number of rows to keep in memory
+
+        Attributes
+        ----------
+        hits : int
+            Queries served from memory
+        misses : int
+            Queries requiring a read from the file
+        rows_read : int
+            Rows read from the file
+        bytes_read : int
+            Uncompressed bytes of rows read from the file
+        """
+
+        self.tabixfile = tabixfile
+        self.window = window
+        self.max_rows = max_rows
+
+        # (chrom, start, end) -> (positions, rows); 1-based, inclusive
+        self.blocks = OrderedDict()
+        self.n_rows = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.rows_read = 0
+        self.bytes_read = 0
+
+    def fetch(self, reference=None, start=None, end=None, region=None, **kwargs):
+        """
+        TabixFile.fetch(self, reference=None, start=None, end=None, region=None)
+
+        Returns
+        -------
+        rows : list
+            Rows overlapping the region, in file order
+        """
+
+        if region is None and start is None and end is None:
+            region = reference
+
+        if region is not None:
+            match = _REGION.match(region)
+            if match is None or kwargs:
+                # Leave unusual queries to the underlying file
+                self.misses += 1
+                return self.tabixfile.fetch(region=region, **kwargs)
+            chrom = match.group(1)
+            start, end = int(match.group(2)), int(match.group(3))
+        else:
+            if kwargs:
+                self.misses += 1
+                return self.tabixfile.fetch(reference, start, end, **kwargs)
+            chrom = reference
+            start = start + 1
+
+        if start < 1 or end < start:
+            self.misses += 1
+            return self.tabixfile.fetch(region='{0}:{1}-{2}'.format(chrom, start, end))
+
+        block = self._find_block(chrom, start, end)
+        if block is None:
+            self.misses += 1
+            block = self._read_block(chrom, start, max(end, start + self.window - 1))
+        else:
+            self.hits += 1
+
+        positions, rows = block
+        i = np.searchsorted(positions, start, side='left')
+        j = np.searchsorted(positions, end, side='right')
+
+        return rows[i:j]
+
+    def advance(self, chrom, pos):
+        """
+        Drop blocks on a contig which end before a position.
+
+        Parameters
+        ----------
+        chrom : str
+        pos : int
+            1-based position of the earliest query still to come on chrom
+        """
+
+        for key in list(self.blocks.keys()):
+            if key[0] == chrom and key[2] < pos:
+                self._drop_block(key)
+
+    def report(self):
+        """
+        Returns
+        -------
+        report : str
+            Summary of cache usage
+        """
+        queries = self.hits + self.misses
+        hit_rate = self.hits / queries if queries > 0 else 0
+        msg = ('Evidence cache: {0} queries, {1} hits, {2} misses '
+               '({3:.1%} hit rate). {4} rows, {5} bytes read.')
+
+        return msg.format(queries, self.hits, self.misses, hit_rate,
+                          self.rows_read, self.bytes_read)
+
+    def close(self):
+        self.blocks.clear()
+        self.n_rows = 0
+        self.tabixfile.close()
+
+    def _find_block(self, chrom, start, end):
+        for key, block in self.blocks.items():
+            if key[0] == chrom and key[1] <= start and end <= key[2]:
+                self.blocks.move_to_end(key)
+                return block
+
+        return None
+
+    def _read_block(self, chrom, start, end):
+        region = '{0}:{1}-{2}'.format(chrom, start, end)
+        rows = list(self.tabixfile.fetch(region=region))
+
+        positions = np.empty(len(rows), dtype=np.int64)
+        n_bytes = 0
+        for i, row in enumerate(rows):
+            if isinstance(row, str):
+                positions[i] = int(row.split('\t', 2)[1])
+                n_bytes += len(row) + 1
+            else:
+                positions[i] = int(row[1])
+                n_bytes += len(str(row)) + 1
+
+        self.rows_read += len(rows)
+        self.bytes_read += n_bytes
+
+        block = (positions, rows)
+        key = (chrom, start, end)
+        self.blocks[key] = block
+        self.n_rows += len(rows)
+
+        # Drop least recently used blocks once over budget
+        while self.n_rows > self.max_rows and len(self.blocks) > 1:
+            self._drop_block(next(iter(self.blocks)))
+
+        return block
+
+    def _drop_block(self, key):
+        positions, rows = self.blocks.pop(key)
+        self.n_rows -= len(rows)
@@ -0,0 +1,487 @@
+# -*- coding: utf-8 -*-
+#
+"""
+intervals.py
+
+Columnar in-memory interval tables built directly from SV VCFs.
+"""
+
+import numpy as np
+import pysam
+import pybedtools as pbt
+from .utils import NULL_GT, parse_bnd_pos
+
+
+CPX_INS_CLASSES = 'dDUP dDUP_iDEL INS_iDEL'.split()
+
+
+def _format_info(info):
+    if info is None:
+        return 'NA'
+    elif isinstance(info, tuple) or isinstance(info, list):
+        return ','.join([str(x) for x in info])
+    else:
+        return str(info)
+
+
+def _called_mask(record, n_samples):
+    """
+    Flag samples with a variant call, as in `get_called_samples`.
+
+    Returns
+    -------
+    called : np.ndarray of bool
+        Indexed by the order of samples in the record's header
+    """
+    called = np.zeros(n_samples, dtype=bool)
+    is_cnv = record.info.get('SVTYPE', None) == 'CNV'
+    for i, sample in enumerate(record.samples.values()):
+        if sample['GT'] not in NULL_GT or (is_cnv and sample['CN'] != 2):
+            called[i] = True
+
+    return called
+
+
+class IntervalTable(object):
+    """
+    Columnar table of SV intervals.
+
+    Each row is one interval. Contigs, SV types and strands are stored as
+    integer codes into the `contigs`, `svtypes` and `strands` lists, and
+    called samples as packed bitsets indexed by the order of `samples`.
+    Optional columns are None when they were not requested.
+    """
+
+    def __init__(self, contigs, contig_codes, start, end, names, svtypes,
+                 svtype_codes, strands=None, strands_codes=None,
+                 samples=None, sample_bits=None, infos=None, filters=None):
+        """
+        contigs : list of str
+        contig_codes : np.ndarray of int
+        start, end : np.ndarray of int
+            0-based, half-open coordinates
+        names : np.ndarray of object
+            Variant ID of each interval
+        svtypes : list of str
+        svtype_codes : np.ndarray of int
+        strands : list of str, optional
+        strands_codes : np.ndarray of int, optional
+            -1 where the record has no STRANDS
+        samples : list of str, optional
+        sample_bits : np.ndarray of uint8, shape (n_intervals, n_bytes), optional
+        infos : dict of {str: np.ndarray of object}, optional
+            Raw INFO values of each interval, in the requested order
+        filters : np.ndarray of object, optional
+            Tuple of FILTER values of each interval
+        """
+        self.contigs = contigs
+        self.contig_codes = contig_codes
+        self.start = start
+        self.end = end
+        self.names = names
+        self.svtypes = svtypes
+        self.svtype_codes = svtype_codes
+        self.strands = strands
+        self.strands_codes = strands_codes
+        self.samples = samples
+        self.sample_bits = sample_bits
+        self.infos = infos
+        self.filters = filters
+
+    def __len__(self):
+        return self.start.shape[0]
+
+    @staticmethod
+    def _decode(values, codes):
+        values = np.array(list(values) + [None], dtype=object)
+        return values[codes]
+
+    def get_contigs(self):
+        """Contig of each interval, as np.ndarray of object"""
+        return self._decode(self.contigs, self.contig_codes)
+
+    def get_svtypes(self):
+        """SV type of each interval, as np.ndarray of object"""
+        return self._decode(self.svtypes, self.svtype_codes)
+
+    def get_strands(self):
+        """Strands of each interval (None if absent), as np.ndarray of object"""
+        return self._decode(self.strands, self.strands_codes)
+
+    def get_called_samples(self, idx):
+        """
+        Returns
+        -------
+        samples : list of str
+            Sorted list of sample IDs called in interval `idx`
+        """
+        called = np.unpackbits(self.sample_bits[idx])[:len(self.samples)]
+        return sorted(self.samples[i] for i in np.flatnonzero(called))
+
+    def take(self, idx):
+        """
+        Select a subset of intervals.
+
+        Arguments
+        ---------
+        idx : np.ndarray of int or bool
+
+        Returns
+        -------
+        table : IntervalTable
+        """
+        def _take(column):
+            return None if column is None else column[idx]
+
+        infos = self.infos
+        if infos is not None:
+            infos = {key: values[idx] for key, values in infos.items()}
+
+        return IntervalTable(self.contigs, self.contig_codes[idx],
+                             self.start[idx], self.end[idx], self.names[idx],
+                             self.svtypes, self.svtype_codes[idx],
+                             self.strands, _take(self.strands_codes),
+                             self.samples, _take(self.sample_bits),
+                             infos, _take(self.filters))
+
+    def window_pairs(self, window=0):
+        """
+        Find all pairs of intervals on the same contig that lie within a
+        given distance of each other, as with `bedtools window -w`.
+
+        Intervals are sorted by start once, and each interval's partners are
+        found with a binary search on the starts, so only pairs within the
+        window are generated.
+
+        Arguments
+        ---------
+        window : int
+
+        Returns
+        -------
+        idx1 : np.ndarray of int
+        idx2 : np.ndarray of int
+            Indices of each distinct pair of intervals, with idx1 < idx2
+        """
+        # Offset each contig so intervals on different contigs never pair
+        offset = self.contig_codes.astype(np.int64) << 40
+        start = self.start + offset
+        end = self.end + offset
+
+        order = np.argsort(start, kind='stable')
+        sorted_start = start[order]
+        n = sorted_start.shape[0]
+
+        # Partners of each interval are the later intervals starting before
+        # its end plus the window
+        limits = np.searchsorted(sorted_start, end[order] + window,
+                                 side='left')
+        n_partners = np.maximum(limits - np.arange(n) - 1, 0)
+
+        first = np.repeat(np.arange(n), n_partners)
+        offsets = np.arange(first.shape[0]) - \
+            np.repeat(np.cumsum(n_partners) - n_partners, n_partners)
+        second = first + 1 + offsets
+
+        idx1, idx2 = order[first], order[second]
+
+        return np.minimum(idx1, idx2), np.maximum(idx1, idx2)
+
+    def to_bed_lines(self):
+        """
+        Format intervals as BED lines.
+
+        Columns are chrom, start, end, name, svtype, then strands, samples,
+        INFO fields and FILTER when present.
+
+        Yields
+        ------
+        line : str
+        """
+        columns = [self.get_contigs().tolist(), self.start.tolist(),
+                   self.end.tolist(), self.names.tolist(),
+                   self.get_svtypes().tolist()]
+
+        if self.strands_codes is not None:
+            columns.append(['.' if s is None else s
+                            for s in self.get_strands().tolist()])
+        if self.sample_bits is not None:
+            columns.append([','.join(self.get_called_samples(i))
+                            for i in range(len(self))])
+        if self.infos is not None:
+            for values in self.infos.values():
+                columns.append([_format_info(v) for v in values.tolist()])
+        if self.filters is not None:
+            columns.append([','.join(f) for f in self.filters.tolist()])
+
+        for row in zip(*columns):
+            yield '\t'.join(str(x) for x in row) + '\n'
+
+    def to_bedtool(self):
+        """
+        Returns
+        -------
+        bt : pybedtools.BedTool
+        """
+        return pbt.BedTool(self.to_bed_lines()).saveas()
+
+
+def vcf2intervals(vcf, split_bnd=True, include_samples=False,
+                  include_strands=True, split_cpx=False, include_infos=None,
+                  annotate_ins=True, report_alt=False, svtypes=None,
+                  no_sort_coords=False, simple_sinks=False,
+                  include_unresolved=True, include_filters=False):
+    """
+    Load the intervals of SV in a VCF into a columnar table.
+
+    Intervals are the same as those reported by `vcf2bedtool`, which takes
+    the same options, but are read straight into typed arrays without
+    formatting or parsing BED text.
+
+    Parameters
+    ----------
+    vcf : str or pysam.VariantFile
+    split_bnd : bool, optional
+        Provide two records for each BND, one per breakend
+    include_samples : bool, optional
+        Store bitset of called samples
+    include_strands : bool, optional
+        Store breakpoint strandedness
+    include_infos : list of str, optional
+        INFO fields to store as columns. If "ALL" is present in the
+        list, all INFO fields will be stored.
+    annotate_ins : bool, optional
+        Rename SVTYPE of insertion records to DEL to annotate sink.
+    report_alt : bool, optional
+        Report record's ALT as SVTYPE
+    svtypes : list of str, optional
+        Whitelist of SV types to restrict intervals to
+    no_sort_coords : bool, optional
+        Do not sort start & end coordinates
+    simple_sinks : bool, optional
+        Treat all insertion sinks as single-bp windows
+    include_unresolved : bool, optional
+        Include unresolved variants
+    include_filters : bool, optional
+        Store FILTER field
+
+    Returns
+    -------
+    table : IntervalTable
+        0-based intervals. Starts of BND records are assigned as pos - 1.
+    """
+
+    if not isinstance(vcf, pysam.VariantFile):
+        vcf = pysam.VariantFile(vcf)
+
+    if include_infos and 'ALL' in include_infos:
+        include_infos = list(vcf.header.info.keys())
+
+    samples = list(vcf.header.samples)
+    n_samples = len(samples)
+
+    contig_codes, svtype_codes, strands_codes = {}, {}, {}
+    rows = {'contig': [], 'start': [], 'end': [], 'name': [], 'svtype': [],
+            'strands': [], 'bits': [], 'filters': []}
+    info_rows = {key: [] for key in include_infos} if include_infos else {}
+
+    for record in vcf:
+        if svtypes is not None and record.info['SVTYPE'] not in svtypes:
+            continue
+        if not include_unresolved:
+            if 'UNRESOLVED' in record.info.keys() \
+                    or 'UNRESOLVED_TYPE' in record.info.keys() \
+                    or 'UNRESOLVED' in record.filter:
+                continue
+
+        record_type = record.info.get('SVTYPE', None)
+        chrom = record.chrom
+
+        # Set start & end coordinates to appropriate sorted order
+        # for all records (to not break bedtools)
+        if no_sort_coords:
+            start, end = int(record.pos), int(record.stop)
+        else:
+            start, end = sorted([int(record.pos), int(record.stop)])
+
+        # Subtract 1bp from pos to convert to 0-based BED vs 1-based VCF
+        start = max(0, start - 1)
+
+        if report_alt:
+            svtype = record.alts[0].strip('<>')
+        else:
+            svtype = record.info['SVTYPE']
+
+        # (chrom, start, end, svtype) of each interval of the record
+        intervals = []
+        if record_type == 'BND':
+            # First end of breakpoint
+            intervals.append((chrom, max(0, record.pos - 1), record.pos, svtype))
+
+            # Second end of breakpoint
+            if split_bnd:
+                if '[' in record.alts[0] or ']' in record.alts[0]:
+                    chrom, end = parse_bnd_pos(record.alts[0])
+                else:
+                    chrom = record.info.get('CHR2', None)
+                    end = record.stop
+                intervals.append((chrom, max(0, end - 1), end, svtype))
+
+        elif record_type == 'INS':
+            # Only report insertion sinks, treated as deletions
+            if annotate_ins:
+                svtype = 'DEL'
+            # Reduce insertion sinks to single-bp intervals if optioned
+            if simple_sinks:
+                start = max(0, record.pos)
+                end = start + 1
+            intervals.append((chrom, start, end, svtype))
+
+        elif record_type == 'CTX':
+            start = max(0, record.pos - 1)
+            intervals.append((chrom, start, start + 1, svtype))
+
+            # Second end of breakpoint
+            if split_bnd:
+                intervals.append((record.info['CHR2'],
+                                  max(0, record.stop - 1), record.stop, svtype))
+
+        # Deconstruct complex intervals, if optioned
+        elif 'CPX_INTERVALS' in record.info and split_cpx:
+            # If complex, all constituent intervals are in CPX_INTERVALS
+            for interval in record.info['CPX_INTERVALS']:
+                cpx_type, region = interval.split('_')
+                cpx_chrom, coords = region.split(':')
+                cpx_start, cpx_end = coords.split('-')
+                intervals.append((cpx_chrom, max(0, int(cpx_start) - 1),
+                                  int(cpx_end), cpx_type))
+            # If complex insertion, return insertion point as 1bp DEL
+            if record.info.get('CPX_TYPE', None) in CPX_INS_CLASSES:
+                intervals.append((chrom, max(0, record.pos - 1), record.pos,
+                                  'DEL'))
+
+        else:
+            if not no_sort_coords and start == end:
+                end += 1
+            intervals.append((chrom, start, end, svtype))
+
+        if len(intervals) == 0:
+            continue
+
+        # Per-record columns, shared by all of the record's intervals
+        if include_strands:
+            try:
+                strands = record.info.get('STRANDS', None)
+            except ValueError:
+                strands = None
+            strands = -1 if strands is None else \
+                strands_codes.setdefault(strands, len(strands_codes))
+        if include_samples:
+            bits = np.packbits(_called_mask(record, n_samples))
+        if include_filters:
+            filters = tuple(record.filter)
+        infos = {}
+        for key in info_rows:
+            # Can't access END through info
+            infos[key] = record.stop if key == 'END' else record.info.get(key)
+
+        for chrom, start, end, svtype in intervals:
+            rows['contig'].append(contig_codes.setdefault(chrom, len(contig_codes)))
+            rows['start'].append(start)
+            rows['end'].append(end)
+            rows['name'].append(record.id)
+            rows['svtype'].append(svtype_codes.setdefault(svtype, len(svtype_codes)))
+            if include_strands:
+                rows['strands'].append(strands)
+            if include_samples:
+                rows['bits'].append(bits)
+            if include_filters:
+                rows['filters'].append(filters)
+            for key, value in infos.items():
+                info_rows[key].append(value)
+
+    def _objects(values):
+        array = np.empty(len(values), dtype=object)
+        for i, value in enumerate(values):
+            array[i] = value
+        return array
+
+    n_bytes = (n_samples + 7) // 8
+    sample_bits = None
+    if include_samples:
+        sample_bits = np.array(rows['bits'], dtype=np.uint8).reshape(
+            len(rows['bits']), n_bytes)
+
+    return IntervalTable(
+        contigs=list(contig_codes),
+        contig_codes=np.array(rows['contig'], dtype=np.int32),
+        start=np.array(rows['start'], dtype=np.int64),
+        end=np.array(rows['end'], dtype=np.int64),
+        names=_objects(rows['name']),
+        svtypes=list(svtype_codes),
+        svtype_codes=np.array(rows['svtype'], dtype=np.int32),
+        strands=list(strands_codes) if include_strands else None,
+        strands_codes=np.array(rows['strands'], dtype=np.int32) if include_strands else None,
+        samples=samples if include_samples else None,
+        sample_bits=sample_bits,
+        infos={key: _objects(values) for key, values in info_rows.items()} if include_infos else None,
+        filters=_objects(rows['filters']) if include_filters else None)
+
+
+def vcf2bedtool(vcf, split_bnd=True, include_samples=False,
+                include_strands=True, split_cpx=False, include_infos=None,
+                annotate_ins=True, report_alt=False, svtypes=None,
+                no_sort_coords=False, simple_sinks=False,
+                include_unresolved=True, include_filters=False):
+    """
+    Wrap VCF as a bedtool. Necessary as pybedtools does not support SV in VCF.
+
+    Intervals are loaded with `vcf2intervals`; callers which do not need
+    bedtools should use the returned `IntervalTable` directly.
+
+    Parameters
+    ----------
+    vcf : str or pysam.VariantFile
+    split_bnd : bool, optional
+        Provide two records for each BND, one per breakend
+    include_samples : bool, optional
+        Provide comma-delimited list of called samples
+    include_strands : bool, optional
+        Provide breakpoint strandedness
+    include_infos : list of str, optional
+        INFO fields to add as columns in output. If "ALL" is present in the
+        list, all INFO fields will be reported.
+    annotate_ins : bool, optional
+        Rename SVTYPE of insertion records to DEL to annotate sink.
+    report_alt : bool, optional
+        Report record's ALT as SVTYPE in bed
+    svtypes : list of str, optional
+        Whitelist of SV types to restrict generated bed to
+    no_sort_coords : bool, optional
+        Do not sort start & end coordinates
+    simple_sinks : bool, optional
+        Treat all insertion sinks as single-bp windows
+    include_unresolved : bool, optional
+        Output unresolved variants
+    include_filters : bool, optional
+        Output FILTER field after INFO fields
+
+    Returns
+    -------
+    bt : pybedtools.BedTool
+        SV converted to Bedtool. Starts of BND records are assigned as pos - 1.
+        Note that BED is 0-based but VCF is 1-based, so 1bp is subtracted from
+        all pos values when converted from VCF to BED
+        Included columns: chrom, start, end, name, svtype, strands
+    """
+    table = vcf2intervals(vcf, split_bnd=split_bnd,
+                          include_samples=include_samples,
+                          include_strands=include_strands,
+                          split_cpx=split_cpx, include_infos=include_infos,
+                          annotate_ins=annotate_ins, report_alt=report_alt,
+                          svtypes=svtypes, no_sort_coords=no_sort_coords,
+                          simple_sinks=simple_sinks,
+                          include_unresolved=include_unresolved,
+                          include_filters=include_filters)
+
+    return table.to_bedtool()
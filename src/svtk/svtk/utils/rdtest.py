@@ -6,6 +6,7 @@
 
 """
 
+import io
 import os
 import tempfile
 import pkg_resources
@@ -45,22 +46,134 @@ def _make_rdtest_bed(variants):
 
     bed = tempfile.NamedTemporaryFile(dir=os.getcwd())
 
-    for variant in variants:
-        bed_entry = _record_to_bed(variant)
-        bed.write(bed_entry.encode('utf-8'))
-        bed.flush()
+    entries = ''.join(_record_to_bed(variant) for variant in variants)
+    bed.write(entries.encode('utf-8'))
+    bed.flush()
 
     return bed
 
 
+def _make_whitelist(whitelist):
+    """
+    Write list of whitelisted samples to a temporary file
+
+    Returns
+    -------
+    whitelist_file : tempfile.NamedTemporaryFile
+    """
+
+    whitelist_file = tempfile.NamedTemporaryFile(dir=os.getcwd())
+    entries = ''.join(sample + '\n' for sample in whitelist)
+    whitelist_file.write(entries.encode('utf-8'))
+    whitelist_file.flush()
+
+    return whitelist_file
+
+
+def _check_svtype(variant):
+    if variant.info['SVTYPE'] not in 'DEL DUP'.split():
+        msg = 'Invalid svtype {0} for RdTest in record {1}'
+        msg = msg.format(variant.info['SVTYPE'], variant.id)
+        raise Exception(msg)
+
+
 class RdTest:
     def __init__(self, bincov_file, medianfile, famfile, whitelist,
-                 cutoffs=None):
+                 cutoffs=None, batch_size=100):
+        """
+        Records passed to `enqueue` are queued and tested together once
+        `batch_size` records are queued, or when a queued record's metrics
+        are needed, so RdTest starts and loads coverage once per batch rather
+        than once per record.
+
+        Parameters
+        ----------
+        bincov_file : str
+        medianfile : str
+        famfile : str
+        whitelist : str or list of str
+            Filepath to sample whitelist or list of whitelisted sample IDs
+        cutoffs : pd.DataFrame, optional
+        batch_size : int, optional
+            Number of queued records which triggers a batch
+        """
         self.bincov_file = bincov_file
         self.medianfile = medianfile
         self.famfile = famfile
-        self.whitelist = whitelist
         self.cutoffs = cutoffs
+        self.batch_size = batch_size
+
+        # Write whitelist once rather than per RdTest call
+        if isinstance(whitelist, list):
+            self.whitelist_file = _make_whitelist(whitelist)
+            self.whitelist = self.whitelist_file.name
+        else:
+            self.whitelist = whitelist
+
+        # Records awaiting testing, from queue position `num_queued - len(pending)`
+        self.pending = []
+        self.num_queued = 0
+        # RdTest metrics header, and metrics line of tested records by queue position
+        self.header = None
+        self.metrics = {}
+
+    def enqueue(self, record):
+        """
+        Queue a record to be tested in the next batch
+
+        Returns
+        -------
+        position : int
+            Queue position of the record, used to get its metrics
+        """
+        _check_svtype(record)
+        self.pending.append(record)
+        position = self.num_queued
+        self.num_queued += 1
+
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+        return position
+
+    def flush(self):
+        """Test all queued records"""
+        if len(self.pending) == 0:
+            return
+
+        lines = _run_rdtest(self.pending, self.bincov_file, self.medianfile,
+                            self.famfile, self.whitelist, quiet=True)
+        if len(lines) - 1 != len(self.pending):
+            msg = 'RdTest reported metrics for {0} of {1} records'
+            raise Exception(msg.format(len(lines) - 1, len(self.pending)))
+
+        # RdTest reports records in the order of its input bed
+        self.header = lines[0]
+        first = self.num_queued - len(self.pending)
+        for i, line in enumerate(lines[1:]):
+            self.metrics[first + i] = line
+        self.pending = []
+
+    def _pop_metrics_lines(self, positions):
+        if any(position not in self.metrics for position in positions):
+            self.flush()
+
+        return [self.metrics.pop(position) for position in positions]
+
+    def get_metrics(self, position):
+        """
+        Parameters
+        ----------
+        position : int
+            Queue position returned by `enqueue`
+
+        Returns
+        -------
+        metrics : pd.Series
+            RdTest metrics of the record
+        """
+        lines = self._pop_metrics_lines([position])
+        return pd.read_table(io.StringIO(''.join([self.header] + lines))).iloc[0]
 
     def get_cutoffs(self, cutoff_type):
         if cutoff_type == 'pesr_lt1kb':
@@ -88,12 +201,28 @@ class RdTest:
                                          'min_log_pval', 'min_log_2ndMaxP'])
         return Cutoffs(min_Median_Separation, min_log_pval, min_log_2ndMaxP)
 
-    def test_record(self, record, cutoff_type='pesr_gt1kb'):
+    def test_record(self, record, cutoff_type='pesr_gt1kb', position=None):
+        """
+        Test whether a record passes the RdTest cutoffs
+
+        Parameters
+        ----------
+        record : pysam.VariantRecord
+        cutoff_type : str, optional
+        position : int, optional
+            Queue position returned by `enqueue`, if the record is already
+            queued. Queue records with `enqueue` before testing them to test
+            them in shared batches.
+
+        Returns
+        -------
+        passes : bool
+        """
         if self.cutoffs is None:
             raise Exception('Record testing not available without cutoffs')
-        metrics = call_rdtest([record], self.bincov_file, self.medianfile,
-                              self.famfile, self.whitelist, quiet=True)
-        metrics = metrics.iloc[0]
+        if position is None:
+            position = self.enqueue(record)
+        metrics = self.get_metrics(position)
 
         cutoffs = self.get_cutoffs(cutoff_type)
 
@@ -101,15 +230,27 @@ class RdTest:
         if isinstance(metrics.Median_Separation, str):
             return False
         else:
-            return (metrics.Median_Separation >= cutoffs.min_Median_Separation and
-                    -np.log10(metrics.P) >= cutoffs.min_log_pval and
-                    -np.log10(metrics['2ndMaxP']) >= cutoffs.min_log_2ndMaxP)
+            return bool(metrics.Median_Separation >= cutoffs.min_Median_Separation and
+                        -np.log10(metrics.P) >= cutoffs.min_log_pval and
+                        -np.log10(metrics['2ndMaxP']) >= cutoffs.min_log_2ndMaxP)
 
     def test(self, records, quiet=True):
-        metrics = call_rdtest(records, self.bincov_file, self.medianfile,
-                              self.famfile, self.whitelist, quiet=True)
+        """
+        Test records in batches of `batch_size`
 
-        return metrics
+        Returns
+        -------
+        metrics : pd.DataFrame
+            RdTest metrics for the provided records, in the same order
+        """
+        if len(records) == 0:
+            return call_rdtest(records, self.bincov_file, self.medianfile,
+                               self.famfile, self.whitelist, quiet=True)
+
+        positions = [self.enqueue(record) for record in records]
+        lines = self._pop_metrics_lines(positions)
+
+        return pd.read_table(io.StringIO(''.join([self.header] + lines)))
 
 
 def call_rdtest(variants, bincov_file, medianfile, famfile, whitelist,
@@ -134,6 +275,23 @@ def call_rdtest(variants, bincov_file, medianfile, famfile, whitelist,
         RdTest metrics for the provided variants
     """
 
+    lines = _run_rdtest(variants, bincov_file, medianfile, famfile, whitelist,
+                        quiet)
+
+    return pd.read_table(io.StringIO(''.join(lines)))
+
+
+def _run_rdtest(variants, bincov_file, medianfile, famfile, whitelist,
+                quiet=False):
+    """
+    Run RdTest on variants
+
+    Returns
+    -------
+    lines : list of str
+        Lines of the RdTest metrics file, starting with its header
+    """
+
     if not os.path.exists(bincov_file):
         raise Exception('Bincov file does not exist: {0}'.format(bincov_file))
 
@@ -146,11 +304,7 @@ def call_rdtest(variants, bincov_file, medianfile, famfile, whitelist,
     if isinstance(whitelist, str):
         whitelist_filename = whitelist
     elif isinstance(whitelist, list):
-        whitelist_file = tempfile.NamedTemporaryFile(dir=os.getcwd())
-        for sample in whitelist:
-            entry = sample + '\n'
-            whitelist_file.write(entry.encode('utf-8'))
-        whitelist_file.flush()
+        whitelist_file = _make_whitelist(whitelist)
         whitelist_filename = whitelist_file.name
     else:
         msg = 'Invalid type for whitelist: {0}\n'.format(str(type(whitelist)))
@@ -158,10 +312,7 @@ def call_rdtest(variants, bincov_file, medianfile, famfile, whitelist,
         raise Exception(msg)
 
     for variant in variants:
-        if variant.info['SVTYPE'] not in 'DEL DUP'.split():
-            msg = 'Invalid svtype {0} for RdTest in record {1}'
-            msg = msg.format(variant.info['SVTYPE'], variant.id)
-            raise Exception(msg)
+        _check_svtype(variant)
 
     output_dir = tempfile.TemporaryDirectory(dir=os.getcwd())
 
@@ -188,9 +339,8 @@ def call_rdtest(variants, bincov_file, medianfile, famfile, whitelist,
            stdout=stdout,
            stderr=stderr)
 
-    metrics = pd.read_table(os.path.join(output_dir.name, 'tmp.metrics'))
-
-    return metrics
+    with open(os.path.join(output_dir.name, 'tmp.metrics')) as metrics_file:
+        return metrics_file.readlines()
 
 
 def filter_rdtest(variants, cutoffs):
@@ -12,15 +12,33 @@ maximum individual clustering distance across the libraries being analyzed.
 (Generally median + 7 * MAD)
 """
 
+import bisect
+import collections
+import functools
 import heapq
+import itertools
+import multiprocessing
+import os
 import re
+import tempfile
+import numpy as np
 import pkg_resources
-from svtk.svfile import SVFile, SVRecordCluster, SVRecord
+import pysam
+from svtk.svfile import SVFile, SVRecordCluster, SVRecord, SVTYPE_CODES, ALT_CODES
 from svtk.genomeslink import GenomeSLINK
-from svtk.utils import samples_overlap
+from svtk.utils import samples_overlap, samples_overlap_array, recip_array, is_smaller_chrom
 from svtk.standardize import VCFStandardizer
 
 
+def _compare_chroms(chromA, chromB):
+    if chromA == chromB:
+        return 0
+    return -1 if is_smaller_chrom(chromA, chromB) else 1
+
+
+_chrom_key = functools.cmp_to_key(_compare_chroms)
+
+
 class VCFCluster(GenomeSLINK):
     def __init__(self, vcfs,
                  dist=500, frac=0.0,
@@ -30,7 +48,8 @@ class VCFCluster(GenomeSLINK):
                  preserve_header=False,
                  do_cluster=True,
                  do_merge=True,
-                 single_end=False):
+                 single_end=False,
+                 engine='pairwise'):
         """
         Clustering of VCF records.
 
@@ -74,6 +93,9 @@ class VCFCluster(GenomeSLINK):
             Minimum fraction of samples to overlap to cluster variants
         single_end : bool, optional
             Require only one end to be within min dist.
+        engine : str, optional
+            Candidate linking engine, one of 'pairwise', 'array' or 'sweep'.
+            See GenomeSLINK.
         """
 
         if (not do_cluster) and (not do_merge):
@@ -90,6 +112,7 @@ class VCFCluster(GenomeSLINK):
                 svfile.fetch(chrom, start, end)
 
         # Merge sorted SV files
+        self.svfiles = svfiles
         nodes = heapq.merge(*svfiles)
 
         # Make lists of unique sources and samples to construct VCF header
@@ -100,6 +123,12 @@ class VCFCluster(GenomeSLINK):
             sources = sources.union(svfile.sources)
             samples = samples.union(svfile.samples)
 
+        # Share one sample bit index across files so called sample bitsets
+        # are comparable
+        sample_index = {s: i for i, s in enumerate(sorted(samples))}
+        for svfile in svfiles:
+            svfile.sample_index = sample_index
+
         # Parameterize clustering
         self.frac = frac
         self.match_strands = match_strands
@@ -118,7 +147,7 @@ class VCFCluster(GenomeSLINK):
         self.sources = sorted(sources)
         self.header = self.make_vcf_header()
 
-        super().__init__(nodes, dist, 1, blacklist, single_end)
+        super().__init__(nodes, dist, 1, blacklist, single_end, engine)
 
     def clusters_with(self, first, second):
         """
@@ -135,23 +164,22 @@ class VCFCluster(GenomeSLINK):
         """
 
         # If svtypes don't match, skip remaining calculations for efficiency
-        if self.match_svtypes and first.svtype != second.svtype:
+        if self.match_svtypes and first.svtype_code != second.svtype_code:
             return False
 
         # If both records have an INS subclass specified, require it to match
         # Otherwise, permit clustering if one or both don't have subclass
         if self.match_svtypes and first.svtype == 'INS':
-            if first.record.alts[0] != second.record.alts[0]:
-                if first.record.alts[0] != '<INS>' and first.record.alts[0] != '<INS>':
+            if first.alt != second.alt:
+                if first.alt != '<INS>' and first.alt != '<INS>':
                     return False
 
         # If strands are required to match and don't, skip remaining calcs
         if self.match_svtypes and self.match_strands:
-            if ('STRANDS' in first.record.info.keys()) != ('STRANDS' in second.record.info.keys()):
-                raise ValueError(f"One of records {first.record.id} and {second.record.id} has "
+            if (first.strands is None) != (second.strands is None):
+                raise ValueError(f"One of records {first.name} and {second.name} has "
                                  f"STRANDS annotation assigned but the other does not")
-            elif 'STRANDS' in first.record.info.keys() \
-                    and first.record.info['STRANDS'] != second.record.info['STRANDS']:
+            elif first.strands is not None and first.strands_code != second.strands_code:
                 return False
 
         clusters = (super().clusters_with(first, second) and
@@ -166,6 +194,92 @@ class VCFCluster(GenomeSLINK):
 
         return clusters
 
+    def node_arrays(self, candidates):
+        """
+        Columnar representation of a batch of SVRecords.
+
+        In addition to coordinates, includes the codes precomputed by each
+        SVRecord for contigs, svtype, strands and insertion subclass, plus
+        called sample bitsets if a minimum sample overlap is required.
+        """
+
+        def _column(attr, dtype=np.int64):
+            return np.array([getattr(node, attr) for node in candidates], dtype=dtype)
+
+        nodes = {
+            'posA': _column('posA'),
+            'posB': _column('posB'),
+            'chrA': _column('chrA_code'),
+            'chrB': _column('chrB_code'),
+            'svtype': _column('svtype_code'),
+            'strands': _column('strands_code'),
+            'alt': _column('alt_code'),
+            'svlen': np.array([-1 if node.svlen is None else node.svlen for node in candidates],
+                              dtype=np.int64),
+        }
+
+        if self.sample_overlap > 0:
+            n_bytes = (len(self.samples) + 7) // 8
+            bits = np.zeros((len(candidates), n_bytes), dtype=np.uint8)
+            for i, node in enumerate(candidates):
+                bits[i] = node.sample_bits
+            nodes['sample_bits'] = bits
+
+        return nodes
+
+    def clusters_with_arrays(self, nodes, idx1, idx2):
+        """
+        Vectorized `clusters_with` over pairs of SVRecords.
+        """
+
+        keep = np.ones(idx1.shape[0], dtype=bool)
+
+        if self.match_svtypes:
+            svtype, alt = nodes['svtype'], nodes['alt']
+            keep &= svtype[idx1] == svtype[idx2]
+
+            # Require INS subclasses to match unless first is unspecified
+            ins_code = SVTYPE_CODES['INS']
+            generic_ins = ALT_CODES['<INS>']
+            keep &= ~((svtype[idx1] == ins_code) &
+                      (alt[idx1] != alt[idx2]) &
+                      (alt[idx1] != generic_ins))
+
+            if self.match_strands:
+                strands = nodes['strands']
+                has1, has2 = strands[idx1] >= 0, strands[idx2] >= 0
+                mismatch = np.flatnonzero(keep & (has1 != has2))
+                if mismatch.shape[0] > 0:
+                    raise ValueError(f"One of records at {nodes['posA'][idx1[mismatch[0]]]} and "
+                                     f"{nodes['posA'][idx2[mismatch[0]]]} has STRANDS annotation "
+                                     f"assigned but the other does not")
+                keep &= ~has1 | (strands[idx1] == strands[idx2])
+
+        keep &= super().clusters_with_arrays(nodes, idx1, idx2)
+
+        # Reciprocal overlap, restricted to remaining pairs
+        pairs = np.flatnonzero(keep)
+        i1, i2 = idx1[pairs], idx2[pairs]
+        posA, posB, svlen = nodes['posA'], nodes['posB'], nodes['svlen']
+
+        is_tloc = nodes['chrA'][i1] != nodes['chrB'][i1]
+        is_ins = nodes['svtype'][i1] == SVTYPE_CODES['INS']
+        unknown_len = (svlen[i1] == -1) | (svlen[i2] == -1)
+        endA = np.where(is_ins, posA[i1] + svlen[i1], posB[i1])
+        endB = np.where(is_ins, posA[i2] + svlen[i2], posB[i2])
+        overlaps = (is_tloc | (is_ins & unknown_len) |
+                    recip_array(posA[i1], endA, posA[i2], endB, self.frac))
+        keep[pairs] = overlaps
+
+        # Only compute sample overlap if a minimum sample overlap is required
+        if self.sample_overlap > 0:
+            pairs = np.flatnonzero(keep)
+            bits = nodes['sample_bits']
+            keep[pairs] = samples_overlap_array(bits[idx1[pairs]], bits[idx2[pairs]],
+                                                self.sample_overlap, self.sample_overlap)
+
+        return keep
+
     def filter_nodes(self):
         """
         Filter records before clustering.
@@ -184,7 +298,7 @@ class VCFCluster(GenomeSLINK):
         for node in super().filter_nodes():
             if self.svtypes is not None and node.svtype not in self.svtypes:
                 continue
-            if 'SECONDARY' in node.record.info:
+            if node.is_secondary:
                 continue
             if not node.is_allowed_chrom():
                 continue
@@ -352,3 +466,295 @@ def parse_region(region):
     chrom, start, end = match.group(1, 2, 3)
 
     return chrom, int(start), int(end)
+
+
+def _anchor_pos(record):
+    """posA of the SVRecord a VCF record will be clustered as"""
+    if record.info['CHR2'] == record.chrom:
+        return min(record.pos, record.stop)
+    return record.pos
+
+
+def split_regions(vcfs, dist, region=None, split_records=0):
+    """
+    Divide clustering into independent regions.
+
+    Regions are whole contigs, optionally split further at gaps of at least
+    `dist` bp between consecutive record positions. No candidate batch can
+    span such a gap, so each region clusters exactly as it would in a
+    genome-wide run.
+
+    Parameters
+    ----------
+    vcfs : list of pysam.VariantFile
+        Indexed VCFs to cluster
+    dist : int
+        Clustering distance
+    region : str, optional
+        (chrom) or (chrom:start-end). Restrict to a single region.
+    split_records : int, optional
+        Minimum number of records per sub-region. If 0, contigs are not split.
+
+    Returns
+    -------
+    regions : list of (str, tuple of int or None)
+        Region to fetch and the [start, end) range of posA anchored in it,
+        or None if all fetched records belong to the region. Sorted in
+        genome-wide clustering order.
+    """
+
+    if region is not None:
+        chrom, start, end = parse_region(region)
+        if start is not None:
+            return [(region, None)]
+        chroms = [chrom]
+    else:
+        chroms = set()
+        for vcf in vcfs:
+            chroms = chroms.union(vcf.header.contigs.keys())
+        chroms = sorted(chroms, key=_chrom_key)
+
+    regions = []
+    for chrom in chroms:
+        if split_records <= 0:
+            regions.append((chrom, None))
+            continue
+
+        anchors = []
+        for vcf in vcfs:
+            if chrom in vcf.header.contigs:
+                anchors.extend(_anchor_pos(record) for record in vcf.fetch(chrom))
+        if len(anchors) == 0:
+            continue
+        anchors = np.sort(np.array(anchors, dtype=np.int64))
+
+        # Cut at the first safe gap after every split_records records
+        gaps = np.flatnonzero(np.diff(anchors) >= dist) + 1
+        cuts = []
+        last = 0
+        for gap in gaps:
+            if gap - last >= split_records:
+                cuts.append(gap)
+                last = gap
+
+        starts = [int(anchors[0])] + [int(anchors[i]) for i in cuts]
+        ends = starts[1:] + [int(anchors[-1]) + 1]
+        for start, end in zip(starts, ends):
+            regions.append(('{0}:{1}-{2}'.format(chrom, start - 1, end), (start, end)))
+
+    return regions
+
+
+def merge_order(filepaths, regions, region=None):
+    """
+    Order in which a serial run merges the records of each region.
+
+    Records tied at the same position are merged in an order that depends on
+    the records merged before them, so the merge is run once over all input
+    files, exactly as VCFCluster does.
+
+    Parameters
+    ----------
+    filepaths : list of str
+        Paths to indexed, standardized VCFs
+    regions : list of (str, tuple of int or None)
+        Regions returned by `split_regions`
+    region : str, optional
+        (chrom) or (chrom:start-end) passed to `split_regions`
+
+    Yields
+    ------
+    order : np.ndarray of int
+        Index in `filepaths` of the file providing each merged record of the
+        region. Yielded for every region, in order.
+    """
+
+    svfiles = [SVFile(pysam.VariantFile(path)) for path in filepaths]
+    if region is not None:
+        chrom, start, end = parse_region(region)
+        for svfile in svfiles:
+            svfile.fetch(chrom, start, end)
+
+    # Look up the region of a record from its posA
+    bounds = {}
+    for i, (r, anchors) in enumerate(regions):
+        start, end = (float('-inf'), float('inf')) if anchors is None else anchors
+        starts, ends, indices = bounds.setdefault(parse_region(r)[0], ([], [], []))
+        starts.append(start)
+        ends.append(end)
+        indices.append(i)
+
+    def _region_index(node):
+        if node.chrA not in bounds:
+            return None
+        starts, ends, indices = bounds[node.chrA]
+        j = bisect.bisect_right(starts, node.posA) - 1
+        if j < 0 or node.posA >= ends[j]:
+            return None
+        return indices[j]
+
+    # Tag records with their file while they wait in the merge heap
+    sources = {}
+
+    def _tagged(svfile, file_index):
+        for node in svfile:
+            sources[id(node)] = file_index
+            yield node
+
+    current = []
+    index = 0
+    for node in heapq.merge(*[_tagged(svfile, i) for i, svfile in enumerate(svfiles)]):
+        file_index = sources.pop(id(node))
+        region_index = _region_index(node)
+        if region_index is None:
+            continue
+        if region_index < index:
+            msg = 'Input VCFs must be sorted; record {0} at {1}:{2} is out of order'
+            raise ValueError(msg.format(node.name, node.chrA, node.posA))
+        while index < region_index:
+            yield np.array(current, dtype=np.int32)
+            current = []
+            index += 1
+        current.append(file_index)
+
+    while index < len(regions):
+        yield np.array(current, dtype=np.int32)
+        current = []
+        index += 1
+
+
+def _ordered_nodes(svfiles, order, anchors=None):
+    """
+    Merge the records of a region in the order given by `merge_order`.
+    """
+    if anchors is None:
+        streams = [iter(svfile) for svfile in svfiles]
+    else:
+        start, end = anchors
+        streams = [(node for node in svfile if start <= node.posA < end)
+                   for svfile in svfiles]
+
+    for file_index in order:
+        node = next(streams[file_index], None)
+        if node is None:
+            raise ValueError('Fewer records fetched from {0} than were merged '
+                             'from it'.format(svfiles[file_index].filename))
+        yield node
+
+    for svfile, stream in zip(svfiles, streams):
+        if next(stream, None) is not None:
+            raise ValueError('More records fetched from {0} than were merged '
+                             'from it'.format(svfile.filename))
+
+
+def _cluster_region(task):
+    """
+    Cluster a single region in a worker process.
+
+    Records are merged in the order a serial run merges them, and clustered
+    records are written to a temporary VCF so they are formatted exactly as
+    they would be by a serial run.
+    """
+    filepaths, region, anchors, order, fout, kwargs = task
+
+    vcfs = [pysam.VariantFile(path) for path in filepaths]
+    if kwargs.get('blacklist') is not None:
+        kwargs = dict(kwargs, blacklist=pysam.TabixFile(kwargs['blacklist']))
+
+    svc = VCFCluster(vcfs, region=region, **kwargs)
+    svc.nodes = _ordered_nodes(svc.svfiles, order, anchors)
+
+    clusters = []
+    out = pysam.VariantFile(fout, mode='w', header=svc.header)
+    for cluster in svc.cluster():
+        cluster_id = cluster[0].info['CLUSTER'] if 'CLUSTER' in cluster[0].info else None
+        clusters.append((cluster_id, len(cluster)))
+        for record in cluster:
+            out.write(record)
+    out.close()
+
+    return fout, clusters
+
+
+def _set_cluster_info(line, cluster_id):
+    """Overwrite the CLUSTER INFO field of a VCF line"""
+    fields = line.rstrip('\n').split('\t')
+    infos = fields[7].split(';')
+    for i, info in enumerate(infos):
+        if info.startswith('CLUSTER='):
+            infos[i] = 'CLUSTER={0}'.format(cluster_id)
+    fields[7] = ';'.join(infos)
+    return '\t'.join(fields) + '\n'
+
+
+def cluster_parallel(filepaths, processes, region=None, split_records=0,
+                     dist=500, blacklist=None, do_merge=True, **kwargs):
+    """
+    Run VCFCluster on independent regions in a process pool.
+
+    Input files are merged once in the main process, in the same order as a
+    serial run, and each worker clusters its region's records in that order.
+    Results are streamed back in genome-wide order. CLUSTER IDs assigned
+    with `do_merge=False` are renumbered so that they match a serial run.
+
+    Parameters
+    ----------
+    filepaths : list of str
+        Paths to indexed, standardized VCFs
+    processes : int
+        Number of worker processes
+    region : str, optional
+        (chrom) or (chrom:start-end)
+    split_records : int, optional
+        Split contigs into gap-safe sub-regions of at least this many records.
+        See `split_regions`.
+    dist : int, optional
+    blacklist : str or pysam.TabixFile, optional
+    do_merge : bool, optional
+    **kwargs
+        Remaining VCFCluster parameters
+
+    Yields
+    ------
+    cluster_id : int or None
+        CLUSTER INFO of the cluster's first record, if present
+    lines : list of str
+        VCF lines of the cluster's records
+    """
+
+    if blacklist is not None and not isinstance(blacklist, str):
+        blacklist = blacklist.filename
+        if isinstance(blacklist, bytes):
+            blacklist = blacklist.decode('utf-8')
+
+    kwargs = dict(kwargs, dist=dist, blacklist=blacklist, do_merge=do_merge)
+    vcfs = [pysam.VariantFile(path) for path in filepaths]
+    regions = split_regions(vcfs, dist, region, split_records)
+
+    offset = 0
+    with tempfile.TemporaryDirectory() as tmpdir, \
+            multiprocessing.Pool(processes) as pool:
+        orders = merge_order(filepaths, regions, region)
+        tasks = ((filepaths, r, anchors, order, os.path.join(tmpdir, '{0}.vcf'.format(i)), kwargs)
+                 for i, ((r, anchors), order) in enumerate(zip(regions, orders)))
+
+        # Submit regions as they are merged, so workers start before the merge
+        # finishes, and stream back clustered regions in order
+        pending = collections.deque()
+        for task in itertools.chain(tasks, [None]):
+            if task is not None:
+                pending.append(pool.apply_async(_cluster_region, (task, )))
+            while pending and (task is None or pending[0].ready()):
+                fout, clusters = pending.popleft().get()
+                with open(fout) as f:
+                    lines = (line for line in f if not line.startswith('#'))
+                    for cluster_id, size in clusters:
+                        records = [next(lines) for _ in range(size)]
+                        if not do_merge:
+                            cluster_id += offset
+                            records = [_set_cluster_info(line, cluster_id) for line in records]
+                        yield cluster_id, records
+
+                if not do_merge:
+                    offset += len(clusters)
+                os.remove(fout)
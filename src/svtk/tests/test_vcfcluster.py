@@ -0,0 +1,69 @@
+import numpy as np
+import pysam
+import pytest
+
+from svtk.vcfcluster import VCFCluster, cluster_parallel
+
+
+CHROMS = ('chr1', 'chr2')
+HEADER = [
+    '##fileformat=VCFv4.2',
+    '##source=manta,delly',
+    *('##contig=<ID={0},length=1000000>'.format(chrom) for chrom in CHROMS),
+    '##ALT=<ID=DEL,Description="Deletion">',
+    '##ALT=<ID=DUP,Description="Duplication">',
+    '##INFO=<ID=SVTYPE,Number=1,Type=String,Description="SV type">',
+    '##INFO=<ID=CHR2,Number=1,Type=String,Description="Second chromosome">',
+    '##INFO=<ID=END,Number=1,Type=Integer,Description="End position">',
+    '##INFO=<ID=STRANDS,Number=1,Type=String,Description="Strands">',
+    '##INFO=<ID=SVLEN,Number=1,Type=Integer,Description="SV length">',
+    '##INFO=<ID=ALGORITHMS,Number=.,Type=String,Description="Algorithms">',
+    '##FORMAT=<ID=GT,Number=1,Type=String,Description="Genotype">',
+]
+
+
+@pytest.fixture(scope='module')
+def tied_vcfs(tmp_path_factory, num_vcfs=3, num_sites=40, seed=0):
+    """
+    Standardized VCFs with many records tied at the same posA, both within
+    and between files
+    """
+    tmpdir = tmp_path_factory.mktemp('vcfcluster')
+    rng = np.random.RandomState(seed)
+    samples = ['S{0}'.format(i) for i in range(4)]
+    sites = {chrom: np.sort(rng.randint(1, 4000, num_sites)) * 250 + 1 for chrom in CHROMS}
+
+    filepaths = []
+    for k in range(num_vcfs):
+        lines = HEADER + ['\t'.join(['#CHROM', 'POS', 'ID', 'REF', 'ALT', 'QUAL', 'FILTER', 'INFO', 'FORMAT'] +
+                                    samples)]
+        for chrom in CHROMS:
+            for j, pos in enumerate(sites[chrom]):
+                for rep in range(rng.randint(0, 3)):
+                    svtype = ('DEL', 'DUP')[rng.randint(2)]
+                    svlen = 2000 + 250 * rng.randint(3)
+                    info = 'SVTYPE={0};CHR2={1};END={2};STRANDS={3};SVLEN={4};ALGORITHMS={5}'.format(
+                        svtype, chrom, pos + svlen, '+-' if svtype == 'DEL' else '-+', svlen,
+                        ('manta', 'delly')[rng.randint(2)])
+                    gts = [('0/0', '0/1')[rng.randint(2)] for _ in samples]
+                    lines.append('\t'.join([chrom, str(pos), 'f{0}_{1}_{2}_{3}'.format(k, chrom, j, rep), 'N',
+                                            '<{0}>'.format(svtype), '.', 'PASS', info, 'GT'] + gts))
+        path = str(tmpdir / 'std{0}.vcf'.format(k))
+        with open(path, 'w') as fout:
+            fout.write('\n'.join(lines) + '\n')
+        filepaths.append(pysam.tabix_index(path, preset='vcf', force=True))
+
+    return filepaths
+
+
+@pytest.mark.parametrize('frac', [0.0, 0.3])
+@pytest.mark.parametrize('split_records', [0, 1])
+def test_cluster_parallel_matches_serial(tied_vcfs, frac, split_records):
+    svc = VCFCluster([pysam.VariantFile(path) for path in tied_vcfs], frac=frac)
+    serial = [str(record) for cluster in svc.cluster() for record in cluster]
+
+    parallel = [line for _, lines in cluster_parallel(tied_vcfs, 2, split_records=split_records, frac=frac)
+                for line in lines]
+
+    assert len(serial) > 0
+    assert parallel == serial